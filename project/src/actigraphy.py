@@ -0,0 +1,203 @@
+"""
+Sleep/wake scoring from the movement readings, for every night of a batch at once.
+
+Each minute is scored with a Cole-Kripke style weighted window: a weighted sum of the activity
+in the four minutes before it, the minute itself and the two after it. Activity is how far
+the movement readings stray from a resting level fitted once from the real data (the
+micro:bit's accelerometer never reads exactly 1 g at rest). The level is the same for every
+night, so a restless night cannot shift its own baseline. Runs of sleep and wake minutes are
+then found with run-length encoding, giving each night's sleep onset, real sleep time,
+efficiency and wake bouts.
+
+The window is one np.convolve over all nights, laid end to end with zeros between them so no
+night's window reaches into the next, and the runs come from the positions where the score
+changes - there is no Python loop over nights or minutes.
+"""
+
+import numpy as np # For the convolution and run-length encoding.
+from instrumentation import span # Times each segmentation.
+from night_generator import MODELS, sensor_autocorrelation, sensor_parameters, simulate_nights # Simulated nights.
+
+COLE_KRIPKE_WEIGHTS = np.array([106, 54, 58, 76, 230, 74, 67], dtype=np.float64) # Minutes -4 to +2 (Cole et al., 1992).
+MINUTES_BEFORE = 4 # Minutes before the scored minute that the window reaches back.
+WAKE_LEVEL = 60.0 # Sustained activity, in mg away from rest, that scores a minute as wake.
+ONSET_MINUTES = 10 # Sleep starts with the first run of at least this many sleep minutes.
+MIN_WAKE_BOUT = 2 # Shortest run of wake minutes counted as a wake bout.
+NIGHT_STATISTICS = ("time_in_bed", "total_sleep", "latency", "efficiency", "waso", "wake_bouts", "longest_wake")
+
+
+def resting_level():
+    """Return the movement reading at rest: the mean of the validated movement readings."""
+    return sensor_parameters()["movement"][0]
+
+
+def activity_counts(movement, rest=None):
+    """
+    Turn movement readings into activity: the distance of each reading from the resting level.
+    Args:
+        movement (np.ndarray): Flat movement readings of every night, one night after the other.
+        rest (float): Movement reading at rest, from resting_level() if None.
+    Returns:
+        float32 array of activity per minute.
+    """
+    rest = resting_level() if rest is None else rest
+    return np.abs(movement - np.float32(rest))
+
+
+def score_minutes(activity, offsets, wake_level=WAKE_LEVEL):
+    """
+    Score every minute of every night as sleep or wake with the Cole-Kripke window.
+    Minutes of the window that fall outside the night count as no activity, as at the
+    start and end of a recording.
+    Args:
+        activity (np.ndarray): Flat activity per minute from activity_counts().
+        offsets (np.ndarray): Night i spans offsets[i]:offsets[i + 1].
+        wake_level (float): Sustained activity that scores a minute as wake.
+    Returns:
+        Boolean array, True for wake minutes.
+    """
+    lengths = np.diff(offsets)
+    before, after = MINUTES_BEFORE, len(COLE_KRIPKE_WEIGHTS) - 1 - MINUTES_BEFORE
+    gap = max(before, after) # Zeros between nights keep each window inside its own night.
+
+    # Night i starts at offsets[i] + before + i * gap in the padded array.
+    padded_starts = offsets[:-1] + before + np.arange(len(lengths)) * gap
+    padded = np.zeros(int(offsets[-1]) + before + max(len(lengths) - 1, 0) * gap + after) # float64, like the weights.
+    positions = np.repeat(padded_starts - offsets[:-1], lengths) + np.arange(int(offsets[-1]))
+    padded[positions] = activity
+
+    # np.convolve flips its kernel, so the weights are reversed to weight minute -4 first.
+    weights = COLE_KRIPKE_WEIGHTS / (COLE_KRIPKE_WEIGHTS.sum() * wake_level)
+    score = np.convolve(padded, weights[::-1], mode="valid") # score[j] covers padded[j:j + 7], centred on j + before.
+    return score[positions - before] >= 1.0
+
+
+def runs(wake, offsets):
+    """
+    Run-length encode the sleep/wake minutes of every night; runs never cross nights.
+    Args:
+        wake (np.ndarray): Boolean array from score_minutes().
+        offsets (np.ndarray): Night i spans offsets[i]:offsets[i + 1].
+    Returns:
+        Dictionary of per-run arrays, in order: night (position in the batch), start (flat
+        minute), length, and wake (True for wake runs).
+    """
+    boundary = np.empty(len(wake), dtype=bool)
+    boundary[:1] = True
+    np.not_equal(wake[1:], wake[:-1], out=boundary[1:])
+    boundary[offsets[:-1][np.diff(offsets) > 0]] = True # A new night always starts a new run.
+    starts = np.flatnonzero(boundary)
+    lengths = np.diff(np.append(starts, len(wake)))
+    night = np.searchsorted(offsets, starts, side="right") - 1
+    return {"night": night, "start": starts, "length": lengths, "wake": wake[starts]}
+
+
+def first_per_night(night, number_of_nights, values, fill):
+    """Return the value at each night's first appearance in night, or fill for nights that never appear."""
+    result = np.full(number_of_nights, fill, dtype=np.int64)
+    nights, first = np.unique(night, return_index=True)
+    result[nights] = values[first]
+    return result
+
+
+def segment_nights(movement, offsets, wake_level=WAKE_LEVEL, onset_minutes=ONSET_MINUTES, min_wake_bout=MIN_WAKE_BOUT,
+                   rest=None):
+    """
+    Segment every night into sleep and wake and measure it.
+    Sleep starts at the first run of at least onset_minutes sleep minutes and ends after the
+    last sleep minute; wake between the two is wake after sleep onset (WASO).
+    Args:
+        movement (np.ndarray): Flat movement readings of every night, one night after the other.
+        offsets (np.ndarray): Night i spans offsets[i]:offsets[i + 1]; every night must be non-empty.
+        wake_level (float): Sustained activity that scores a minute as wake.
+        onset_minutes (int): Sleep minutes in a row that mark sleep onset.
+        min_wake_bout (int): Shortest run of wake minutes counted in wake_bouts.
+        rest (float): Movement reading at rest, from resting_level() if None.
+    Returns:
+        Dictionary mapping each name in NIGHT_STATISTICS to an array with one entry per night:
+            time_in_bed: minutes recorded;
+            total_sleep: minutes scored as sleep from onset to the final awakening;
+            latency: minutes from the start of the night to onset (time_in_bed if sleep never starts);
+            efficiency: total_sleep / time_in_bed;
+            waso: wake minutes between onset and the final awakening;
+            wake_bouts, longest_wake: wake runs of at least min_wake_bout minutes in that span, and the longest.
+    """
+    movement = np.asarray(movement)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    nights, lengths = len(offsets) - 1, np.diff(offsets)
+    if np.any(lengths == 0):
+        raise ValueError("Every night needs at least one reading.")
+
+    with span("actigraphy.segment", items=nights):
+        wake = score_minutes(activity_counts(movement, rest), offsets, wake_level)
+        run = runs(wake, offsets)
+        end_of_run = run["start"] + run["length"]
+
+        # Onset: start of the first long enough sleep run. End: after the last sleep minute.
+        onset_runs = ~run["wake"] & (run["length"] >= onset_minutes)
+        onset = first_per_night(run["night"][onset_runs], nights, run["start"][onset_runs], -1)
+        sleep_runs = np.flatnonzero(~run["wake"])
+        last = sleep_runs[::-1] # Reversed, so np.unique's first index is each night's last sleep run.
+        end = first_per_night(run["night"][last], nights, end_of_run[last], -1)
+
+        asleep = onset >= 0
+        inside = asleep[run["night"]] & (run["start"] >= onset[run["night"]]) & (end_of_run <= end[run["night"]])
+        sleep_minutes = np.bincount(run["night"], weights=run["length"] * (inside & ~run["wake"]), minlength=nights)
+        wake_minutes = np.bincount(run["night"], weights=run["length"] * (inside & run["wake"]), minlength=nights)
+        bouts = inside & run["wake"] & (run["length"] >= min_wake_bout)
+        longest = np.zeros(nights, dtype=np.int64)
+        np.maximum.at(longest, run["night"][bouts], run["length"][bouts])
+
+    total_sleep = sleep_minutes.astype(np.int64)
+    return {
+        "time_in_bed": lengths,
+        "total_sleep": total_sleep,
+        "latency": np.where(asleep, onset - offsets[:-1], lengths),
+        "efficiency": total_sleep / lengths,
+        "waso": wake_minutes.astype(np.int64),
+        "wake_bouts": np.bincount(run["night"][bouts], minlength=nights),
+        "longest_wake": longest,
+    }
+
+
+def segment_batch(batch, **options):
+    """Segment every night of a NightBatch; options are passed to segment_nights()."""
+    return segment_nights(batch.series["movement"], batch.offsets, **options)
+
+
+def main():
+    """Segment simulated or stored nights from the command line and report the results and throughput."""
+    import argparse # For the command line interface; imported here so importing the module stays fast.
+    import time # For throughput reporting.
+
+    parser = argparse.ArgumentParser(description="Score sleep and wake from movement and measure every night.")
+    parser.add_argument("--store", metavar="FOLDER", default=None, help="segment the nights in this night store")
+    parser.add_argument("--user", type=int, default=None, help="only segment this user's stored nights")
+    parser.add_argument("--nights", type=int, default=10_000, help="nights to simulate when no store is given")
+    parser.add_argument("--model", choices=MODELS, default="ar1", help="how simulated minutes follow each other")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible simulated nights")
+    parser.add_argument("--wake-level", type=float, default=WAKE_LEVEL, help="activity (mg from rest) scored as wake")
+    args = parser.parse_args()
+
+    if args.store is not None:
+        from night_store import NightStore # Only needed when segmenting stored nights.
+        with NightStore(args.store) as store:
+            records = store.query() if args.user is None else store.query("user_id = ?", (args.user,))
+            batch = store.to_batch(records)
+    else:
+        autocorrelation = sensor_autocorrelation() if args.model == "ar1" else None
+        batch = simulate_nights(args.nights, args.seed, sensor_parameters(), autocorrelation=autocorrelation)
+
+    start = time.perf_counter()
+    table = segment_batch(batch, wake_level=args.wake_level)
+    seconds = time.perf_counter() - start
+
+    minutes = int(batch.offsets[-1])
+    print(f"Segmented {len(batch):,} nights ({minutes:,} minutes) in {seconds:.2f} s - {minutes / seconds:,.0f} minutes/s.\n")
+    for name in NIGHT_STATISTICS:
+        values = table[name]
+        print(f"{name:<13} mean {values.mean():>8.2f}   min {values.min():>8.2f}   max {values.max():>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+""" Headless batch reports: render every night of every user to image files, in parallel. """
+
+import json # For the per-night text summaries.
+import os # For output paths.
+from concurrent.futures import ProcessPoolExecutor # For rendering on every core.
+
+import numpy as np # For array handling.
+from data_validation import SENSORS # Sensor names, in plotting order.
+from downsampling import downsample # Fewer points per image, same shape.
+from night_generator import load_batch # Saved nights, from save_batch() or a cohort.
+from summary_statistics import summarise_batch # Statistics written next to each figure.
+from instrumentation import span, trace_to # Times the whole render; --trace writes it out.
+
+NIGHTS_PER_TASK = 256 # Nights handed to a worker at a time.
+
+# Title and axis label of each subplot, in the same layout as Night.present_sleep_data().
+PANELS = {
+    "light": ("Light", "Light Level (lx)"),
+    "sound": ("Sound", "Sound Level (dB)"),
+    "temp": ("Temperature", "Temperature (°C)"),
+    "movement": ("Movement", "Movement Level (mg)"),
+}
+
+
+class NightRenderer:
+    """One reusable figure with four subplots; each night only swaps the line data and titles."""
+
+
+    def __init__(self):
+        """Create the figure and its artists once, without pyplot or a GUI backend."""
+        from matplotlib.figure import Figure # Imported here so only rendering processes load matplotlib.
+
+        self.figure = Figure(figsize=(10, 7))
+        self.axes = dict(zip(SENSORS, self.figure.subplots(2, 2).ravel()))
+        self.lines = {}
+        for sensor, axis in self.axes.items():
+            axis.set_title(f"User 0, night 0: {PANELS[sensor][0]} vs Time") # Placeholder, so the layout leaves room.
+            axis.set_xlabel("Time (minutes)")
+            axis.set_ylabel(PANELS[sensor][1])
+            self.lines[sensor] = axis.plot([], [])[0]
+        self.figure.tight_layout() # Laid out once; later nights reuse the same positions.
+
+
+    def render(self, path, title, minutes, series):
+        """
+        Draw one night and save it.
+        Args:
+            path: Image file to write; the extension picks the format (e.g. .png or .svg).
+            title (str): Prefix for each subplot title, e.g. "User 3, night 12".
+            minutes (np.ndarray): Horizontal axis values.
+            series (dict): Readings per sensor.
+        """
+        for sensor, axis in self.axes.items():
+            self.lines[sensor].set_data(*downsample(minutes, series[sensor]))
+            axis.set_title(f"{title}: {PANELS[sensor][0]} vs Time")
+            axis.relim()
+            axis.autoscale_view()
+        self.figure.savefig(path)
+
+
+# State held by each worker process, created once by init_worker().
+_worker = {}
+
+
+def init_worker(batch_folder, output_folder, image_format):
+    """Open the saved nights (memory-mapped) and build this worker's figure."""
+    _worker["batch"] = load_batch(batch_folder)
+    _worker["renderer"] = NightRenderer()
+    _worker["output"] = output_folder
+    _worker["format"] = image_format
+
+
+def render_nights(start, stop):
+    """
+    Render nights start..stop-1 of the worker's batch, writing an image and a JSON summary for each.
+    Returns:
+        Number of nights rendered.
+    """
+    batch, renderer = _worker["batch"], _worker["renderer"]
+    offsets = batch.offsets[start:stop + 1]
+    stats = {
+        sensor: summarise_batch(batch.series[sensor][offsets[0]:offsets[-1]], offsets - offsets[0])
+        for sensor in SENSORS
+    }
+
+    for position, index in enumerate(range(start, stop)):
+        user_id, night_id = int(batch.user_ids[index]), int(batch.night_ids[index])
+        folder = os.path.join(_worker["output"], f"user_{user_id:05d}")
+        os.makedirs(folder, exist_ok=True)
+        base = os.path.join(folder, f"night_{night_id:03d}")
+
+        series = {sensor: batch.night_series(sensor, index) for sensor in SENSORS}
+        renderer.render(f"{base}.{_worker['format']}", f"User {user_id}, night {night_id}",
+                        np.arange(1, len(series["light"]) + 1), series)
+
+        summary = {"user_id": user_id, "night_id": night_id, "mins_slept": int(batch.mins_slept[index])}
+        for sensor in SENSORS:
+            summary[sensor] = {name: values[position].item() for name, values in stats[sensor].items()}
+        with open(f"{base}.json", "w") as summary_file:
+            json.dump(summary, summary_file, indent=2)
+    return stop - start
+
+
+def render_batch(batch_folder, output_folder, image_format="png", workers=None):
+    """
+    Render every night of a saved batch across a process pool.
+    Args:
+        batch_folder: Folder written by night_generator.save_batch() or cohort_simulation.
+        output_folder: Where to write the images and JSON summaries.
+        image_format (str): Image file extension, e.g. "png" or "svg".
+        workers (int): Number of worker processes, defaults to the number of CPUs.
+    Returns:
+        Number of nights rendered.
+    """
+    nights = len(load_batch(batch_folder))
+    os.makedirs(output_folder, exist_ok=True)
+    # Workers are separate processes, so the trace shows the whole render as one stage.
+    with span("report.render_batch", items=nights), ProcessPoolExecutor(workers or os.cpu_count() or 1, initializer=init_worker,
+                             initargs=(batch_folder, output_folder, image_format)) as pool:
+        futures = [
+            pool.submit(render_nights, start, min(start + NIGHTS_PER_TASK, nights))
+            for start in range(0, nights, NIGHTS_PER_TASK)
+        ]
+        return sum(future.result() for future in futures)
+
+
+def main():
+    """Simulate (or load) nights and render them all without any prompts or windows."""
+    import argparse # For the command line interface; imported here so importing the module stays fast.
+    import tempfile # For holding simulated nights while they are rendered.
+    import time # For throughput reporting.
+
+    parser = argparse.ArgumentParser(description="Render sleep reports for every night to files.")
+    parser.add_argument("--output", required=True, help="folder for the images and JSON summaries")
+    parser.add_argument("--input", default=None, help="saved nights to render instead of simulating new ones")
+    parser.add_argument("--users", type=int, default=1, help="number of users to simulate")
+    parser.add_argument("--nights", type=int, default=100, help="nights to simulate per user")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible simulated nights")
+    parser.add_argument("--format", default="png", choices=("png", "svg", "pdf"), help="image format")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all CPUs)")
+    parser.add_argument("--trace", metavar="PATH", default=None, help="write a Chrome trace of each stage to PATH")
+    args = parser.parse_args()
+    if args.trace:
+        trace_to(args.trace)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        batch_folder = args.input
+        if batch_folder is None:
+            from cohort_simulation import simulate_cohort # Only needed when simulating; user IDs from 1, seeded per user.
+            simulate_cohort(args.users, args.nights, args.seed, args.workers, tmp)
+            batch_folder = os.path.join(tmp, "cohort")
+
+        start = time.perf_counter()
+        rendered = render_batch(batch_folder, args.output, args.format, args.workers)
+        seconds = time.perf_counter() - start
+    print(f"Rendered {rendered:,} nights to {args.output} in {seconds:.2f} s - {rendered / seconds:,.1f} nights/s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,749 @@
+""" Benchmarks comparing the original row-based pipeline with the vectorised replacements. """
+
+import argparse # For the command line interface.
+import csv # For the reference row-based loader.
+import json # For saving and comparing suite results.
+import os # For temporary file handling.
+import tempfile # For writing synthetic logs outside the repository.
+import time # For wall-clock timings.
+import tracemalloc # For peak memory measurements.
+
+import numpy as np # For generating synthetic data.
+import data_validation # Modules under test.
+import night_generator
+
+
+# -------------------- SYNTHETIC DATA --------------------
+
+def write_synthetic_log(path, rows, source=data_validation.CSV_PATH):
+    """
+    Write a synthetic raw log by tiling the real sample file end to end.
+    Args:
+        path: Destination path of the synthetic CSV file.
+        rows (int): Number of data rows to write.
+        source: Raw CSV file used as the template.
+    """
+    with open(source, newline='') as source_csv:
+        header = source_csv.readline()
+        lines = [line.rstrip("\n") for line in source_csv if line.strip()]
+
+    times = np.array([float(line.split(",", 1)[0]) for line in lines])
+    tails = [line.split(",", 1)[1] for line in lines] # Sensor fields after the timestamp.
+    span = times[-1] - times[0] + 0.1 # Shift each copy so timestamps keep increasing.
+
+    with open(path, "w", newline='') as out_csv:
+        out_csv.write(header)
+        written = 0
+        copy = 0
+        while written < rows:
+            count = min(len(lines), rows - written)
+            shifted = (times[:count] + copy * span).tolist()
+            out_csv.write("".join(f"{t:.2f},{tail}\n" for t, tail in zip(shifted, tails[:count])))
+            written += count
+            copy += 1
+
+
+# -------------------- REFERENCE IMPLEMENTATIONS --------------------
+
+def legacy_main(path):
+    """
+    Row-based validation as performed by data_validation.main() before the columnar loader.
+    Args:
+        path: Path to the raw CSV file.
+    Returns:
+        light_dict, sound_dict, temp_dict, movement_dict
+    """
+    times = []
+    light, sound, temp, movement = [], [], [], []
+    with open(path, newline='') as data_csv:
+        for row in csv.DictReader(data_csv, delimiter=","):
+            times.append(row['Time (seconds)'])
+            light.append(row['light'])
+            sound.append(row['sound'])
+            temp.append(row['temp'])
+            movement.append(row['movement'])
+
+    times = [float(time) for time in times]
+    dicts = [
+        data_validation.remove_pairs(dict(zip(times, data_validation.process_values(values))))
+        for values in (light, sound, temp, movement)
+    ]
+    dicts[2] = dict(zip(times, [temp - 3 for temp in dicts[2].values()]))
+    dicts[1] = data_validation.filter_sound_readings(dicts[1])
+    return tuple(dicts)
+
+
+def legacy_generate(number_of_nights, light_dict, sound_dict, temp_dict, movement_dict):
+    """
+    Per-night generation loop as run by sleep_simulation.py before the bulk generator.
+    Args:
+        number_of_nights (int): Number of nights to generate.
+        light_dict, sound_dict, temp_dict, movement_dict: Validated time:value dictionaries.
+    Returns:
+        List of (night_id, mins_slept, light, sound, temp, movement) tuples of minute:value dictionaries.
+    """
+    def get_mean_std(dictionary):
+        arr = np.array(list(dictionary.values()))
+        return round(np.mean(arr), 2), round(np.std(arr), 2)
+
+    def get_normal_distribution(mean, std, size):
+        return [round(abs(val)) for val in (np.random.normal(mean, std, size)).tolist()]
+
+    nights = []
+    for index, mins_slept in enumerate(get_normal_distribution(480, 20, number_of_nights)):
+        minutes = list(range(1, mins_slept + 1))
+        dicts = [
+            dict(zip(minutes, get_normal_distribution(*get_mean_std(source), mins_slept)))
+            for source in (light_dict, sound_dict, temp_dict, movement_dict)
+        ]
+        nights.append((index + 1, mins_slept, *dicts))
+    return nights
+
+
+# -------------------- MEASUREMENT HELPERS --------------------
+
+def measure(function, *args):
+    """
+    Time a call, then repeat it under tracemalloc to record its peak allocation.
+    Args:
+        function: Callable to measure.
+        *args: Arguments passed to the callable.
+    Returns:
+        seconds (float), peak_bytes (int)
+    """
+    start = time.perf_counter()
+    function(*args)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    function(*args)
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak_bytes
+
+
+def report(name, seconds, peak_bytes, items):
+    """Print one benchmark result line."""
+    print(f"{name:<28} {seconds:9.3f} s {peak_bytes / 2**20:10.1f} MiB {items / seconds:14,.0f} items/s")
+
+
+# -------------------- BENCHMARKS --------------------
+
+def benchmark_ingest(rows, skip_legacy=False):
+    """
+    Compare the row-based validator with the columnar loader on a synthetic log.
+    Args:
+        rows (int): Number of rows in the synthetic log.
+        skip_legacy (bool): Only measure the columnar loader.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sleep_data_synthetic.csv")
+        write_synthetic_log(path, rows)
+        print(f"\nIngest benchmark: {rows:,} rows, {os.path.getsize(path) / 2**20:.1f} MiB\n")
+
+        new_seconds, new_peak = measure(data_validation.load_columns, path)
+        report("columnar load_columns()", new_seconds, new_peak, rows)
+        if not skip_legacy:
+            old_seconds, old_peak = measure(legacy_main, path)
+            report("row-based DictReader", old_seconds, old_peak, rows)
+            print(f"\nSpeed-up: {old_seconds / new_seconds:.1f}x, memory: {old_peak / new_peak:.1f}x less")
+
+
+def benchmark_log(rows, lookups=1_000):
+    """
+    Compare loading a synthetic log from CSV and from a binary sensor log, and time range lookups.
+    Args:
+        rows (int): Number of rows in the synthetic log.
+        lookups (int): Random one-minute ranges looked up in the binary log.
+    """
+    import sensor_log # Imported here, as only this benchmark needs it.
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sleep_data_synthetic.csv")
+        write_synthetic_log(path, rows)
+        log_path = os.path.join(tmp, "sleep_data_synthetic.slog")
+        convert_seconds, convert_peak = measure(sensor_log.convert_csv, path, log_path)
+        records = len(sensor_log.SensorLog(log_path))
+        print(f"\nSensor log benchmark: {rows:,} rows, {os.path.getsize(path) / 2**20:.1f} MiB of CSV, "
+              f"{os.path.getsize(log_path) / 2**20:.1f} MiB of log\n")
+        report("convert_csv()", convert_seconds, convert_peak, records)
+
+        csv_seconds, csv_peak = measure(data_validation.load_columns, path)
+        report("load_columns() from CSV", csv_seconds, csv_peak, rows)
+        log_seconds, log_peak = measure(data_validation.load_columns, log_path)
+        report("load_columns() from log", log_seconds, log_peak, records)
+        print(f"\nSpeed-up: {csv_seconds / log_seconds:.1f}x")
+
+        log = sensor_log.SensorLog(log_path)
+        first, last = log.span_seconds()
+        starts = np.random.default_rng(0).uniform(first, last, lookups)
+        start = time.perf_counter()
+        found = sum(len(log.time_range(begin, begin + 60)) for begin in starts)
+        seconds = time.perf_counter() - start
+        print(f"time_range(): {seconds / lookups * 1e6:.1f} us per one-minute range "
+              f"({found / lookups:,.0f} readings each, found by binary search)")
+
+
+def benchmark_simulate(nights, legacy_nights=1_000):
+    """
+    Compare the per-night generation loop with the bulk generator.
+    The legacy loop keeps one dictionary entry per reading, so it is measured on at most
+    legacy_nights nights and its rate extrapolated.
+    Args:
+        nights (int): Number of nights for the bulk generator.
+        legacy_nights (int): Number of nights for the per-night loop.
+    """
+    parameters = night_generator.sensor_parameters()
+    print(f"\nSimulation benchmark: {nights:,} nights\n")
+
+    new_seconds, new_peak = measure(night_generator.simulate_nights, nights, 0, parameters)
+    report("bulk simulate_nights()", new_seconds, new_peak, nights)
+
+    if legacy_nights:
+        legacy_nights = min(legacy_nights, nights)
+        dicts = data_validation.main()
+        old_seconds, old_peak = measure(legacy_generate, legacy_nights, *dicts)
+        report(f"per-night loop ({legacy_nights:,})", old_seconds, old_peak, legacy_nights)
+        projected = old_seconds * nights / legacy_nights
+        print(f"\nPer-night loop projected to {nights:,} nights: {projected:.1f} s "
+              f"({projected / new_seconds:.0f}x slower)")
+
+
+def benchmark_generator(nights, repeats=3, target=50e6):
+    """
+    Measure simulated minutes per second of the independent and AR(1) generators on one core.
+    Args:
+        nights (int): Nights per run.
+        repeats (int): Runs per model; the fastest is reported.
+        target (float): Minutes per second to compare against.
+    """
+    parameters = night_generator.sensor_parameters()
+    autocorrelation = night_generator.sensor_autocorrelation()
+    print(f"\nGenerator benchmark: {nights:,} nights, fitted phi {autocorrelation}\n")
+
+    for model, fitted in (("independent", None), ("ar1", autocorrelation)):
+        seconds = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            batch = night_generator.simulate_nights(nights, 0, parameters, autocorrelation=fitted)
+            seconds.append(time.perf_counter() - start)
+        minutes = int(batch.offsets[-1])
+        rate = minutes / min(seconds)
+        lag_one = {sensor: round(float(np.corrcoef(batch.series[sensor][:-1], batch.series[sensor][1:])[0, 1]), 3)
+                   for sensor in ("sound", "temp", "movement")}
+        print(f"{model:<12} {rate / 1e6:8.1f}M minutes/s ({rate / target:.0%} of {target / 1e6:g}M), lag-1 {lag_one}")
+
+
+def benchmark_night_memory(nights=1_000_000, sample_nights=20_000):
+    """
+    Compare the memory used by dictionary-backed and array-backed Night objects.
+    Both layouts grow linearly with the number of nights, so each is measured on
+    sample_nights nights and projected to the requested number.
+    Args:
+        nights (int): Number of nights to project to.
+        sample_nights (int): Number of nights actually built for each layout.
+    """
+    import sleep_simulation # Imported here so the other benchmarks do not load matplotlib.
+
+    parameters = night_generator.sensor_parameters()
+    print(f"\nNight memory benchmark: {sample_nights:,} nights measured, projected to {nights:,}\n")
+
+    def dict_nights():
+        batch = night_generator.simulate_nights(sample_nights, 0, parameters)
+        list_of_nights = []
+        for index in range(len(batch)):
+            minutes = range(1, int(batch.mins_slept[index]) + 1)
+            dicts = [dict(zip(minutes, batch.night_series(sensor, index).tolist())) for sensor in data_validation.SENSORS]
+            list_of_nights.append((index + 1, int(batch.mins_slept[index]), *dicts))
+        del batch # Only the dictionaries are kept, as in the old layout.
+        return list_of_nights
+
+    def array_nights():
+        batch = night_generator.simulate_nights(sample_nights, 0, parameters)
+        return [sleep_simulation.Night.from_batch(batch, index) for index in range(len(batch))]
+
+    for name, build in (("dict-backed Night", dict_nights), ("array-backed Night", array_nights)):
+        tracemalloc.start()
+        list_of_nights = build()
+        retained = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del list_of_nights
+        per_night = retained / sample_nights
+        print(f"{name:<22} {per_night:10,.0f} bytes/night {per_night * nights / 2**30:10.2f} GiB at {nights:,} nights")
+
+
+def benchmark_cohort(users, nights_per_user, worker_counts):
+    """
+    Measure cohort simulation throughput for several process pool sizes.
+    Args:
+        users (int): Number of users in the cohort.
+        nights_per_user (int): Nights simulated for each user.
+        worker_counts (list): Pool sizes to compare.
+    """
+    import cohort_simulation # Imported here so the other benchmarks do not need it.
+
+    parameters = night_generator.sensor_parameters()
+    nights = users * nights_per_user
+    print(f"\nCohort benchmark: {users:,} users x {nights_per_user} nights, {os.cpu_count()} CPUs\n")
+
+    baseline = None
+    for workers in worker_counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            cohort_simulation.simulate_cohort(users, nights_per_user, 0, workers, tmp, parameters)
+            seconds = time.perf_counter() - start
+        baseline = baseline or seconds * workers # Single-worker time, estimated from the first run.
+        print(f"{workers:3d} workers {seconds:9.3f} s {nights / seconds:14,.0f} nights/s "
+              f"{baseline / seconds / workers:8.0%} scaling efficiency")
+
+
+def benchmark_plot(readings, repeats=3):
+    """
+    Compare drawing a full-night raw log with and without min/max downsampling.
+    Args:
+        readings (int): Number of readings in the night, e.g. 288,000 for 8 hours at 10 Hz.
+        repeats (int): Renders per variant; the fastest is reported.
+    """
+    import io # For rendering to memory instead of a file.
+    from matplotlib.figure import Figure # Headless figure, so no GUI backend is needed.
+    from downsampling import minmax_downsample
+
+    rng = np.random.default_rng(0)
+    times = np.arange(readings) / 10
+    values = rng.normal(35, 20, readings)
+    values[rng.integers(0, readings, 20)] = 99 # A few spikes that must survive downsampling.
+    print(f"\nPlot benchmark: {readings:,} readings\n")
+
+    def render(downsample_first):
+        figure = Figure(figsize=(10, 7))
+        axis = figure.subplots()
+        axis.plot(*(minmax_downsample(times, values) if downsample_first else (times, values)))
+        figure.savefig(io.BytesIO(), format="png")
+
+    results = {}
+    for name, downsample_first in (("full series", False), ("min/max downsampled", True)):
+        seconds = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            render(downsample_first)
+            seconds.append(time.perf_counter() - start)
+        results[name] = min(seconds)
+        print(f"{name:<22} {results[name] * 1000:10.1f} ms")
+    print(f"\nSpeed-up: {results['full series'] / results['min/max downsampled']:.1f}x")
+
+
+def benchmark_resample(rows, interval=1.0):
+    """
+    Measure resampling of a synthetic log onto a uniform grid, for each aggregation.
+    Args:
+        rows (int): Number of rows in the synthetic log.
+        interval (float): Grid step in seconds.
+    """
+    import resampling # Imported here so the other benchmarks do not need it.
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sleep_data_synthetic.csv")
+        write_synthetic_log(path, rows)
+        columns = data_validation.load_columns(path)
+    print(f"\nResample benchmark: {rows:,} rows onto a {interval:g} s grid\n")
+
+    for how in resampling.AGGREGATIONS:
+        seconds, peak = measure(resampling.resample, columns, interval, how, "linear")
+        report(f"resample(how={how!r})", seconds, peak, rows)
+
+
+def benchmark_stream(rows):
+    """
+    Compare the bounded-memory streaming summary with loading the whole log and summarising it.
+    Args:
+        rows (int): Number of rows in the synthetic log.
+    """
+    import streaming_statistics # Imported here so the other benchmarks do not need them.
+    import summary_statistics
+
+    def in_memory(path):
+        columns = data_validation.load_columns(path)
+        results = {}
+        for sensor in data_validation.SENSORS:
+            present = ~np.isnan(columns[sensor])
+            values = columns[sensor][present]
+            results[sensor] = summary_statistics.summarise_batch(values, [0, len(values)], columns["time"][present])
+        return results
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sleep_data_synthetic.csv")
+        write_synthetic_log(path, rows)
+        print(f"\nStreaming statistics benchmark: {rows:,} rows, {os.path.getsize(path) / 2**20:.1f} MiB\n")
+
+        stream_seconds, stream_peak = measure(streaming_statistics.stream_statistics, path, data_validation.CHUNK_BYTES, 200, 0)
+        report("streaming, bounded memory", stream_seconds, stream_peak, rows)
+        memory_seconds, memory_peak = measure(in_memory, path)
+        report("load_columns() + summarise", memory_seconds, memory_peak, rows)
+
+        streamed, exact = streaming_statistics.stream_statistics(path, seed=0), in_memory(path)
+        print("\nLargest differences from the in-memory path:")
+        for name in ("mean", "std", "q1", "median", "q3", "max_time"):
+            difference = max(abs(streamed[sensor][name] - float(exact[sensor][name][0])) for sensor in data_validation.SENSORS)
+            print(f"  {name:<9} {difference:.3g}")
+
+
+def benchmark_append(rows, appended_rows):
+    """
+    Measure bringing the validated cache up to date after a logger appends to a large file.
+    Args:
+        rows (int): Rows already in the file and its cache.
+        appended_rows (int): Rows appended before the update.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sleep_data_synthetic.csv")
+        write_synthetic_log(path, rows + appended_rows)
+        with open(path, "rb") as data_csv:
+            data = data_csv.read()
+        cut = 0
+        for _ in range(rows + 1): # Header plus the first `rows` lines.
+            cut = data.index(b"\n", cut) + 1
+        with open(path, "wb") as data_csv:
+            data_csv.write(data[:cut])
+        print(f"\nIncremental validation benchmark: {rows:,} cached rows, {appended_rows:,} appended\n")
+
+        start = time.perf_counter()
+        data_validation.load_validated(path)
+        report("first run (full parse)", time.perf_counter() - start, 0, rows)
+
+        with open(path, "ab") as data_csv:
+            data_csv.write(data[cut:])
+        start = time.perf_counter()
+        data_validation.load_validated(path)
+        seconds = time.perf_counter() - start
+        report("update after append", seconds, 0, appended_rows)
+
+        full_seconds, _ = measure(data_validation.load_columns, path)
+        report("full re-parse", full_seconds, 0, rows + appended_rows)
+        print(f"\nUpdate is {full_seconds / seconds:.0f}x faster than re-parsing the whole file.")
+
+
+IMPORT_MODULES = ("data_validation", "night_generator", "summary_statistics", "data_analysis", "sleep_simulation")
+
+
+def import_times(module):
+    """
+    Import a module in a fresh interpreter under -X importtime.
+    Returns:
+        Cumulative import time of the module and of numpy in seconds, and whether matplotlib was loaded.
+    """
+    import subprocess # Imported here, only this benchmark starts interpreters.
+    import sys
+
+    code = f"import sys, {module}; print('matplotlib' in sys.modules)"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    times = {}
+    for line in result.stderr.splitlines(): # "import time: self [us] | cumulative | imported package"
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                times.setdefault(name.strip(), int(cumulative) / 1e6) # Only the first (top-level) import counts.
+    return times.get(module, 0.0), times.get("numpy", 0.0), result.stdout.strip() == "True"
+
+
+def benchmark_memo(nights=100, repeats=1_000):
+    """
+    Compare cold and hot what-if statistics for the same night: summary statistics of
+    light, sound and temp plus get_mean_std of all four sensors, as sleep_quality() and
+    present_sleep_data() request them.
+    Args:
+        nights (int): Nights to simulate; each is analysed once cold, then repeatedly hot.
+        repeats (int): Hot requests timed per night.
+    """
+    import sleep_simulation # Imported here so the other benchmarks do not need it.
+    from memo_cache import analysis_cache, content_key
+    from summary_statistics import series_arrays, summarise_batch
+
+    list_of_nights = sleep_simulation.generate_nights(nights, seed=0)
+    print(f"\nMemoization benchmark: {nights:,} nights, {repeats:,} hot requests each\n")
+
+    def what_if(night):
+        for sensor in ("light", "sound", "temp"):
+            times, values = series_arrays(night.get_series(sensor))
+            key = ("summary", content_key(values), content_key(times)) # Same key as data_analysis.
+            analysis_cache.get_or_compute(key, lambda: summarise_batch(values, [0, len(values)], times))
+        for sensor in data_validation.SENSORS:
+            sleep_simulation.get_mean_std(night.get_series(sensor))
+
+    analysis_cache.clear()
+    start = time.perf_counter()
+    for night in list_of_nights:
+        what_if(night)
+    cold = (time.perf_counter() - start) / nights
+    start = time.perf_counter()
+    for night in list_of_nights:
+        for _ in range(repeats):
+            what_if(night)
+    hot = (time.perf_counter() - start) / (nights * repeats)
+    print(f"{'cold (computed)':<22} {cold * 1e6:10.1f} µs per night")
+    print(f"{'hot (cached)':<22} {hot * 1e6:10.1f} µs per night")
+    print(f"\nSpeed-up: {cold / hot:.1f}x, cache {analysis_cache.counters()}")
+
+
+def benchmark_import(repeats=5):
+    """
+    Measure the cold-start import time of the library modules, each in a new interpreter.
+    The median of several runs is reported, split into numpy's share and this project's own.
+    Args:
+        repeats (int): Fresh interpreters started per module.
+    """
+    print(f"\nImport benchmark: median of {repeats} cold starts per module\n")
+    print(f"{'module':<20} {'total':>9} {'numpy':>9} {'own':>9}  matplotlib")
+    for module in IMPORT_MODULES:
+        runs = sorted((import_times(module) for _ in range(repeats)), key=lambda run: run[0])
+        total, numpy_seconds, plotting = runs[len(runs) // 2]
+        print(f"{module:<20} {total * 1000:7.1f} ms {numpy_seconds * 1000:6.1f} ms {(total - numpy_seconds) * 1000:6.1f} ms"
+              f"  {'loaded' if plotting else 'not loaded'}")
+
+
+# -------------------- SUITE --------------------
+
+SUITE_SCALES = (1, 100, 1000) # Multiples of the sample CSV's rows and of the 100 simulated nights.
+SUITE_NIGHTS = 100 # Nights simulated at scale 1, as in sleep_simulation.py.
+REGRESSION_THRESHOLD = 0.10 # Slower or larger by more than this fraction counts as a regression.
+NOISE_FLOOR_SECONDS = 0.005 # Timings this short vary too much between runs to flag.
+
+
+def sample_rows(source=data_validation.CSV_PATH):
+    """Return the number of data rows in the sample CSV file."""
+    with open(source, "rb") as source_csv:
+        return sum(1 for line in source_csv if line.strip()) - 1
+
+
+def suite_stages(path, nights):
+    """
+    Build the stages of the pipeline, each as a (name, callable, items) triple.
+    Every stage works on the synthetic log at `path` or on `nights` simulated nights.
+    """
+    import contextlib # For silencing the what-if answers while they are timed.
+    import io
+    import summary_statistics
+    from duration_index import DurationIndex
+    from sleep_simulation import enough_sleep
+
+    columns = data_validation.load_columns(path)
+    rows = len(columns["time"])
+    with open(path, newline='') as data_csv:
+        sound_strings = [row["sound"] for row in csv.DictReader(data_csv)]
+    parameters = night_generator.sensor_parameters(columns)
+    batch = night_generator.simulate_nights(nights, 0, parameters)
+
+    def process_values():
+        data_validation.process_values(sound_strings)
+
+    def validate():
+        data_validation.load_columns(path)
+
+    def analyse():
+        for sensor in data_validation.SENSORS:
+            present = ~np.isnan(columns[sensor])
+            values = columns[sensor][present]
+            summary_statistics.summarise_batch(values, [0, len(values)], columns["time"][present])
+
+    def simulate():
+        night_generator.simulate_nights(nights, 0, parameters)
+
+    def summarise_nights():
+        for sensor in data_validation.SENSORS:
+            summary_statistics.summarise_batch(batch.series[sensor], batch.offsets)
+
+    def what_if():
+        index = DurationIndex(batch.mins_slept)
+        with contextlib.redirect_stdout(io.StringIO()):
+            enough_sleep("benchmark", 8, index)
+        index.rolling_means(7)
+        index.rolling_met_counts(8 * 60, 30)
+
+    return [
+        ("process_values", process_values, rows),
+        ("validate", validate, rows),
+        ("analyse", analyse, rows),
+        ("simulate", simulate, nights),
+        ("summarise_nights", summarise_nights, nights),
+        ("what_if", what_if, nights),
+    ]
+
+
+def run_suite(scales=SUITE_SCALES, repeats=3, stages=None):
+    """
+    Time and memory-profile every pipeline stage at each scale.
+    Args:
+        scales (list): Multiples of the sample CSV and of SUITE_NIGHTS to run at.
+        repeats (int): Timed runs per stage; the fastest is kept.
+        stages (list): Names of the stages to run, all if None.
+    Returns:
+        Dictionary with the environment and one result per stage and scale, ready to save as JSON.
+    """
+    import platform # For describing the machine the results came from.
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": [],
+    }
+    base_rows = sample_rows()
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "sleep_data_synthetic.csv")
+            write_synthetic_log(path, base_rows * scale)
+            for name, function, items in suite_stages(path, SUITE_NIGHTS * scale):
+                if stages and name not in stages:
+                    continue
+                seconds = []
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    function()
+                    seconds.append(time.perf_counter() - start)
+                seconds = min(seconds)
+                tracemalloc.start()
+                function()
+                peak_bytes = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                results["results"].append({"stage": name, "scale": scale, "items": items,
+                                           "seconds": seconds, "peak_bytes": peak_bytes})
+                report(f"{name} x{scale:,}", seconds, peak_bytes, items)
+    return results
+
+
+def compare_results(base, new, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare two saved suite runs stage by stage.
+    Args:
+        base (dict): Earlier results, as saved by run_suite().
+        new (dict): Later results.
+        threshold (float): Fractional slowdown or memory growth that counts as a regression.
+            Slowdowns of stages under NOISE_FLOOR_SECONDS are shown but not flagged.
+    Returns:
+        List of (stage, scale, what) for every regression found.
+    """
+    earlier = {(result["stage"], result["scale"]): result for result in base["results"]}
+    regressions = []
+    print(f"{'stage':<18} {'scale':>7} {'time':>10} {'change':>8} {'memory':>10} {'change':>8}")
+    for result in new["results"]:
+        key = (result["stage"], result["scale"])
+        if key not in earlier:
+            continue
+        old = earlier[key]
+        time_change = result["seconds"] / old["seconds"] - 1
+        memory_change = result["peak_bytes"] / old["peak_bytes"] - 1 if old["peak_bytes"] else 0.0
+        flags = []
+        if time_change > threshold and result["seconds"] > NOISE_FLOOR_SECONDS:
+            flags.append("time")
+        if memory_change > threshold:
+            flags.append("memory")
+        regressions.extend((key[0], key[1], flag) for flag in flags)
+        print(f"{key[0]:<18} {key[1]:>7,} {result['seconds']:9.4f}s {time_change:+8.1%} "
+              f"{result['peak_bytes'] / 2**20:8.1f}MiB {memory_change:+8.1%}  {'REGRESSION' if flags else ''}")
+    return regressions
+
+
+def main():
+    """Parse command line arguments and run the selected benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="CSV parsing and validation")
+    ingest.add_argument("--rows", type=int, default=10_000_000)
+    ingest.add_argument("--skip-legacy", action="store_true")
+
+    simulate = commands.add_parser("simulate", help="night generation")
+    simulate.add_argument("--nights", type=int, default=100_000)
+    simulate.add_argument("--legacy-nights", type=int, default=1_000, help="0 skips the per-night loop")
+
+    log = commands.add_parser("log", help="CSV against binary sensor log loading, and range lookups")
+    log.add_argument("--rows", type=int, default=1_000_000)
+
+    generator = commands.add_parser("generator", help="independent and AR(1) minutes per second")
+    generator.add_argument("--nights", type=int, default=100_000)
+    generator.add_argument("--repeats", type=int, default=3)
+
+    memory = commands.add_parser("night-memory", help="memory used by Night objects")
+    memory.add_argument("--nights", type=int, default=1_000_000)
+    memory.add_argument("--sample-nights", type=int, default=20_000)
+
+    cohort = commands.add_parser("cohort", help="multi-process cohort simulation")
+    cohort.add_argument("--users", type=int, default=10_000)
+    cohort.add_argument("--nights", type=int, default=100)
+    cohort.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+
+    plot = commands.add_parser("plot", help="drawing a long raw log")
+    plot.add_argument("--readings", type=int, default=288_000)
+
+    resample = commands.add_parser("resample", help="resampling onto a uniform grid")
+    resample.add_argument("--rows", type=int, default=10_000_000)
+    resample.add_argument("--interval", type=float, default=1.0)
+
+    stream = commands.add_parser("stream", help="out-of-core streaming statistics")
+    stream.add_argument("--rows", type=int, default=10_000_000)
+
+    append = commands.add_parser("append", help="incremental validation of appended rows")
+    append.add_argument("--rows", type=int, default=5_000_000)
+    append.add_argument("--appended-rows", type=int, default=10_000)
+
+    memo = commands.add_parser("memo", help="cold and hot per-night what-if statistics")
+    memo.add_argument("--nights", type=int, default=100)
+    memo.add_argument("--repeats", type=int, default=1_000)
+
+    imports = commands.add_parser("import", help="cold-start import time of the library modules")
+    imports.add_argument("--repeats", type=int, default=5)
+
+    suite = commands.add_parser("suite", help="every pipeline stage at several sizes, saved as JSON")
+    suite.add_argument("--scales", type=int, nargs="+", default=list(SUITE_SCALES),
+                       help="multiples of the sample data; 10000 needs about 15 GB of memory and 1.3 GB of disk, so pass it explicitly")
+    suite.add_argument("--stages", nargs="+", default=None, help="only run these stages")
+    suite.add_argument("--repeats", type=int, default=3)
+    suite.add_argument("--output", default=None, help="JSON file for the results (default: timestamped name)")
+
+    compare = commands.add_parser("compare", help="flag regressions between two suite runs")
+    compare.add_argument("base", help="earlier results JSON")
+    compare.add_argument("new", help="later results JSON")
+    compare.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="e.g. 0.1 for 10%%")
+
+    args = parser.parse_args()
+    if args.command == "ingest":
+        benchmark_ingest(args.rows, args.skip_legacy)
+    elif args.command == "simulate":
+        benchmark_simulate(args.nights, args.legacy_nights)
+    elif args.command == "log":
+        benchmark_log(args.rows)
+    elif args.command == "generator":
+        benchmark_generator(args.nights, args.repeats)
+    elif args.command == "night-memory":
+        benchmark_night_memory(args.nights, args.sample_nights)
+    elif args.command == "cohort":
+        benchmark_cohort(args.users, args.nights, args.workers)
+    elif args.command == "plot":
+        benchmark_plot(args.readings)
+    elif args.command == "resample":
+        benchmark_resample(args.rows, args.interval)
+    elif args.command == "stream":
+        benchmark_stream(args.rows)
+    elif args.command == "append":
+        benchmark_append(args.rows, args.appended_rows)
+    elif args.command == "memo":
+        benchmark_memo(args.nights, args.repeats)
+    elif args.command == "import":
+        benchmark_import(args.repeats)
+    elif args.command == "suite":
+        results = run_suite(args.scales, args.repeats, args.stages)
+        output = args.output or f"benchmarks-{time.strftime('%Y%m%d-%H%M%S')}.json"
+        with open(output, "w") as results_file:
+            json.dump(results, results_file, indent=2)
+        print(f"\nSaved results to {output}")
+    elif args.command == "compare":
+        with open(args.base) as base_file, open(args.new) as new_file:
+            regressions = compare_results(json.load(base_file), json.load(new_file), args.threshold)
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}." if regressions else "\nNo regressions.")
+        raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
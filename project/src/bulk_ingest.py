@@ -0,0 +1,216 @@
+"""
+Bulk ingest: validate many devices' raw logs across a pool of processes and merge them into
+one columnar dataset, every reading tagged with the device and night it came from.
+
+Each file is one device's log of one night, as a raw CSV or a binary sensor log (.slog).
+The device and night are read from the path:
+
+    logs/unit042_2024-03-01.csv     -> device "unit042", night "2024-03-01"
+    logs/unit042/2024-03-01.csv     -> device "unit042", night "2024-03-01" (no "_" in the name)
+
+A file that cannot be read or validated is reported with its error and left out; the rest
+of the run carries on.
+"""
+
+import glob # For expanding file patterns.
+import os # For paths and CPU counts.
+import shutil # For removing shards once they are merged.
+from concurrent.futures import ProcessPoolExecutor # For validating on every core.
+
+import numpy as np # For the merged columns.
+from data_validation import (SENSORS, load_columns, open_column_files, read_column_meta, write_column_files,
+                             write_column_meta) # Validation rules and column file storage.
+from instrumentation import span # Times the worker pool and the merge.
+from sensor_log import LOG_EXTENSION # Binary logs are ingested alongside CSV files.
+
+LOG_PATTERNS = ("*.csv", "*" + LOG_EXTENSION) # Files picked up when a directory is given.
+CHUNKS_PER_WORKER = 4 # Several shards per worker keep every core busy until the end.
+DATASET_COLUMNS = ("time",) + SENSORS + ("device_id", "night_id") # Column files of a merged dataset.
+DATASET_DTYPES = dict({"time": np.float64, "device_id": np.int32, "night_id": np.int32},
+                      **{sensor: np.float32 for sensor in SENSORS}) # As load_columns() returns them.
+
+
+def find_logs(sources):
+    """
+    List the log files named by directories (searched recursively) and glob patterns.
+    Args:
+        sources (list): Directories, file paths or glob patterns.
+    Returns:
+        Sorted list of unique file paths.
+    """
+    paths = set()
+    for source in sources:
+        if os.path.isdir(source):
+            for pattern in LOG_PATTERNS:
+                paths.update(glob.glob(os.path.join(source, "**", pattern), recursive=True))
+        else:
+            paths.update(path for path in glob.glob(source, recursive=True) if os.path.isfile(path))
+    return sorted(paths)
+
+
+def file_tags(path):
+    """
+    Read the device and night a log file belongs to from its path.
+    Args:
+        path: Path to the log file.
+    Returns:
+        device, night: Labels as strings.
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    device, separator, night = stem.rpartition("_")
+    if separator and device:
+        return device, night
+    return os.path.basename(os.path.dirname(os.path.abspath(path))), stem # Device folder, one file per night.
+
+
+def ingest_files(files, shard_folder):
+    """
+    Validate a group of files and write their readings, tagged, to a shard on disk.
+    Runs inside a worker process; only the shard's path and a line per file travel back.
+    Args:
+        files (list): (path, device ID, night ID) of each file.
+        shard_folder: Folder the shard is written to.
+    Returns:
+        shard_folder, results: results holds (path, rows, error) per file; error is None on success.
+    """
+    parts, results = [], []
+    for path, device_id, night_id in files:
+        try:
+            columns = load_columns(path) # Straight from the file: no per-file cache next to every log.
+        except Exception as error: # One bad file must never stop the others.
+            results.append((path, 0, f"{type(error).__name__}: {error}"))
+            continue
+        rows = len(columns["time"])
+        columns["device_id"] = np.full(rows, device_id, dtype=np.int32)
+        columns["night_id"] = np.full(rows, night_id, dtype=np.int32)
+        parts.append(columns)
+        results.append((path, rows, None))
+
+    merged = {name: np.concatenate([part[name] for part in parts]) if parts else np.empty(0, dtype=DATASET_DTYPES[name])
+              for name in DATASET_COLUMNS}
+    write_column_files(shard_folder, merged, {"rows": len(merged["time"])})
+    return shard_folder, results
+
+
+def merge_shards(shard_folders, output_folder, meta, renumber=None):
+    """
+    Append the shards' column files into one dataset, one shard in memory at a time.
+    Every column is written, empty if there are no shards.
+    Args:
+        shard_folders (list): Shard folders, in file order.
+        output_folder: Folder for the merged dataset.
+        meta (dict): Dataset metadata; the column descriptions are added and it is saved.
+        renumber (dict): Optional array per ID column mapping the workers' IDs to the dataset's.
+    """
+    meta["columns"] = {name: {"dtype": np.dtype(DATASET_DTYPES[name]).str, "length": 0} for name in DATASET_COLUMNS}
+    files = {name: open(os.path.join(output_folder, f"{name}.bin"), "wb") for name in DATASET_COLUMNS}
+    try:
+        for folder in shard_folders:
+            shard_meta = read_column_meta(folder)
+            for name, values in open_column_files(folder, shard_meta).items():
+                if renumber and name in renumber:
+                    values = renumber[name][values].astype(DATASET_DTYPES[name])
+                files[name].write(np.ascontiguousarray(values).tobytes())
+                meta["columns"][name]["length"] += len(values)
+    finally:
+        for column_file in files.values():
+            column_file.close()
+    write_column_meta(output_folder, meta)
+
+
+def ingest(sources, output_folder, workers=None):
+    """
+    Validate every log file across a process pool and merge them into one dataset.
+    Args:
+        sources (list): Directories, file paths or glob patterns, as for find_logs().
+        output_folder: Folder for the dataset's column files, created if needed.
+        workers (int): Number of worker processes, defaults to the number of CPUs.
+    Returns:
+        Dataset metadata: rows, devices and nights (labels indexed by device_id and
+        night_id, only those with readings), and per-file results with any errors.
+    """
+    paths = find_logs(sources)
+    tags = [file_tags(path) for path in paths]
+    devices = sorted({device for device, _ in tags})
+    nights = sorted({night for _, night in tags})
+    device_ids = {device: index for index, device in enumerate(devices)}
+    night_ids = {night: index for index, night in enumerate(nights)}
+    files = [(path, device_ids[device], night_ids[night]) for path, (device, night) in zip(paths, tags)]
+
+    workers = workers or os.cpu_count() or 1
+    chunk = max(1, -(-len(files) // (workers * CHUNKS_PER_WORKER))) # Files per shard, rounded up.
+    shard_root = os.path.join(output_folder, "shards")
+    os.makedirs(output_folder, exist_ok=True)
+
+    try:
+        # Workers are separate processes, so the trace shows the whole ingest as one stage.
+        with span("ingest.files", items=len(files)), ProcessPoolExecutor(workers) as pool:
+            futures = [pool.submit(ingest_files, files[first:first + chunk], os.path.join(shard_root, f"{first // chunk:06d}"))
+                       for first in range(0, len(files), chunk)]
+            shards = [future.result() for future in futures]
+
+        results = [result for _, shard_results in shards for result in shard_results]
+        ingested = [tag for (_, _, error), tag in zip(results, tags) if error is None]
+
+        # Only devices and nights with at least one ingested file keep a label; IDs are renumbered to match.
+        renumber, labels = {}, {}
+        for column, position, ids in (("device_id", 0, device_ids), ("night_id", 1, night_ids)):
+            kept = sorted({tag[position] for tag in ingested})
+            renumber[column] = np.full(len(ids), -1, dtype=np.int64)
+            renumber[column][[ids[label] for label in kept]] = np.arange(len(kept))
+            labels[column] = kept
+
+        meta = {
+            "rows": sum(rows for _, rows, _ in results),
+            "devices": labels["device_id"],
+            "nights": labels["night_id"],
+            "files": [{"path": path, "device": device, "night": night, "rows": rows, "error": error}
+                      for (path, rows, error), (device, night) in zip(results, tags)],
+        }
+        with span("ingest.merge", items=meta["rows"]):
+            merge_shards([folder for folder, _ in shards], output_folder, meta, renumber)
+    finally:
+        shutil.rmtree(shard_root, ignore_errors=True) # Also after a failed worker.
+    return meta
+
+
+def load_dataset(folder):
+    """
+    Memory-map a dataset written by ingest().
+    Returns:
+        columns, meta: Memory-mapped columns (time, each sensor, device_id, night_id) and the metadata.
+    """
+    meta = read_column_meta(folder)
+    if meta is None:
+        raise FileNotFoundError(f"No ingested dataset in {folder}.")
+    return open_column_files(folder, meta), meta
+
+
+def main():
+    """Ingest a directory or glob of device logs from the command line and report throughput."""
+    import argparse # For the command line interface; imported here so importing the module stays fast.
+    import time # For throughput reporting.
+
+    parser = argparse.ArgumentParser(description="Validate many devices' raw logs in parallel into one dataset.")
+    parser.add_argument("sources", nargs="+", help="directories (searched recursively) or glob patterns of log files")
+    parser.add_argument("--output", required=True, help="folder to write the merged dataset to")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all CPUs)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    meta = ingest(args.sources, args.output, args.workers)
+    seconds = time.perf_counter() - start
+    if not meta["files"]:
+        parser.error(f"no log files found in {' '.join(args.sources)} (wrote an empty dataset to {args.output})")
+
+    failed = [entry for entry in meta["files"] if entry["error"]]
+    for entry in failed:
+        print(f"FAILED {entry['path']}: {entry['error']}")
+    files = len(meta["files"])
+    print(f"Ingested {files - len(failed):,} of {files:,} files ({meta['rows']:,} rows) from "
+          f"{len(meta['devices']):,} devices and {len(meta['nights']):,} nights in {seconds:.2f} s - "
+          f"{files / seconds:,.1f} files/s, {meta['rows'] / seconds:,.0f} rows/s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+""" Simulate nights of sleep for a whole cohort of users, spread across a pool of processes. """
+
+import os # For shard and output paths.
+import shutil # For removing shards once they are merged.
+import tempfile # For the default output folder.
+from concurrent.futures import ProcessPoolExecutor # For running workers on every core.
+
+import numpy as np # For seeding and array storage.
+from data_validation import SENSORS, write_column_meta # Sensor names and column file storage.
+from night_generator import (SERIES_DTYPE, NightBatch, load_batch, save_batch, sensor_parameters, simulate_nights,
+                             user_seed)
+
+NIGHTS_PER_USER = 100 # Same number of nights per user as sleep_simulation.py.
+CHUNKS_PER_WORKER = 4 # Several chunks per worker keep every core busy until the end.
+BATCH_COLUMNS = ("mins_slept", "night_ids", "user_ids") + SENSORS # Column files of a saved NightBatch.
+
+
+def simulate_users(first_user, user_seeds, nights_per_user, parameters, shard_folder):
+    """
+    Simulate a contiguous range of users and write their nights to a shard on disk.
+    Runs inside a worker process; only the shard's path and size travel back to the parent.
+    Args:
+        first_user (int): User ID of the first user in the range.
+        user_seeds (list): One np.random.SeedSequence per user in the range.
+        nights_per_user (int): Number of nights to simulate for each user.
+        parameters (dict): Per-sensor (mean, std), from sensor_parameters().
+        shard_folder: Folder the shard is written to.
+    Returns:
+        shard_folder, number of nights, number of minutes
+    """
+    batches = [simulate_nights(nights_per_user, seed, parameters) for seed in user_seeds]
+
+    mins_slept = np.concatenate([batch.mins_slept for batch in batches])
+    series = {sensor: np.concatenate([batch.series[sensor] for batch in batches]) for sensor in SENSORS}
+    user_ids = np.repeat(np.arange(first_user, first_user + len(user_seeds)), nights_per_user)
+    night_ids = np.tile(np.arange(1, nights_per_user + 1), len(user_seeds))
+
+    save_batch(NightBatch(mins_slept, series, night_ids, user_ids), shard_folder)
+    return shard_folder, len(mins_slept), int(mins_slept.sum())
+
+
+def merge_shards(shard_folders, output_folder):
+    """
+    Append the shards' column files into one saved batch, one shard in memory at a time.
+    Args:
+        shard_folders (list): Shard folders, in user order.
+        output_folder: Folder for the merged batch.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    meta = {"nights": 0, "minutes": 0, "columns": {}}
+    files = {name: open(os.path.join(output_folder, f"{name}.bin"), "wb") for name in BATCH_COLUMNS}
+    try:
+        for folder in shard_folders:
+            shard = load_batch(folder)
+            columns = {"mins_slept": shard.mins_slept, "night_ids": shard.night_ids, "user_ids": shard.user_ids}
+            columns.update(shard.series)
+            for name in BATCH_COLUMNS:
+                files[name].write(np.ascontiguousarray(columns[name]).tobytes())
+                info = meta["columns"].setdefault(name, {"dtype": columns[name].dtype.str, "length": 0})
+                info["length"] += len(columns[name])
+            meta["nights"] += len(shard)
+            meta["minutes"] += int(shard.offsets[-1])
+    finally:
+        for column_file in files.values():
+            column_file.close()
+    write_column_meta(output_folder, meta)
+
+
+def simulate_cohort(number_of_users, nights_per_user=NIGHTS_PER_USER, seed=None, workers=None,
+                    output_folder=None, parameters=None):
+    """
+    Simulate every user's nights across a process pool.
+    Each user draws from their own stream, night_generator.user_seed(), so the result depends
+    only on the seed - never on the number of workers or how users are split.
+    Args:
+        number_of_users (int): Number of users in the cohort.
+        nights_per_user (int): Number of nights to simulate for each user.
+        seed (int): Seed of the whole cohort, for reproducible runs.
+        workers (int): Number of worker processes, defaults to the number of CPUs.
+        output_folder: Where to keep the merged column files. If not given, the result is
+            read into memory and the temporary files are removed.
+        parameters (dict): Per-sensor (mean, std), computed once with sensor_parameters() if not given.
+    Returns:
+        NightBatch of every user's nights, ordered by user then night, with user IDs from 1.
+    """
+    if number_of_users == 0:
+        batch = empty_batch()
+        if output_folder is not None:
+            save_batch(batch, os.path.join(output_folder, "cohort")) # Same layout as a non-empty cohort.
+        return batch
+    workers = workers or os.cpu_count() or 1
+    parameters = sensor_parameters() if parameters is None else parameters
+    entropy = np.random.SeedSequence(seed).entropy # Fresh entropy when seed is None.
+    user_seeds = [user_seed(entropy, user_id) for user_id in range(1, number_of_users + 1)]
+
+    work_folder = tempfile.mkdtemp(prefix="cohort-") if output_folder is None else output_folder
+    shard_root = os.path.join(work_folder, "shards")
+    chunk = max(1, -(-number_of_users // (workers * CHUNKS_PER_WORKER))) # Users per shard, rounded up.
+
+    try:
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [
+                pool.submit(simulate_users, first + 1, user_seeds[first:first + chunk], nights_per_user,
+                            parameters, os.path.join(shard_root, f"{first // chunk:06d}"))
+                for first in range(0, number_of_users, chunk)
+            ]
+            shard_folders = [future.result()[0] for future in futures]
+
+        merge_shards(shard_folders, os.path.join(work_folder, "cohort"))
+        batch = load_batch(os.path.join(work_folder, "cohort"))
+
+        if output_folder is None:
+            # Copy out of the temporary files before deleting them.
+            series = {sensor: np.array(batch.series[sensor]) for sensor in SENSORS}
+            batch = NightBatch(np.array(batch.mins_slept), series, np.array(batch.night_ids), np.array(batch.user_ids))
+    finally:
+        # Shards never outlive the run, and nor does the temporary folder, even if a worker fails.
+        shutil.rmtree(shard_root, ignore_errors=True)
+        if output_folder is None:
+            shutil.rmtree(work_folder, ignore_errors=True)
+    return batch
+
+
+def empty_batch():
+    """Return a NightBatch with no nights, typed like a simulated one."""
+    series = {sensor: np.empty(0, dtype=SERIES_DTYPE) for sensor in SENSORS}
+    return NightBatch(np.empty(0, dtype=np.int64), series, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+
+
+def main():
+    """Simulate a cohort from the command line and report throughput."""
+    import argparse # For the command line interface; imported here so importing the module stays fast.
+    import time # For throughput reporting.
+
+    parser = argparse.ArgumentParser(description="Simulate nights of sleep for a cohort of users.")
+    parser.add_argument("--users", type=int, default=1_000, help="number of users")
+    parser.add_argument("--nights", type=int, default=NIGHTS_PER_USER, help="nights per user")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible cohorts")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all CPUs)")
+    parser.add_argument("--output", default=None, help="folder to keep the simulated nights in")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    batch = simulate_cohort(args.users, args.nights, args.seed, args.workers, args.output)
+    seconds = time.perf_counter() - start
+    print(f"Simulated {len(batch):,} nights ({batch.offsets[-1]:,} minutes) for {args.users:,} users "
+          f"in {seconds:.2f} s - {len(batch) / seconds:,.0f} nights/s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,57 @@
 """ Step 2: Analyse processed sleep data and provide insights and recommendations. """
 
-import numpy as np # For numerical operations.
-import matplotlib.pyplot as plt # For plotting graphs.
+import functools # For validating the data once, on first use.
+
 from data_validation import main as validate_data # Import function from the data_validation module.
+from summary_statistics import series_arrays, summarise_batch # Single-sort statistics kernel.
+from downsampling import downsample # Thins the raw log's plots.
+from instrumentation import traced # Times plotting and analysis.
+from memo_cache import analysis_cache, content_key # Summaries keyed on the readings' contents.
+
+DATA_NAMES = ("light_dict", "sound_dict", "temp_dict", "movement_dict") # Validated dictionaries, in order.
+
+
+@functools.cache
+def validated_data():
+    """
+    Validate the raw data on first use and reuse the result afterwards, so importing this module stays cheap.
+    Returns:
+        light_dict, sound_dict, temp_dict, movement_dict
+    """
+    return validate_data()
+
 
-light_dict, sound_dict, temp_dict, movement_dict = validate_data() # Unpack dictionaries.
+def __getattr__(name):
+    """Keep data_analysis.light_dict (and the other dictionaries) working, validating only when first read."""
+    if name in DATA_NAMES:
+        return validated_data()[DATA_NAMES.index(name)]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-def plot_graph(row, column, title, xlabel, ylabel):
+@traced("plot.graph")
+def plot_graph(row, column, title, xlabel, ylabel, cache_key=None):
     """
     Plot a simple graph with given parameters.
+    Long series are downsampled to their per-bucket minima and maxima first, so peaks stay visible.
     Args: 
         row: x-axis data.
         column: y-axis data.
         title: Title of the graph.
         xlabel: Label for the x-axis.
         ylabel: Label for the y-axis.
+        cache_key: Optional name of the series, to reuse its downsampled points on later plots.
     """
-    plt.plot(row, column)
+    import matplotlib.pyplot as plt # Imported on first plot, so analysis without graphs never loads matplotlib.
+
+    plt.plot(*downsample(row, column, key=cache_key))
     plt.title(title)
     plt.xlabel(xlabel)
     plt.ylabel(ylabel)
     plt.show()
+    plt.close() # Free the figure once shown, so figures don't pile up in long or headless runs.
     
 
+@traced("analyse.data")
 def analyse_data(dictionary, measuring, time_interval = "mins"): 
     """Analyze sleep data and display insights.
 
@@ -35,21 +63,24 @@ def analyse_data(dictionary, measuring, time_interval = "mins"):
     Returns:
         mean_value, standard_deviation
     """
-    arr = np.array(list(dictionary.values()))
+    times, arr = series_arrays(dictionary) # Times and values as arrays, without copying array-backed series.
+    key = ("summary", content_key(arr), content_key(times)) # Same readings, same statistics - wherever they come from.
+    # Every statistic below comes from this one call, made once per distinct series.
+    stats = analysis_cache.get_or_compute(key, lambda: summarise_batch(arr, [0, len(arr)], times))
 
     # Measures of central tendency.
-    mean_val = np.mean(arr) # mean value, affected by outliers
-    median_val = np.median(arr) # median value, not affected by outliers
+    mean_val = stats["mean"][0] # mean value, affected by outliers
+    median_val = stats["median"][0] # median value, not affected by outliers
 
     # Measures of dispersion.
-    standard_deviation = np.std(arr) # standard deviation
-    first_quarter = np.percentile(arr, 25) # 1/4 of values
-    third_quarter = np.percentile(arr, 75) # 3/4 of values
-    interquartile_range = third_quarter - first_quarter # IQR of values
+    standard_deviation = stats["std"][0] # standard deviation
+    first_quarter = stats["q1"][0] # 1/4 of values
+    third_quarter = stats["q3"][0] # 3/4 of values
+    interquartile_range = stats["iqr"][0] # IQR of values
 
     # Outliers.
-    min_value = np.min(arr) # min value
-    max_value = np.max(arr) # max value
+    min_value = stats["min"][0] # min value
+    max_value = stats["max"][0] # max value
 
     # Define units based on the type of measurement.
     units = {
@@ -75,9 +106,7 @@ def analyse_data(dictionary, measuring, time_interval = "mins"):
     # Check if the maximum value is outside the normal range.
     if max_value > third_quarter:
         # Get the time corresponding to the maximum value.
-        corresponding_time = max(
-            dictionary.items(), key=lambda x: x[1] # Finds the key (time) corresponding to the max value
-        )[0]
+        corresponding_time = stats["max_time"][0] # Time of the first reading equal to the max value
 
         # Print a warning message if the maximum value is outside the normal range.
         print(
@@ -95,11 +124,12 @@ def analyse_data(dictionary, measuring, time_interval = "mins"):
 
     # Plot the graph of the measurement levels over time.
     plot_graph(
-        dictionary.keys(),
-        dictionary.values(),
+        times,
+        arr,
         f"{measuring.capitalize()} Level vs Time",
         f"Time ({time_interval})",
-        f"{measuring.capitalize()} Level ({unit})"
+        f"{measuring.capitalize()} Level ({unit})",
+        cache_key=key # Redrawing the same series reuses its downsampled points.
     )
         
     return mean_val, standard_deviation # Return the mean and standard deviation - this is used to simulate sleep data in sleep_simulation.py
@@ -108,6 +138,8 @@ def analyse_data(dictionary, measuring, time_interval = "mins"):
 
 def main():
     """Execute sleep data analysis and display results."""
+    light_dict, sound_dict, temp_dict, movement_dict = validated_data() # Unpack dictionaries.
+
     print("----------- Statistics for light values ----------") 
     light_mean, light_std = analyse_data(light_dict, "light", "s")
     print("\nSee graph for light level vs time.\n")
@@ -1,10 +1,35 @@
 """ Step 1: Validate and store raw sensor data generated by the micro:bit sleep tracker. """ 
 
+import contextlib # For the cache lock.
 import csv # For processing CSV files.
+import hashlib # For fingerprinting the raw data file's contents.
+import json # For storing cache metadata.
+import os # For file paths and cache housekeeping.
+import shutil # For deleting stale caches.
+
+try:
+    import fcntl # For locking the cache while it is updated (POSIX).
+except ImportError:
+    fcntl = None
+    import msvcrt # The Windows equivalent.
+
+import numpy as np # For columnar, vectorised parsing and validation.
+from instrumentation import count, span, traced # Timings and row counts of parsing, validation and cache updates.
+
+# Validation rules and file layout, shared by the dictionary and columnar code paths.
+CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "sleep_data_raw.csv")
+TIME_COLUMN = "Time (seconds)" # Header of the timestamp column in the raw CSV file.
+SENSORS = ("light", "sound", "temp", "movement") # Sensor columns, in the order main() returns them.
+MAX_SOUND_DB = 80 # Sound readings above this are invalid.
+TEMP_OFFSET = 3 # The micro:bit reads 3 degrees above room temperature.
+CHUNK_BYTES = 1 << 20 # Parse the CSV in ~1 MB blocks to keep temporary arrays small.
+CACHE_DIR_NAME = ".sleep_cache" # Validated columns are cached in this folder next to the CSV file.
+CACHE_VERSION = 2 # Bump whenever the cached layout changes.
 
 # Define functions to validate and store data gathered from the embedded system.
 
 
+@traced("validate.process_values")
 def process_values(input_list): 
     """
     Convert numerical values to integers and preserve empty strings.
@@ -24,6 +49,7 @@ def process_values(input_list):
     return return_list # Return processed list.
 
 
+@traced("validate.remove_pairs")
 def remove_pairs(input_dict): 
     """
     Remove key:value pairs where value is an empty string.
@@ -41,6 +67,7 @@ def remove_pairs(input_dict):
     return return_dict # Return the processed dictionary.
 
 
+@traced("validate.filter_sound_readings")
 def filter_sound_readings(input_dict): 
     """
     Remove invalid sound readings over 80 dB.
@@ -52,60 +79,561 @@ def filter_sound_readings(input_dict):
     return_dict = {} # Create an empty dictionary to store valid sound readings.
 
     for key, value in input_dict.items():
-        if value <= 80: 
+        if value <= MAX_SOUND_DB: 
             return_dict[key] = value
     return return_dict
 
 
-def main():
-    """ Execute the data validation and storage process. """
+def parse_csv_chunk(buffer, column_order):
+    """
+    Parse a block of complete CSV lines into a 2D float array in one vectorised pass.
+    Args:
+        buffer: bytes-like object holding whole lines, each ending with a newline.
+        column_order: Index of each output column (time, then SENSORS) within a CSV row.
+    Returns:
+        Array of shape (rows, 5) with empty cells set to NaN. Blank lines are skipped, as csv.DictReader does.
+    """
+    arr = np.frombuffer(buffer, dtype=np.uint8)
+    ncols = len(column_order)
+
+    # Drop blank lines ("\n" or "\r\n") before splitting fields; most blocks have none, and are not copied.
+    line_ends = np.flatnonzero(arr == ord("\n"))
+    line_starts = np.concatenate(([0], line_ends[:-1] + 1)) if line_ends.size else line_ends
+    blank = (line_ends == line_starts) | ((line_ends == line_starts + 1) & (arr[line_starts] == ord("\r")))
+    if blank.any():
+        dropped = np.zeros(arr.size + 1, dtype=np.int64)
+        np.add.at(dropped, line_starts[blank], 1)
+        np.add.at(dropped, line_ends[blank] + 1, -1)
+        arr = arr[np.cumsum(dropped[:-1]) == 0]
+    if arr.size == 0:
+        return np.empty((0, ncols))[:, column_order]
+
+    # Every comma or newline ends a field, so field boundaries come straight from their positions.
+    ends = np.flatnonzero((arr == ord(",")) | (arr == ord("\n")))
+    if ends.size % ncols != 0:
+        raise ValueError(f"Malformed CSV block: expected {ncols} fields per row.")
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    lengths = ends - starts
+    lengths[(lengths > 0) & (arr[ends - 1] == ord("\r"))] -= 1 # Ignore Windows line endings.
+
+    # Gather the non-empty fields into a fixed-width byte matrix and let NumPy convert them in C.
+    filled = np.flatnonzero(lengths)
+    values = np.full(ends.size, np.nan)
+    if filled.size:
+        width = int(lengths[filled].max())
+        padded = np.concatenate([arr, np.zeros(width, dtype=np.uint8)])
+        chars = padded[starts[filled, None] + np.arange(width)]
+        chars[np.arange(width) >= lengths[filled, None]] = 0 # Null bytes terminate each field.
+        values[filled] = chars.view(f"S{width}").ravel().astype(np.float64)
+
+    return values.reshape(-1, ncols)[:, column_order]
+
+
+def read_header(data_csv):
+    """
+    Read the header line of an open raw CSV file.
+    Args:
+        data_csv: Binary file object positioned at the start of the file.
+    Returns:
+        Index of each output column (time, then SENSORS) within a CSV row.
+    """
+    header = next(csv.reader([data_csv.readline().decode()]))
+    return [header.index(name) for name in (TIME_COLUMN,) + SENSORS]
+
+
+def iter_csv_blocks(data_csv, column_order, chunk_bytes=CHUNK_BYTES, limit=None):
+    """
+    Parse an open raw CSV file block by block, never splitting a line.
+    Args:
+        data_csv: Binary file object positioned after the header.
+        column_order: Column indices returned by read_header().
+        chunk_bytes: Approximate size of each block passed to parse_csv_chunk().
+        limit (int): Stop after this many bytes from the current position. Reads to the end if None.
+    Yields:
+        Arrays of shape (rows, 5) as returned by parse_csv_chunk().
+    """
+    leftover = b""
+    while True:
+        size = chunk_bytes if limit is None else min(chunk_bytes, limit)
+        data = data_csv.read(size) if size else b""
+        if not data:
+            break
+        if limit is not None:
+            limit -= len(data)
+        data = leftover + data
+        cut = data.rfind(b"\n") + 1 # Only parse complete lines, carry the rest over.
+        leftover = data[cut:]
+        if cut:
+            yield parse_csv_chunk(data[:cut], column_order)
+    if leftover.strip():
+        yield parse_csv_chunk(leftover + b"\n", column_order) # Final line without a newline.
+
+
+def blocks_to_columns(blocks):
+    """
+    Join parsed blocks into one typed array per column.
+    Args:
+        blocks: Iterable of arrays returned by parse_csv_chunk().
+    Returns:
+        Dictionary with a float64 'time' array and a float32 array per sensor, NaN where empty.
+    """
+    times, readings = [], []
+    for block in blocks:
+        times.append(block[:, 0].copy())
+        readings.append(block[:, 1:].astype(np.float32)) # Narrow each block before the next one is parsed.
+
+    readings = np.concatenate(readings) if readings else np.empty((0, len(SENSORS)), dtype=np.float32)
+    columns = {"time": np.concatenate(times) if times else np.empty(0)}
+    for index, sensor in enumerate(SENSORS):
+        columns[sensor] = np.ascontiguousarray(readings[:, index])
+    return columns
+
+
+def read_columns(path=CSV_PATH):
+    """
+    Read the raw CSV file into typed columns without validating them.
+    Args:
+        path: Path to the raw CSV file.
+    Returns:
+        Dictionary with a float64 'time' array and a float32 array per sensor, NaN where empty.
+    """
+    with span("validate.parse_csv") as stage, open(path, "rb") as data_csv:
+        column_order = read_header(data_csv)
+        columns = blocks_to_columns(iter_csv_blocks(data_csv, column_order))
+        stage.add_items(len(columns["time"]))
+    count("validate.rows_parsed", len(columns["time"]))
+    return columns
+
+
+@traced("validate.rules")
+def validate_columns(columns):
+    """
+    Apply the validation rules to typed columns as array masks.
+    Args:
+        columns: Dictionary returned by read_columns().
+    Returns:
+        Dictionary of validated columns; invalid or empty readings are NaN.
+    """
+    validated = dict(columns)
+    for sensor in SENSORS:
+        validated[sensor] = validate_values(sensor, columns[sensor])
+    return validated
+
+
+def validate_values(sensor, values):
+    """
+    Apply the validation rules to one sensor's readings as array operations.
+    Args:
+        sensor (str): Name of the sensor the readings came from.
+        values (np.ndarray): float32 readings, NaN where empty.
+    Returns:
+        Validated readings as a new array (or the same one if no rule applies); invalid ones are NaN.
+    """
+    if sensor == "sound":
+        values = values.copy()
+        values[values > MAX_SOUND_DB] = np.nan # Filter out invalid sound readings (NaN compares False).
+    elif sensor == "temp":
+        values = values - TEMP_OFFSET # Adjust temperature readings, NaN stays NaN.
+    return values
+
+
+def validate_reading(sensor, value):
+    """
+    Apply the validation rules to a single reading, for data arriving one record at a time.
+    Args:
+        sensor (str): Name of the sensor the reading came from.
+        value (float): The raw reading.
+    Returns:
+        The validated reading, or None if it is invalid.
+    """
+    if sensor == "sound" and value > MAX_SOUND_DB:
+        return None # Same rule as validate_columns(), which sets these readings to NaN.
+    if sensor == "temp":
+        return value - TEMP_OFFSET
+    return value
+
+
+def load_columns(path=CSV_PATH):
+    """
+    Read and validate the raw CSV file (or a binary sensor log) into typed columns in memory.
+    A sensor log too large for memory is validated block by block with
+    sensor_log.SensorLog.validated_blocks() instead.
+    Args:
+        path: Path to the raw CSV file or sensor log.
+    Returns:
+        Dictionary with a float64 'time' array and a NaN-aware float32 array per sensor.
+    """
+    from sensor_log import SensorLog, is_sensor_log # Imported here, as sensor_log builds on this module.
+
+    if is_sensor_log(path):
+        return validate_columns(SensorLog(path).columns()) # Already binary: nothing to parse or cache.
+    return validate_columns(read_columns(path))
+
+
+@traced("validate.to_dict")
+def column_to_dict(columns, sensor):
+    """
+    Convert one validated sensor column into the time:value dictionary used by the analysis scripts.
+    Args:
+        columns: Dictionary returned by load_columns().
+        sensor: Name of the sensor column to convert.
+    Returns:
+        Dictionary pairing float timestamps with integer readings, empty readings removed.
+    """
+    values = columns[sensor]
+    present = ~np.isnan(values)
+    return dict(zip(columns["time"][present].tolist(), values[present].astype(np.int64).tolist()))
+
+
+# -------------------- VALIDATED DATA CACHE --------------------
+
+def cache_dir(path=CSV_PATH):
+    """
+    Return the folder holding the cached columns for a raw CSV file.
+    Args:
+        path: Path to the raw CSV file.
+    Returns:
+        Path of the cache folder, unique to the file's absolute path.
+    """
+    path = os.path.abspath(path)
+    key = hashlib.blake2b(path.encode(), digest_size=8).hexdigest()
+    return os.path.join(os.path.dirname(path), CACHE_DIR_NAME, f"{os.path.basename(path)}-{key}")
+
+
+def fingerprint(path, offset):
+    """
+    Hash every byte of a file before an offset, so any edit to the validated part is caught,
+    even one that keeps the file's size. Hashing runs at about 1 GB/s, far quicker than parsing.
+    Args:
+        path: Path to the raw CSV file.
+        offset (int): Checkpoint offset; only bytes before it are read.
+    Returns:
+        Hex digest of the file's first offset bytes.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as data_file:
+        remaining = offset
+        while remaining > 0:
+            data = data_file.read(min(CHUNK_BYTES, remaining))
+            if not data:
+                break
+            digest.update(data)
+            remaining -= len(data)
+    return digest.hexdigest()
 
-    # Create empty lists - these will be populated with data from the csv file.
-    times = []
-    light, sound, temp, movement = [], [], [], []
 
-    # Read from the CSV file, containing raw sleep tracking data. 
-    with open("project/data/sleep_data_raw.csv", newline='') as data_csv:
-        csv_reader = csv.DictReader(data_csv, delimiter=",")
-        
-        # Populating times and logger lists
-        for row in csv_reader:
-            times.append(row['Time (seconds)'])
-            light.append(row['light'])
-            sound.append(row['sound'])
-            temp.append(row['temp'])
-            movement.append(row['movement'])
+def cache_key(path):
+    """
+    Describe the source file and validation rules a cache was built from.
+    Args:
+        path: Path to the raw CSV file.
+    Returns:
+        Dictionary with the file's path, inode, size and mtime, and the rule settings.
+    """
+    stat = os.stat(path)
+    return {
+        "version": CACHE_VERSION,
+        "path": os.path.abspath(path),
+        "inode": stat.st_ino, # Changes when a logger rotates the file and starts a new one.
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "rules": [MAX_SOUND_DB, TEMP_OFFSET],
+    }
+
+
+def write_column_files(folder, columns, meta):
+    """
+    Store columns as raw binary files plus a meta.json describing them.
+    Args:
+        folder: Folder to write to, created if needed.
+        columns (dict): Maps each column name to a 1D array.
+        meta (dict): Extra metadata saved alongside the column descriptions.
+    """
+    os.makedirs(folder, exist_ok=True)
+    meta = dict(meta, columns={})
+    for name, values in columns.items():
+        values = np.ascontiguousarray(values)
+        values.tofile(os.path.join(folder, f"{name}.bin"))
+        meta["columns"][name] = {"dtype": values.dtype.str, "length": len(values)}
+
+    write_column_meta(folder, meta) # Written last, so half-written files are never mistaken for valid ones.
+
+
+def write_column_meta(folder, meta):
+    """
+    Atomically write the meta.json describing a folder of column files.
+    Args:
+        folder: Folder holding the column files.
+        meta (dict): Metadata, including a 'columns' entry with each column's dtype and length.
+    """
+    temp_path = os.path.join(folder, "meta.json.tmp")
+    with open(temp_path, "w") as meta_file:
+        json.dump(meta, meta_file)
+    os.replace(temp_path, os.path.join(folder, "meta.json"))
+
+
+def read_column_meta(folder):
+    """Return the metadata written by write_column_files(), or None if it is missing or unreadable."""
+    try:
+        with open(os.path.join(folder, "meta.json")) as meta_file:
+            return json.load(meta_file)
+    except (OSError, ValueError):
+        return None
+
+
+def open_column_files(folder, meta, mode="r"):
+    """
+    Memory-map the columns described by meta.
+    Args:
+        folder: Folder written by write_column_files().
+        meta (dict): Its metadata, as returned by read_column_meta().
+        mode (str): np.memmap mode, read-only by default.
+    Returns:
+        Dictionary mapping each column name to a memory-mapped array.
+    """
+    columns = {}
+    for name, info in meta["columns"].items():
+        if info["length"] == 0:
+            columns[name] = np.empty(0, dtype=info["dtype"]) # Empty files cannot be memory-mapped.
+        else:
+            column_path = os.path.join(folder, f"{name}.bin")
+            columns[name] = np.memmap(column_path, dtype=info["dtype"], mode=mode, shape=(info["length"],))
+    return columns
+
+
+def complete_lines_end(data_file, start, size):
+    """
+    Find the end of the last complete line of a file, searching backwards from its end.
+    Args:
+        data_file: Binary file object.
+        start (int): Offset to search back to.
+        size (int): Size of the file.
+    Returns:
+        Offset just after the last newline at or after start, or start if there is none.
+    """
+    position = size
+    while position > start:
+        step = min(CHUNK_BYTES, position - start)
+        data_file.seek(position - step)
+        newline = data_file.read(step).rfind(b"\n")
+        if newline >= 0:
+            return position - step + newline + 1
+        position -= step
+    return start
+
+
+def new_checkpoint(path, folder):
+    """
+    Start an empty cache for a raw CSV file, with its checkpoint just after the header.
+    Args:
+        path: Path to the raw CSV file.
+        folder: Cache folder, created if needed.
+    Returns:
+        The new cache metadata.
+    """
+    with open(path, "rb") as data_csv:
+        column_order = read_header(data_csv)
+        offset = data_csv.tell()
+
+    os.makedirs(folder, exist_ok=True)
+    meta = cache_key(path)
+    meta.update(offset=offset, rows=0, column_order=column_order, stats={}, columns={})
+    for name in ("time",) + SENSORS:
+        dtype = np.dtype(np.float64 if name == "time" else np.float32)
+        open(os.path.join(folder, f"{name}.bin"), "wb").close()
+        meta["columns"][name] = {"dtype": dtype.str, "length": 0}
+    return meta
+
+
+def checkpoint_status(path, meta):
+    """
+    Compare a cache's checkpoint with the raw CSV file as it is now.
+    Args:
+        path: Path to the raw CSV file.
+        meta (dict): Cache metadata, or None if there is no cache.
+    Returns:
+        "current" if the file's size and mtime are unchanged, "append" if its validated part
+        is byte for byte the same (it only grew, or was touched), or "stale" if the cache must
+        be rebuilt: missing, older layout, other rules, or the file was rotated, truncated or edited.
+    """
+    key = cache_key(path)
+    if meta is None or any(meta.get(field) != key[field] for field in ("version", "path", "inode", "rules")):
+        return "stale"
+    if key["size"] == meta["size"] and key["mtime_ns"] == meta["mtime_ns"]:
+        return "current"
+    if key["size"] < meta["offset"] or fingerprint(path, meta["offset"]) != meta["fingerprint"]:
+        return "stale"
+    return "append"
+
+
+def append_new_rows(path, folder, meta):
+    """
+    Validate the complete lines after the checkpoint, append them to the cached columns and
+    running statistics, and move the checkpoint past them. Only new data is parsed; the
+    checkpoint's fingerprint hashes the whole validated part, which is far cheaper.
+    Args:
+        path: Path to the raw CSV file.
+        folder: Cache folder.
+        meta (dict): Cache metadata, updated in place and saved.
+    """
+    from streaming_statistics import RunningStats # Imported here, as streaming_statistics builds on this module.
+
+    key = cache_key(path) # Taken first: lines appended while this runs are left for the next update.
+    stats = {sensor: RunningStats.from_state(meta["stats"].get(sensor)) for sensor in SENSORS}
+    paths = {name: os.path.join(folder, f"{name}.bin") for name in meta["columns"]}
+    for name, info in meta["columns"].items():
+        # Drop anything past the last saved checkpoint, e.g. from an interrupted update.
+        os.truncate(paths[name], info["length"] * np.dtype(info["dtype"]).itemsize)
+
+    with span("validate.append_new_rows") as stage, open(path, "rb") as data_csv:
+        end = complete_lines_end(data_csv, meta["offset"], key["size"]) # A half-written last line waits.
+        data_csv.seek(meta["offset"])
+        files = {name: open(column_path, "ab") for name, column_path in paths.items()}
+        try:
+            for block in iter_csv_blocks(data_csv, meta["column_order"], limit=end - meta["offset"]):
+                columns = validate_columns(blocks_to_columns([block]))
+                for name, values in columns.items():
+                    values.astype(meta["columns"][name]["dtype"]).tofile(files[name])
+                    meta["columns"][name]["length"] += len(values)
+                for sensor in SENSORS:
+                    present = ~np.isnan(columns[sensor])
+                    stats[sensor].update(columns[sensor][present], columns["time"][present])
+                meta["rows"] += len(block)
+                stage.add_items(len(block))
+                count("validate.rows_parsed", len(block))
+        finally:
+            for column_file in files.values():
+                column_file.close()
+
+    meta.update(key, offset=end, fingerprint=fingerprint(path, end))
+    meta["stats"] = {sensor: stats[sensor].state() for sensor in SENSORS}
+    write_column_meta(folder, meta) # Written last, so the checkpoint only moves once the columns are complete.
+
+
+def update_cache(path=CSV_PATH):
+    """
+    Bring the cached columns up to date with the raw CSV file.
+    Only data appended since the last update is parsed; the cache is rebuilt from the
+    start if the file was rotated, truncated or rewritten. A last line without a newline may
+    still be being written, so it waits for the next update.
+    Call with cache_lock() held.
+    Args:
+        path: Path to the raw CSV file.
+    Returns:
+        folder, meta: The cache folder and its metadata.
+    """
+    folder = cache_dir(path)
+    meta = read_column_meta(folder)
+    status = checkpoint_status(path, meta)
+    count(f"validate.cache_{status}") # How often loads were served as-is, appended to, or rebuilt.
+    if status == "stale":
+        shutil.rmtree(folder, ignore_errors=True)
+        meta = new_checkpoint(path, folder)
+    if status != "current":
+        append_new_rows(path, folder, meta)
+    return folder, meta
+
+
+@contextlib.contextmanager
+def cache_lock(path=CSV_PATH):
+    """
+    Hold an exclusive lock on a raw CSV file's cache, so processes validating the same file
+    at once take turns instead of interleaving their writes.
+    Args:
+        path: Path to the raw CSV file.
+    """
+    folder = cache_dir(path)
+    os.makedirs(os.path.dirname(folder), exist_ok=True)
+    with open(f"{folder}.lock", "a+b") as lock_file: # Beside the folder, which a rebuild deletes.
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def validated_statistics(path=CSV_PATH):
+    """
+    Return each sensor's running statistics over every complete line of the file, updating the cache first.
+    Args:
+        path: Path to the raw CSV file.
+    Returns:
+        Dictionary mapping each sensor to a streaming_statistics.RunningStats.
+    """
+    from streaming_statistics import RunningStats # Imported here, as streaming_statistics builds on this module.
+
+    with cache_lock(path):
+        _, meta = update_cache(path)
+    return {sensor: RunningStats.from_state(meta["stats"].get(sensor)) for sensor in SENSORS}
 
 
-    times = [float(time) for time in times] # Convert string values to float
-    light = process_values(light) # Apply the process_values function to convert light readings, repeating for each sensor type.
-    sound = process_values(sound)
-    temp = process_values(temp) 
-    movement = process_values(movement)
+def invalidate_cache(path=CSV_PATH):
+    """Delete the cached columns for a raw CSV file, if any."""
+    with cache_lock(path):
+        shutil.rmtree(cache_dir(path), ignore_errors=True)
 
-    # Initalise dictionaries, pairing times with values.
-    light_dict = dict(zip(times, light))
-    sound_dict = dict(zip(times, sound))
-    temp_dict = dict(zip(times, temp))
-    movement_dict = dict(zip(times, movement))
 
-    # Remove empty value pairs
-    light_dict = remove_pairs(light_dict) # Apply the remove_pairs function to each dictionary.
-    sound_dict = remove_pairs(sound_dict)
-    temp_dict = remove_pairs(temp_dict)
-    movement_dict = remove_pairs(movement_dict)
+@traced("validate.load")
+def load_validated(path=CSV_PATH, use_cache=True):
+    """
+    Return validated columns from the on-disk cache, parsing only what was appended since the last run.
+    The columns are memory-mapped and hold every line that ends in a newline. Binary sensor logs (.slog) are read directly from their memory-mapped records instead.
+    Args:
+        path: Path to the raw CSV file or sensor log.
+        use_cache (bool): Set to False to bypass the cache and always re-parse the file.
+    Returns:
+        Dictionary with a float64 'time' array and a NaN-aware float32 array per sensor.
+    """
+    from sensor_log import is_sensor_log # Imported here, as sensor_log builds on this module.
+
+    if not use_cache or is_sensor_log(path):
+        return load_columns(path)
 
-    # Adjust teamperature readings by subtracting 3 degrees.
-    temp_dict = dict(zip(times, [temp - 3 for temp in temp_dict.values()]))
+    try:
+        with cache_lock(path):
+            folder, meta = update_cache(path)
+            # Mapped under the lock: later appends never rewrite these bytes, and a rebuild
+            # replaces the files rather than changing them, so the maps stay valid.
+            return open_column_files(folder, meta)
+    except OSError:
+        return load_columns(path) # A read-only data folder only means the next run parses the CSV again.
 
-    # Filter out invalid sound readings. 
-    sound_dict = filter_sound_readings(sound_dict)
 
-    return light_dict, sound_dict, temp_dict, movement_dict  # Return the dictionaries containing validated sensor data.
+def main(path=CSV_PATH, use_cache=True):
+    """ Execute the data validation and storage process. """
+    columns = load_validated(path, use_cache) # Parse and validate the CSV file as typed columns.
+
+    # Return one time:value dictionary per sensor, as earlier versions of this script did.
+    return tuple(column_to_dict(columns, sensor) for sensor in SENSORS)
 
 
 if __name__ == "__main__":
-    light_dict, sound_dict, temp_dict, movement_dict = main()  # Call the main function and unpack the returned dictionaries.
+    import argparse # For the command line interface; imported here so importing the module stays fast.
+    from instrumentation import trace_to
+
+    parser = argparse.ArgumentParser(description="Validate the raw sleep tracking data.")
+    parser.add_argument("--path", default=CSV_PATH, help="raw CSV file or .slog sensor log to validate")
+    parser.add_argument("--no-cache", action="store_true", help="re-parse the CSV file instead of using the cache")
+    parser.add_argument("--clear-cache", action="store_true", help="delete the cached data before validating")
+    parser.add_argument("--trace", metavar="PATH", default=None, help="write a Chrome trace of each stage to PATH")
+    args = parser.parse_args()
+
+    if args.trace:
+        trace_to(args.trace)
+
+    if args.clear_cache:
+        invalidate_cache(args.path)
+    light_dict, sound_dict, temp_dict, movement_dict = main(args.path, not args.no_cache)  # Call the main function and unpack the returned dictionaries.
 
     print("\nValidation and storage complete.\n")
     # The dictionaries light_dict, sound_dict, temp_dict, and movement_dict now contain the validated sensor data.
@@ -0,0 +1,77 @@
+""" Min/max downsampling of long time series before plotting, keeping every spike visible. """
+
+import numpy as np # For bucketed reductions.
+from memo_cache import LRUCache # Bounded cache of downsampled series.
+
+TARGET_POINTS = 2_000 # Two points (a min and a max) for each of ~1000 pixel columns.
+CACHE_SIZE = 32 # Downsampled series kept by downsample() when given a cache key.
+
+_cache = LRUCache(CACHE_SIZE, name="downsample_cache") # cache key -> (length, target points, times, values).
+
+
+def minmax_downsample(times, values, target_points=TARGET_POINTS):
+    """
+    Reduce a series to at most target_points points by keeping the minimum and maximum of
+    each bucket of consecutive readings, in time order. A line drawn through the result
+    covers the same vertical range as the full series in every bucket, so single-reading
+    peaks (like the sound spikes analyse_data() warns about) are never smoothed away.
+    Args:
+        times (np.ndarray): Horizontal axis values, in ascending order.
+        values (np.ndarray): Readings at each time; NaN gaps are skipped within a bucket.
+        target_points (int): Maximum number of points to return, at least 2.
+    Returns:
+        times, values: Arrays of the kept readings (the inputs themselves if already short enough).
+    """
+    times, values = np.asarray(times), np.asarray(values)
+    if len(values) <= target_points:
+        return times, values
+
+    # Equal-sized buckets, as rows of a matrix; the last row is padded with NaN.
+    buckets = max(1, target_points // 2)
+    size = -(-len(values) // buckets) # Readings per bucket, rounded up.
+    buckets = -(-len(values) // size)
+    matrix = np.full(buckets * size, np.nan)
+    matrix[:len(values)] = values
+    matrix = matrix.reshape(buckets, size)
+
+    # Position of each bucket's min and max, ignoring NaN (an all-NaN bucket keeps its first reading).
+    gaps = np.isnan(matrix)
+    lowest = np.where(gaps, np.inf, matrix).argmin(axis=1)
+    highest = np.where(gaps, -np.inf, matrix).argmax(axis=1)
+
+    # Both positions of every bucket, earliest first, as indices into the original series.
+    starts = np.arange(buckets) * size
+    kept = np.column_stack((np.minimum(lowest, highest), np.maximum(lowest, highest))) + starts[:, None]
+    kept = kept.ravel()
+    kept = kept[np.r_[True, kept[1:] != kept[:-1]] & (kept < len(values))] # Drop repeats and padding.
+    return times[kept], values[kept]
+
+
+def downsample(times, values, target_points=TARGET_POINTS, key=None):
+    """
+    Downsample a series for plotting, optionally reusing an earlier result.
+    Args:
+        times (np.ndarray): Horizontal axis values, in ascending order.
+        values (np.ndarray): Readings at each time.
+        target_points (int): Maximum number of points to return.
+        key: Hashable name of the series (e.g. ("sound", path)). When given, the result is kept
+            and returned again for the same key, length and target without recomputing it.
+            The caller is responsible for using a new key if the series' contents change.
+    Returns:
+        times, values
+    """
+    if key is None:
+        return minmax_downsample(times, values, target_points)
+
+    hit = _cache.get(key)
+    if hit is not None and hit[:2] == (len(values), target_points):
+        return hit[2], hit[3]
+
+    small_times, small_values = minmax_downsample(times, values, target_points)
+    _cache.put(key, (len(values), target_points, small_times, small_values)) # Evicts the least recently drawn series.
+    return small_times, small_values
+
+
+def clear_cache():
+    """Forget every cached downsampled series."""
+    _cache.clear()
@@ -0,0 +1,124 @@
+""" Prefix-sum index over minutes slept, answering sleep duration questions for any window of nights. """
+
+import numpy as np # For cumulative sums and vectorised window queries.
+
+INITIAL_CAPACITY = 64 # Nights the index has room for before its arrays first grow.
+
+
+def resized(array, capacity):
+    """Return a zero-padded copy of a 1D array with a new length."""
+    grown = np.zeros(capacity, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class DurationIndex:
+    """
+    Cumulative sums over one user's minutes slept, so any window of nights is answered in O(1).
+    Nights are indexed oldest first and new nights are appended, so the most recent nights are
+    always the negative positions: (-1, None) is last night and (-7, None) the last week.
+    """
+
+
+    def __init__(self, mins_slept=()):
+        """
+        Initialise the index.
+        Args:
+            mins_slept: Minutes slept on each night so far, oldest night first.
+        """
+        self._count = 0
+        self._cumulative = np.zeros(INITIAL_CAPACITY + 1, dtype=np.int64) # _cumulative[i] = total of nights 0..i-1.
+        self._targets = {} # target minutes -> cumulative count of nights meeting it, built on first use.
+        self.append(mins_slept)
+
+
+    @classmethod
+    def from_nights(cls, nights_data):
+        """Build an index from a list of Night objects numbered from last night (Night 1) backwards."""
+        return cls([night.get_time_slept() for night in reversed(nights_data)]) # Oldest first.
+
+
+    def __len__(self):
+        """Return the number of nights indexed."""
+        return self._count
+
+
+    def append(self, mins_slept):
+        """
+        Add one or more nights after the most recent one; costs O(number of nights added), amortised.
+        Args:
+            mins_slept: Minutes slept on a night, or an array of them, oldest first.
+        """
+        new = np.atleast_1d(np.asarray(mins_slept, dtype=np.int64))
+        end = self._count + len(new)
+        if end + 1 > len(self._cumulative):
+            self._grow(max(end + 1, 2 * len(self._cumulative)))
+
+        previous = self._cumulative[self._count]
+        self._cumulative[self._count + 1:end + 1] = previous + np.cumsum(new)
+        for target, met in self._targets.items():
+            met[self._count + 1:end + 1] = met[self._count] + np.cumsum(new >= target)
+        self._count = end
+
+
+    def _grow(self, capacity):
+        """Reallocate the cumulative arrays with room for more nights, doubling to keep appends cheap."""
+        self._cumulative = resized(self._cumulative, capacity)
+        self._targets = {target: resized(met, capacity) for target, met in self._targets.items()}
+
+
+    def _window(self, start, stop):
+        """Clip a [start, stop) window of night positions to the indexed nights, like list slicing."""
+        start, stop, _ = slice(start, stop).indices(self._count)
+        return start, max(start, stop)
+
+
+    def total(self, start=0, stop=None):
+        """Return the total minutes slept over nights start..stop-1."""
+        start, stop = self._window(start, stop)
+        return int(self._cumulative[stop] - self._cumulative[start])
+
+
+    def window_mean(self, start=0, stop=None):
+        """Return the mean minutes slept over nights start..stop-1, or 0.0 for an empty window."""
+        start, stop = self._window(start, stop)
+        return (self.total(start, stop) / (stop - start)) if stop > start else 0.0
+
+
+    def _met_counts(self, target_minutes):
+        """Return the cumulative count of nights meeting a target, building it once per target."""
+        if target_minutes not in self._targets:
+            met = np.zeros(len(self._cumulative), dtype=np.int64)
+            minutes = np.diff(self._cumulative[:self._count + 1])
+            np.cumsum(minutes >= target_minutes, out=met[1:self._count + 1])
+            self._targets[target_minutes] = met
+        return self._targets[target_minutes]
+
+
+    def met_count(self, target_minutes, start=0, stop=None):
+        """Return how many of nights start..stop-1 reached target_minutes of sleep."""
+        start, stop = self._window(start, stop)
+        met = self._met_counts(target_minutes)
+        return int(met[stop] - met[start])
+
+
+    def rolling_means(self, window):
+        """
+        Return the mean minutes slept over every run of `window` consecutive nights, in one vectorised call.
+        Args:
+            window (int): Number of nights per window, e.g. 7 for a rolling week.
+        Returns:
+            Array whose entry i is the mean over nights i..i+window-1.
+        """
+        if window < 1:
+            raise ValueError("window must be at least one night.")
+        cumulative = self._cumulative[:self._count + 1]
+        return (cumulative[window:] - cumulative[:-window]) / window
+
+
+    def rolling_met_counts(self, target_minutes, window):
+        """Return how many nights met target_minutes in every run of `window` consecutive nights."""
+        if window < 1:
+            raise ValueError("window must be at least one night.")
+        met = self._met_counts(target_minutes)[:self._count + 1]
+        return met[window:] - met[:-window]
@@ -0,0 +1,175 @@
+"""
+Score the sleeping environment of every night at once and rank the worst nights.
+
+sleep_quality() checks one night at a time: a sensor is flagged when its maximum rises above the
+night's upper quartile (the top of its "normal range"). Here the same light, sound and temp checks
+run over whole batches of nights as array operations, a chunk of nights at a time, so memory stays
+bounded however many nights - one user's 100 or millions across a cohort - are scored.
+"""
+
+import numpy as np # For the batched checks.
+from night_generator import (MODELS, NightBatch, sensor_autocorrelation, sensor_parameters, simulate_nights,
+                             user_seed) # Batches of simulated nights, seeded per user.
+from summary_statistics import interpolate_quantiles, sort_segments # The quartiles, as summarise_batch() computes them.
+
+QUALITY_SENSORS = ("light", "sound", "temp") # The sensors sleep_quality() checks.
+CHUNK_NIGHTS = 50_000 # Nights checked per step; about 25 million readings per sensor.
+USERS_PER_BATCH = 500 # Users simulated at a time when scoring a simulated cohort.
+PER_SENSOR = ("flag", "excess", "peak", "peak_minute", "q1", "q3") # Columns of the table for each sensor.
+
+
+def peak_checks(values, offsets):
+    """
+    Run the sleep_quality() check on every night of one sensor, sorting every night in one call.
+    Args:
+        values (np.ndarray): Flat readings of every night, one night after the other.
+        offsets (np.ndarray): Night i spans offsets[i]:offsets[i + 1]; every night must be non-empty.
+    Returns:
+        Dictionary of per-night arrays:
+            flag: the peak is above the upper quartile, as analyse_data() warns;
+            excess: how far above it, in interquartile ranges (0 when not flagged);
+            peak, peak_minute: the maximum and the minute (from 1) it was first reached;
+            q1, q3: the night's normal range.
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    starts, lengths = offsets[:-1], np.diff(offsets)
+
+    ordered = sort_segments(values, offsets)
+    q1, q3 = (interpolate_quantiles(ordered, starts, lengths, q) for q in (0.25, 0.75))
+    peak = ordered[offsets[1:] - 1] # Last of each sorted night.
+
+    # The minute a night first reached its peak is its first reading equal to it.
+    at_peak = np.flatnonzero(values == np.repeat(peak, lengths))
+    peak_minute = at_peak[np.searchsorted(at_peak, starts)] - starts
+    flag = peak > q3
+    excess = np.where(flag, (peak - q3) / np.maximum(q3 - q1, 1.0), 0.0) # A flat night counts 1 unit of spread.
+    return {"flag": flag, "excess": excess, "peak": peak, "peak_minute": peak_minute + 1, "q1": q1, "q3": q3}
+
+
+def score_batch(batch, sensors=QUALITY_SENSORS, chunk_nights=CHUNK_NIGHTS):
+    """
+    Score every night of a batch, chunk by chunk.
+    The score of a night is the sum over sensors of how far each peak rose above its normal
+    range, in interquartile ranges, so higher is a worse environment.
+    Args:
+        batch (NightBatch): Nights to score; memory-mapped batches are read one chunk at a time.
+        sensors (tuple): Sensors to check.
+        chunk_nights (int): Nights checked per step.
+    Returns:
+        Table as a dictionary of equal-length arrays: user_id, night_id, score, flags (number
+        of flagged sensors), and for each sensor the PER_SENSOR columns, e.g. "sound_peak_minute".
+    """
+    table = {"user_id": np.asarray(batch.user_ids), "night_id": np.asarray(batch.night_ids)}
+    for sensor in sensors:
+        for name, dtype in zip(PER_SENSOR, (bool, np.float64, np.float64, np.int64, np.float64, np.float64)):
+            table[f"{sensor}_{name}"] = np.empty(len(batch), dtype=dtype)
+
+    for first in range(0, len(batch), chunk_nights):
+        last = min(first + chunk_nights, len(batch))
+        offsets = batch.offsets[first:last + 1]
+        for sensor in sensors:
+            checks = peak_checks(np.asarray(batch.series[sensor][offsets[0]:offsets[-1]]), offsets - offsets[0])
+            for name in PER_SENSOR:
+                table[f"{sensor}_{name}"][first:last] = checks[name]
+
+    table["score"] = sum(table[f"{sensor}_excess"] for sensor in sensors)
+    table["flags"] = sum(table[f"{sensor}_flag"].astype(np.int64) for sensor in sensors)
+    return table
+
+
+def score_batches(batches, sensors=QUALITY_SENSORS, chunk_nights=CHUNK_NIGHTS):
+    """Score a sequence of batches (e.g. simulated a group of users at a time) into one table."""
+    tables = [score_batch(batch, sensors, chunk_nights) for batch in batches]
+    return {name: np.concatenate([table[name] for table in tables]) for name in tables[0]} if tables else {}
+
+
+def rank_nights(table, top=None):
+    """
+    Order a score table from the worst environment to the best.
+    Args:
+        table (dict): Table from score_batch().
+        top (int): Only keep this many of the worst nights; found without sorting the rest.
+    Returns:
+        Table with the same columns, worst night first. Equal scores keep their original order.
+    """
+    scores = table["score"]
+    if top is not None and top < len(scores):
+        candidates = np.argpartition(-scores, top - 1)[:top]
+        order = candidates[np.lexsort((candidates, -scores[candidates]))]
+    else:
+        order = np.argsort(-scores, kind="stable")
+    return {name: column[order] for name, column in table.items()}
+
+
+def simulated_batches(users, nights_per_user, seed=None, users_per_batch=USERS_PER_BATCH, model="independent"):
+    """
+    Simulate a cohort a group of users at a time, so only one group is ever in memory.
+    Each user is seeded with night_generator.user_seed(), so with the independent model user u
+    gets the nights cohort_simulation.simulate_cohort() and what_if_service give user u from
+    the same seed, whatever users_per_batch is.
+    model is one of MODELS: "ar1" gives each sensor its fitted minute-to-minute autocorrelation.
+    Yields:
+        NightBatch of each group, with user IDs from 1 and night IDs from 1 within each user.
+    """
+    parameters = sensor_parameters()
+    autocorrelation = sensor_autocorrelation() if model == "ar1" else None
+    entropy = np.random.SeedSequence(seed).entropy # Fresh entropy when seed is None.
+    for first_user in range(1, users + 1, users_per_batch):
+        group_users = min(users_per_batch, users + 1 - first_user)
+        batches = [simulate_nights(nights_per_user, user_seed(entropy, user_id), parameters, autocorrelation=autocorrelation)
+                   for user_id in range(first_user, first_user + group_users)]
+        yield NightBatch(np.concatenate([batch.mins_slept for batch in batches]),
+                         {sensor: np.concatenate([batch.series[sensor] for batch in batches]) for sensor in batches[0].series},
+                         np.tile(np.arange(1, nights_per_user + 1), group_users),
+                         np.repeat(np.arange(first_user, first_user + group_users), nights_per_user))
+
+
+def format_table(table, sensors=QUALITY_SENSORS):
+    """Return a ranked table as text, one night per line with each sensor's peak and flag."""
+    lines = [f"{'rank':>5} {'user':>7} {'night':>6} {'score':>7}  " + "  ".join(f"{sensor + ' peak (minute)':<22}" for sensor in sensors)]
+    for rank in range(len(table["score"])):
+        cells = []
+        for sensor in sensors:
+            mark = "!" if table[f"{sensor}_flag"][rank] else " "
+            cells.append(f"{table[f'{sensor}_peak'][rank]:>6g} ({table[f'{sensor}_peak_minute'][rank]:>4}) {mark}{'':<8}")
+        lines.append(f"{rank + 1:>5} {table['user_id'][rank]:>7} {table['night_id'][rank]:>6} "
+                     f"{table['score'][rank]:>7.2f}  " + "  ".join(cells))
+    return "\n".join(lines)
+
+
+def main():
+    """Score and rank nights from a night store or a simulated cohort from the command line."""
+    import argparse # For the command line interface; imported here so importing the module stays fast.
+    import time # For throughput reporting.
+
+    parser = argparse.ArgumentParser(description="Rank nights by how far light, sound and temp peaks rose above normal.")
+    parser.add_argument("--store", metavar="FOLDER", default=None, help="score the nights in this night store")
+    parser.add_argument("--user", type=int, default=None, help="only score this user's stored nights")
+    parser.add_argument("--users", type=int, default=1, help="users to simulate when no store is given")
+    parser.add_argument("--nights", type=int, default=100, help="nights per simulated user")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible simulated users")
+    parser.add_argument("--model", choices=MODELS, default="independent", help="how simulated minutes follow each other")
+    parser.add_argument("--top", type=int, default=10, help="worst nights to show")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.store is not None:
+        from night_store import NightStore # Only needed when scoring stored nights.
+        with NightStore(args.store) as store:
+            records = store.query() if args.user is None else store.query("user_id = ?", (args.user,))
+            table = score_batch(store.to_batch(records))
+    else:
+        table = score_batches(simulated_batches(args.users, args.nights, args.seed, model=args.model))
+    seconds = time.perf_counter() - start
+
+    nights = len(table.get("score", ()))
+    print(f"Scored {nights:,} nights in {seconds:.2f} s - {nights / seconds:,.0f} nights/s.")
+    if nights:
+        for sensor in QUALITY_SENSORS:
+            print(f"{sensor:<6} peak above its normal range on {table[f'{sensor}_flag'].mean():.1%} of nights")
+        print(f"\nWorst {min(args.top, nights)} nights (! = peak above the night's upper quartile):\n")
+        print(format_table(rank_nights(table, args.top)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Lightweight spans and counters around the pipeline stages, exported as a Chrome trace and a text summary.
+
+Tracing is off unless the SLEEP_TRACE environment variable names an output file (or a script is run
+with --trace). While off, span() returns a shared do-nothing object and @traced functions call straight
+through, so instrumented code pays one global lookup per call.
+
+    SLEEP_TRACE=trace.json python src/sleep_simulation.py
+
+writes trace.json at exit (open it in chrome://tracing or https://ui.perfetto.dev) and prints a
+per-stage summary to standard error.
+"""
+
+import atexit # For writing the trace when the program ends.
+import functools # For keeping the names and docstrings of traced functions.
+import json # For the Chrome trace-event format.
+import os # For the environment switch and process IDs.
+import sys # For printing the summary to standard error.
+import threading # For per-thread span stacks.
+import time # For wall and CPU clocks.
+import tracemalloc # For peak allocation measurements.
+
+ENV_VAR = "SLEEP_TRACE" # Set to a file path to trace a whole run.
+MEMORY_ENV_VAR = "SLEEP_TRACE_MEMORY" # Set to 0 to skip allocation tracking, which slows Python code down.
+
+_enabled = False # Checked by every span; False costs instrumented code almost nothing.
+_track_memory = False
+_events = [] # Finished spans and counter samples, in Chrome trace-event form.
+_counters = {} # Counter name -> running total.
+_local = threading.local() # Each thread's stack of open spans.
+_origin_ns = time.perf_counter_ns() # Trace timestamps start here.
+
+
+class _NullSpan:
+    """Shared stand-in returned by span() while tracing is off."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def add_items(self, count):
+        """Ignore the item count."""
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """One timed stage: wall time, CPU time, peak allocation and the number of items it handled."""
+
+    __slots__ = ("name", "items", "start_ns", "cpu_ns", "base_bytes", "peak_bytes")
+
+
+    def __init__(self, name, items=None):
+        """
+        Args:
+            name (str): Stage name, e.g. "validate.parse_csv".
+            items (int): Number of items (rows, nights, readings) handled, if known up front.
+        """
+        self.name = name
+        self.items = items
+
+
+    def add_items(self, count):
+        """Add to the number of items handled, for stages that only know it as they go."""
+        self.items = (self.items or 0) + count
+
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        if _track_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].peak_bytes = max(stack[-1].peak_bytes, peak) # Keep the parent's peak so far.
+            tracemalloc.reset_peak()
+            self.base_bytes = self.peak_bytes = current
+        stack.append(self)
+        self.cpu_ns = time.thread_time_ns()
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+
+    def __exit__(self, *exc_info):
+        end_ns = time.perf_counter_ns()
+        cpu_ns = time.thread_time_ns() - self.cpu_ns
+        _local.stack.pop()
+        args = {"cpu_ms": cpu_ns / 1e6}
+        if _track_memory:
+            peak = max(self.peak_bytes, tracemalloc.get_traced_memory()[1])
+            args["peak_bytes"] = peak - self.base_bytes
+            if _local.stack:
+                parent = _local.stack[-1]
+                parent.peak_bytes = max(parent.peak_bytes, peak)
+        if self.items is not None:
+            args["items"] = self.items
+        _events.append({
+            "name": self.name, "cat": self.name.split(".", 1)[0], "ph": "X",
+            "ts": (self.start_ns - _origin_ns) / 1e3, "dur": (end_ns - self.start_ns) / 1e3,
+            "pid": os.getpid(), "tid": threading.get_ident(), "args": args,
+        })
+        return False
+
+
+def span(name, items=None):
+    """
+    Time a block of code while tracing is on:
+
+        with span("simulate.nights", items=number_of_nights):
+            ...
+
+    Returns:
+        A Span, or NULL_SPAN when tracing is off.
+    """
+    return Span(name, items) if _enabled else NULL_SPAN
+
+
+def traced(name=None):
+    """
+    Decorator recording every call of a function as a span.
+    Args:
+        name (str): Span name, defaults to module.function.
+    """
+    def decorate(function):
+        label = name or f"{function.__module__}.{function.__qualname__}"
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with Span(label):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name, amount=1):
+    """Add to a named counter while tracing is on; each change is recorded as a Chrome counter event."""
+    if not _enabled:
+        return
+    _counters[name] = _counters.get(name, 0) + amount
+    _events.append({
+        "name": name, "ph": "C", "ts": (time.perf_counter_ns() - _origin_ns) / 1e3,
+        "pid": os.getpid(), "args": {name: _counters[name]},
+    })
+
+
+def enable(track_memory=True):
+    """
+    Start recording spans and counters.
+    Args:
+        track_memory (bool): Also record peak allocations with tracemalloc (slower).
+    """
+    global _enabled, _track_memory
+    _enabled = True
+    _track_memory = track_memory
+    if track_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    """Stop recording; spans already recorded are kept."""
+    global _enabled, _track_memory
+    _enabled = _track_memory = False
+
+
+def is_enabled():
+    """Return whether spans are being recorded."""
+    return _enabled
+
+
+def events():
+    """Return the recorded trace events."""
+    return list(_events)
+
+
+def reset():
+    """Forget every recorded span and counter."""
+    _events.clear()
+    _counters.clear()
+
+
+def write_chrome_trace(path):
+    """Write the recorded events as Chrome trace-event JSON, for chrome://tracing or Perfetto."""
+    with open(path, "w") as trace_file:
+        json.dump({"traceEvents": _events, "displayTimeUnit": "ms"}, trace_file)
+
+
+def summary():
+    """
+    Summarise the recorded spans per stage.
+    Returns:
+        Multi-line text with calls, wall and CPU time, largest peak allocation and items per second.
+    """
+    stages = {}
+    for event in _events:
+        if event["ph"] != "X":
+            continue
+        stage = stages.setdefault(event["name"], {"calls": 0, "wall": 0.0, "cpu": 0.0, "peak": None, "items": None})
+        stage["calls"] += 1
+        stage["wall"] += event["dur"] / 1e6
+        stage["cpu"] += event["args"]["cpu_ms"] / 1e3
+        if "peak_bytes" in event["args"]:
+            stage["peak"] = max(stage["peak"] or 0, event["args"]["peak_bytes"])
+        if "items" in event["args"]:
+            stage["items"] = (stage["items"] or 0) + event["args"]["items"]
+
+    lines = [f"{'stage':<36} {'calls':>7} {'wall':>10} {'cpu':>10} {'peak':>10} {'items/s':>13}"]
+    for name, stage in sorted(stages.items(), key=lambda item: -item[1]["wall"]):
+        peak = f"{stage['peak'] / 2**20:7.1f}MiB" if stage["peak"] is not None else f"{'-':>10}"
+        rate = f"{stage['items'] / stage['wall']:13,.0f}" if stage["items"] and stage["wall"] else f"{'-':>13}"
+        lines.append(f"{name:<36} {stage['calls']:7,} {stage['wall']:9.3f}s {stage['cpu']:9.3f}s {peak} {rate}")
+    for name, total in _counters.items():
+        lines.append(f"counter {name}: {total:,}")
+    return "\n".join(lines)
+
+
+def trace_to(path, track_memory=True):
+    """
+    Turn tracing on for the rest of the program and write the trace and summary when it exits.
+    Args:
+        path: Chrome trace JSON file to write.
+        track_memory (bool): Also record peak allocations.
+    """
+    enable(track_memory)
+    pid = os.getpid()
+
+    def finish():
+        if os.getpid() != pid:
+            return # Forked worker processes inherit this hook; only the process that asked writes.
+        write_chrome_trace(path)
+        print(f"\n{summary()}\nTrace written to {path}", file=sys.stderr)
+
+    atexit.register(finish)
+
+
+# Tracing a whole run only takes an environment variable, so no script needs changing.
+if os.environ.get(ENV_VAR):
+    trace_to(os.environ[ENV_VAR], os.environ.get(MEMORY_ENV_VAR, "1") != "0")
@@ -0,0 +1,264 @@
+"""
+Live ingest: validate and analyse readings as they arrive from the micro:bit receiver.
+
+The receiver logs the same CSV lines as sleep_data_raw.csv ("Time (seconds),light,sound,temp,movement",
+one sensor per row) and mirrors them over USB serial. Lines are read from a serial port, a pipe or
+FIFO, standard input, or replayed from a CSV file at a chosen rate, then pass through a chain of
+generators - parse, validate, analyse - each doing a constant amount of work per reading.
+"""
+
+import time # For replay pacing and latency measurement.
+from collections import deque # For a bounded window of latency samples.
+
+from data_validation import CSV_PATH, SENSORS, TIME_COLUMN, validate_reading # Record-level validation rules.
+from streaming_statistics import RunningStats # Per-sensor running statistics.
+
+BAUD_RATE = 115200 # micro:bit USB serial default.
+REPLAY_BATCH = 64 # Replayed lines released per pacing check, so sleeping costs little per reading.
+OUTLIER_STDS = 3 # Readings this many standard deviations above the running mean raise an alert.
+MIN_READINGS_FOR_ALERTS = 30 # Running mean and deviation are too noisy to judge before this.
+ALERT_COOLDOWN = 60.0 # Seconds of log time before the same sensor can alert again.
+LATENCY_SAMPLES = 100_000 # Most recent per-reading latencies kept for the final report.
+UNITS = {"light": "lx", "sound": "dB", "temp": "°C", "movement": "mg"}
+
+
+# -------------------- SOURCES --------------------
+
+def stream_lines(stream):
+    """Yield raw lines from a binary file object: a pipe, FIFO, standard input or a regular file."""
+    for line in stream:
+        yield line
+
+
+def serial_lines(port, baud_rate=BAUD_RATE):
+    """
+    Yield raw lines from a serial port, e.g. the micro:bit receiver on /dev/ttyACM0 or COM3.
+    Needs the optional pyserial package.
+    """
+    try:
+        import serial # Optional dependency, only needed for live hardware.
+    except ImportError:
+        raise RuntimeError("Reading from a serial port needs pyserial: pip install pyserial") from None
+
+    with serial.Serial(port, baud_rate) as connection: # No timeout: block until each line arrives.
+        while True:
+            yield connection.readline()
+
+
+def replay_lines(path=CSV_PATH, rate=1000.0, loops=1):
+    """
+    Stand-in for the receiver: yield the lines of a CSV file at a steady rate.
+    Args:
+        path: Raw CSV file to replay.
+        rate (float): Lines per second; 0 replays as fast as possible.
+        loops (int): Times to replay the file; timestamps keep increasing across loops.
+    """
+    with open(path, "rb") as data_csv:
+        header = data_csv.readline()
+        lines = [line for line in data_csv if line.strip()]
+    yield header
+
+    if not lines:
+        return
+    first = float(lines[0].split(b",", 1)[0])
+    span = float(lines[-1].split(b",", 1)[0]) - first + 0.1 # Shift each loop past the last timestamp.
+    start = time.perf_counter()
+    sent = 0
+    for loop in range(loops):
+        for line in lines:
+            if loop:
+                stamp, rest = line.split(b",", 1)
+                line = b"%.2f,%s" % (float(stamp) + loop * span, rest)
+            if rate and sent % REPLAY_BATCH == 0:
+                delay = start + sent / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            sent += 1
+            yield line
+
+
+# -------------------- PIPELINE STAGES --------------------
+
+def timestamped(lines):
+    """Pair every line with the moment it was received, for latency measurement."""
+    clock = time.perf_counter
+    for line in lines:
+        yield clock(), line
+
+
+def parse_readings(lines):
+    """
+    Turn raw CSV lines into (arrival, time, sensor, value) readings.
+    A header line (such as the one the receiver prints when it starts) sets the column order;
+    until one arrives the order of sleep_data_raw.csv is assumed. Malformed lines are skipped.
+    Args:
+        lines: Iterable of (arrival, line) pairs from timestamped().
+    """
+    names = (TIME_COLUMN,) + SENSORS
+    columns = list(enumerate(names))
+    time_index = 0
+    for arrival, line in lines:
+        fields = line.decode(errors="replace").strip().split(",")
+        if TIME_COLUMN in fields:
+            columns = list(enumerate(fields))
+            time_index = fields.index(TIME_COLUMN)
+            continue
+        if len(fields) != len(columns):
+            continue
+        try:
+            timestamp = float(fields[time_index])
+            for index, name in columns:
+                if index != time_index and fields[index] and name in UNITS:
+                    yield arrival, timestamp, name, float(fields[index])
+        except ValueError:
+            continue # A partly received or garbled line.
+
+
+def validate_readings(readings):
+    """Apply data_validation's rules to each reading, dropping invalid ones."""
+    for arrival, timestamp, sensor, value in readings:
+        value = validate_reading(sensor, value)
+        if value is not None:
+            yield arrival, timestamp, sensor, value
+
+
+class LiveSensor(RunningStats):
+    """Running statistics of one sensor, updated per reading with RunningStats.add(), and its alert state."""
+
+
+    def __init__(self):
+        """Start with no readings."""
+        super().__init__()
+        self.last_alert = None # Log time of the most recent alert.
+
+
+class LiveAnalysis:
+    """Consume validated readings, keeping running statistics and raising threshold alerts."""
+
+
+    def __init__(self, limits=None, on_alert=print):
+        """
+        Args:
+            limits (dict): Optional fixed upper limit per sensor, e.g. {"sound": 60}. Readings above
+                it always alert; otherwise readings OUTLIER_STDS standard deviations above the
+                running mean alert.
+            on_alert: Called with each alert message.
+        """
+        self.sensors = {sensor: LiveSensor() for sensor in SENSORS}
+        self.limits = limits or {}
+        self.on_alert = on_alert
+        self.alerts = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES) # Seconds from arrival to analysed, per reading.
+
+
+    def check(self, sensor, stats, timestamp, value):
+        """Raise an alert if a reading is above its sensor's limit or far above its running mean."""
+        limit = self.limits.get(sensor)
+        if limit is None:
+            if stats.count < MIN_READINGS_FOR_ALERTS:
+                return
+            limit = stats.mean + OUTLIER_STDS * stats.std
+        if value <= limit or (stats.last_alert is not None and timestamp - stats.last_alert < ALERT_COOLDOWN):
+            return
+        stats.last_alert = timestamp
+        self.alerts += 1
+        self.on_alert(f"At {timestamp:.2f} s, {sensor} reached {value:g} {UNITS[sensor]}, above {limit:.1f} {UNITS[sensor]}.")
+
+
+    def consume(self, readings, report_every=None):
+        """
+        Analyse readings until the source ends.
+        Args:
+            readings: Iterable of (arrival, time, sensor, value) from validate_readings().
+            report_every (float): Print a one-line status every this many seconds, if given.
+        Returns:
+            Number of readings analysed.
+        """
+        clock = time.perf_counter
+        latencies = self.latencies
+        next_report = None if report_every is None else clock() + report_every
+        processed = 0
+        for arrival, timestamp, sensor, value in readings:
+            stats = self.sensors[sensor]
+            self.check(sensor, stats, timestamp, value) # Judged against the readings before it.
+            stats.add(value, timestamp)
+            processed += 1
+            done = clock()
+            latencies.append(done - arrival)
+            if next_report is not None and done >= next_report:
+                print(self.status())
+                next_report = done + report_every
+        return processed
+
+
+    def status(self):
+        """One line with each sensor's running mean and maximum."""
+        parts = [f"{sensor} {stats.mean:.1f}/{stats.max:g}" for sensor, stats in self.sensors.items() if stats.count]
+        return "mean/max: " + ", ".join(parts)
+
+
+    def latency_percentiles(self, percentiles=(50, 99)):
+        """Per-reading latency percentiles in microseconds, over the most recent readings."""
+        ordered = sorted(self.latencies)
+        if not ordered:
+            return {p: 0.0 for p in percentiles}
+        return {p: ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1e6 for p in percentiles}
+
+
+def parse_limit(spec):
+    """Turn "sound=60" into ("sound", 60.0); used as the --limit argument type."""
+    import argparse # Already loaded by main(), which is the only caller.
+
+    sensor, _, value = spec.partition("=")
+    try:
+        if sensor in SENSORS:
+            return sensor, float(value)
+    except ValueError:
+        pass
+    raise argparse.ArgumentTypeError(f"invalid limit {spec!r}, expected e.g. sound=60")
+
+
+def main():
+    """Ingest live readings from the command line and report throughput and latency at the end."""
+    import argparse # For the command line interface; imported here so importing the module stays fast.
+    import contextlib # For closing a piped file whichever source is read.
+    import sys # For reading standard input.
+
+    parser = argparse.ArgumentParser(description="Validate and analyse sensor readings as they arrive.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--serial", metavar="PORT", help="serial port of the micro:bit receiver, e.g. /dev/ttyACM0")
+    source.add_argument("--pipe", metavar="PATH", help="pipe or FIFO to read, '-' for standard input")
+    source.add_argument("--replay", metavar="CSV", nargs="?", const=CSV_PATH, help="replay a CSV file (the default)")
+    parser.add_argument("--baud", type=int, default=BAUD_RATE, help="serial baud rate")
+    parser.add_argument("--rate", type=float, default=1000.0, help="replayed readings per second, 0 for no limit")
+    parser.add_argument("--loops", type=int, default=1, help="times to replay the CSV file")
+    parser.add_argument("--limit", type=parse_limit, action="append", default=[], metavar="SENSOR=VALUE",
+                        help="fixed alert limit, e.g. --limit sound=60 (repeatable)")
+    parser.add_argument("--report-every", type=float, default=None, metavar="SECONDS", help="print running statistics")
+    parser.add_argument("--quiet", action="store_true", help="count alerts without printing them")
+    args = parser.parse_args()
+
+    analysis = LiveAnalysis(dict(args.limit), on_alert=(lambda message: None) if args.quiet else print)
+    with contextlib.ExitStack() as stack: # Closes a piped file however the run ends.
+        if args.serial:
+            lines = serial_lines(args.serial, args.baud)
+        elif args.pipe:
+            lines = stream_lines(sys.stdin.buffer if args.pipe == "-" else stack.enter_context(open(args.pipe, "rb")))
+        else:
+            lines = replay_lines(args.replay or CSV_PATH, args.rate, args.loops)
+
+        start = time.perf_counter()
+        try:
+            processed = analysis.consume(validate_readings(parse_readings(timestamped(lines))), args.report_every)
+        except KeyboardInterrupt:
+            processed = sum(stats.count for stats in analysis.sensors.values())
+        seconds = time.perf_counter() - start
+
+    latency = analysis.latency_percentiles()
+    print(f"\n{analysis.status()}")
+    print(f"Analysed {processed:,} readings in {seconds:.2f} s - {processed / seconds:,.0f} readings/s, "
+          f"{analysis.alerts} alerts, latency p50 {latency[50]:.1f} µs, p99 {latency[99]:.1f} µs.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+""" Memoization of per-night analyses: a least-recently-used cache bounded by entries and bytes. """
+
+import hashlib # For content keys of readings.
+import sys # For the size of non-array values.
+from collections import OrderedDict # Keeps entries in least- to most-recently-used order.
+
+import numpy as np # For array sizes and contents.
+from instrumentation import count # Hit and miss counters in traces.
+
+ANALYSIS_ENTRIES = 1_024 # Series whose analyses are kept; a what-if session touches a few hundred at most.
+ANALYSIS_BYTES = 64 * 2**20 # Upper bound on the memory those analyses may hold.
+
+
+def value_size(value):
+    """Approximate memory held by a cached value: array buffers plus the containers around them."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(value_size(item) for item in value.values())
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(value_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def content_key(values):
+    """
+    Short digest of an array's contents, shape and type, so equal readings share cache entries
+    wherever they come from - another Night view, a copy, or a night reloaded from a store.
+    Hashing runs at several GB/s, far quicker than the analyses it saves.
+    """
+    values = np.ascontiguousarray(values)
+    digest = hashlib.blake2b(values.data, digest_size=16)
+    digest.update(f"{values.dtype.str}{values.shape}".encode())
+    return digest.digest()
+
+
+class LRUCache:
+    """
+    Mapping from keys to computed values that forgets the least recently used entries once it
+    holds more than max_entries values or max_bytes bytes. Counts hits, misses and evictions.
+    """
+
+
+    def __init__(self, max_entries=ANALYSIS_ENTRIES, max_bytes=None, name="cache"):
+        """
+        Args:
+            max_entries (int): Most values kept.
+            max_bytes (int): Most bytes kept, as measured by value_size(). No limit if None.
+            name (str): Prefix of the cache's counters in traces, e.g. "analysis_cache.hits".
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict() # key -> (value, size), least recently used first.
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+
+    def __len__(self):
+        """Return the number of cached values."""
+        return len(self._entries)
+
+
+    def __contains__(self, key):
+        """Return whether a key is cached, without counting a hit or refreshing it."""
+        return key in self._entries
+
+
+    def get(self, key, default=None):
+        """Return a cached value and mark it as recently used, or default if it is not cached."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            count(f"{self.name}.misses")
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        count(f"{self.name}.hits")
+        return entry[0]
+
+
+    def put(self, key, value, size=None):
+        """
+        Cache a value, evicting the least recently used ones until both bounds hold again.
+        A value larger than max_bytes on its own is not cached.
+        Args:
+            size (int): Bytes the value holds, measured with value_size() if not given.
+        """
+        size = value_size(value) if size is None else size
+        if key in self._entries:
+            self.bytes -= self._entries.pop(key)[1]
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        self._entries[key] = (value, size)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or (self.max_bytes is not None and self.bytes > self.max_bytes):
+            self.bytes -= self._entries.popitem(last=False)[1][1]
+            self.evictions += 1
+            count(f"{self.name}.evictions")
+
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached value for key, calling compute() and caching its result on a miss.
+        Args:
+            key: Hashable key, e.g. ("summary", content_key(values)).
+            compute: Function with no arguments that produces the value.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            count(f"{self.name}.hits")
+            return entry[0]
+        self.misses += 1
+        count(f"{self.name}.misses")
+        value = compute()
+        self.put(key, value)
+        return value
+
+
+    def clear(self):
+        """Forget every cached value; the counters are kept."""
+        self._entries.clear()
+        self.bytes = 0
+
+
+    def counters(self):
+        """Return the hits, misses, evictions, entries and bytes held, as a dictionary."""
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": len(self._entries), "bytes": self.bytes}
+
+
+# Shared by data_analysis and sleep_simulation, so a night analysed once is free to analyse again.
+analysis_cache = LRUCache(ANALYSIS_ENTRIES, ANALYSIS_BYTES, name="analysis_cache")
@@ -0,0 +1,378 @@
+""" Vectorised generation of simulated nights, drawing every minute of every night in bulk. """
+
+import functools # For building the normal lookup table once.
+from collections.abc import Mapping # Base class for the read-only minute:value views.
+from statistics import NormalDist # For the inverse normal CDF of the lookup table.
+
+import numpy as np # For bulk random draws and flat array storage.
+from data_validation import SENSORS, load_validated # Sensor names and the validated (cached) raw data.
+from data_validation import open_column_files, read_column_meta, write_column_files # Column file storage.
+from instrumentation import span # Times simulate_nights().
+
+MEAN_MINUTES = 480 # Mean number of minutes slept per night.
+STD_MINUTES = 20 # Standard deviation of minutes slept per night.
+SERIES_DTYPE = np.int16 # Simulated readings are whole numbers well inside the int16 range.
+MODELS = ("independent", "ar1") # Minutes drawn independently, or as a fitted AR(1) process.
+AUTOCORRELATION_INTERVAL = 1.0 # Seconds per step of the grid the raw readings are resampled to for fitting.
+MINUTE = 60.0 # Seconds between simulated readings.
+MAX_PHI = 0.999 # Keeps a fitted process stationary.
+MAX_WIDTH = 1024 # Longest lane ar1_filter() cuts a series into.
+CARRY_TOLERANCE = 1e-9 # Relative size below which ar1_filter() stops carrying a value into the next lane.
+DRAW_CHUNK = 1 << 16 # Table lookups normal_draws() makes at a time.
+
+
+class MinuteSeries(Mapping):
+    """Read-only minute:value view over one night's readings, usable wherever a dictionary was."""
+
+    __slots__ = ("values_array",)
+
+
+    def __init__(self, values_array):
+        """
+        Wrap a night's readings without copying them.
+        Args:
+            values_array (np.ndarray): Reading for minute 1, 2, 3, ... in order.
+        """
+        self.values_array = values_array
+
+
+    def __getitem__(self, minute):
+        """Return the reading for a minute, counting from 1."""
+        if isinstance(minute, (int, np.integer)) and 1 <= minute <= len(self.values_array):
+            return int(self.values_array[minute - 1])
+        raise KeyError(minute)
+
+
+    def __iter__(self):
+        """Iterate over the minutes, 1 to the number of readings."""
+        return iter(range(1, len(self.values_array) + 1))
+
+
+    def __len__(self):
+        """Return the number of readings."""
+        return len(self.values_array)
+
+
+    def __repr__(self):
+        """Return a string representation of the series."""
+        return f"MinuteSeries({len(self)} minutes)"
+
+
+def as_series_array(data):
+    """
+    Return a night's readings as an array, accepting minute:value dictionaries, MinuteSeries or arrays.
+    Args:
+        data: Readings for minute 1, 2, 3, ... in order.
+    Returns:
+        np.ndarray of readings; arrays and MinuteSeries are returned without copying.
+    """
+    if isinstance(data, MinuteSeries):
+        return data.values_array
+    if isinstance(data, Mapping):
+        return np.array(list(data.values()))
+    return np.asarray(data)
+
+
+class NightBatch:
+    """Ragged store of simulated nights: one flat array per sensor plus a night offset index."""
+
+
+    def __init__(self, mins_slept, series, night_ids=None, user_ids=None):
+        """
+        Initialise a batch of nights.
+        Args:
+            mins_slept (np.ndarray): Minutes slept on each night, which is also its number of readings.
+            series (dict): Maps each sensor name to a flat array of all nights' readings, night after night.
+            night_ids (np.ndarray): Identifier of each night, defaults to 1, 2, 3, ...
+            user_ids (np.ndarray): User each night belongs to, defaults to 0 for every night.
+        """
+        self.mins_slept = np.asarray(mins_slept, dtype=np.int64)
+        self.offsets = np.zeros(len(self.mins_slept) + 1, dtype=np.int64) # Night i spans offsets[i]:offsets[i + 1].
+        np.cumsum(self.mins_slept, out=self.offsets[1:])
+        self.series = series
+        self.night_ids = np.arange(1, len(self.mins_slept) + 1) if night_ids is None else np.asarray(night_ids)
+        self.user_ids = np.zeros(len(self.mins_slept), dtype=np.int64) if user_ids is None else np.asarray(user_ids)
+
+
+    def __len__(self):
+        """Return the number of nights in the batch."""
+        return len(self.mins_slept)
+
+
+    def __repr__(self):
+        """Return a string representation of the batch."""
+        return f"NightBatch({len(self)} nights, {self.offsets[-1]} minutes)"
+
+
+    def night_series(self, sensor, index):
+        """
+        Return one night's readings for a sensor as a view into the flat array.
+        Args:
+            sensor (str): Sensor name, one of SENSORS.
+            index (int): Position of the night within the batch.
+        """
+        return self.series[sensor][self.offsets[index]:self.offsets[index + 1]]
+
+
+def save_batch(batch, folder):
+    """
+    Write a batch to a folder of raw column files that load_batch() can memory-map.
+    Args:
+        batch (NightBatch): Batch to save.
+        folder: Destination folder, created if needed.
+    """
+    columns = {"mins_slept": batch.mins_slept, "night_ids": batch.night_ids, "user_ids": batch.user_ids}
+    columns.update(batch.series)
+    write_column_files(folder, columns, {"nights": len(batch), "minutes": int(batch.offsets[-1])})
+
+
+def load_batch(folder):
+    """
+    Load a batch saved by save_batch(), memory-mapping its readings instead of reading them into memory.
+    Args:
+        folder: Folder written by save_batch().
+    Returns:
+        NightBatch whose arrays are read-only memory maps.
+    """
+    meta = read_column_meta(folder)
+    if meta is None:
+        raise FileNotFoundError(f"No saved nights in {folder}")
+    columns = open_column_files(folder, meta)
+    series = {sensor: columns[sensor] for sensor in SENSORS}
+    return NightBatch(columns["mins_slept"], series, columns["night_ids"], columns["user_ids"])
+
+
+def sensor_parameters(columns=None):
+    """
+    Compute the mean and standard deviation of each sensor once, from the validated raw data.
+    Args:
+        columns (dict): Validated columns, as returned by data_validation.load_validated().
+    Returns:
+        Dictionary mapping each sensor to (mean, standard deviation), rounded to 2 decimal places.
+    """
+    columns = load_validated() if columns is None else columns
+    parameters = {}
+    for sensor in SENSORS:
+        values = np.asarray(columns[sensor], dtype=np.float64)
+        values = values[~np.isnan(values)] # Only keep the readings that passed validation.
+        parameters[sensor] = (round(float(values.mean()), 2), round(float(values.std()), 2))
+    return parameters
+
+
+def draw_rounded(rng, mean, std, size):
+    """
+    Draw non-negative whole numbers from a normal distribution, in bulk.
+    Args:
+        rng (np.random.Generator): Source of randomness.
+        mean (float): Mean of the normal distribution.
+        std (float): Standard deviation of the normal distribution.
+        size (int): Number of values to draw.
+    Returns:
+        float32 array of absolute values rounded to the nearest integer.
+    """
+    values = rng.standard_normal(size, dtype=np.float32)
+    values *= std
+    values += mean
+    np.abs(values, out=values) # abs() used to avoid invalid negative values.
+    return np.rint(values, out=values)
+
+
+def sensor_autocorrelation(columns=None):
+    """
+    Fit each sensor's minute-to-minute autocorrelation from the validated raw data.
+    The raw log is sampled about once a second, so it is resampled onto a 1-second grid and
+    the correlation between readings 60 seconds apart is measured there, using every pair of
+    filled steps. For an AR(1) process this is exactly the coefficient between consecutive minutes.
+    Args:
+        columns (dict): Validated columns, as returned by data_validation.load_validated().
+    Returns:
+        Dictionary mapping each sensor to its coefficient phi, between 0 and MAX_PHI.
+    """
+    from resampling import resample # Imported here, as only fitting needs it.
+
+    columns = load_validated() if columns is None else columns
+    readings = resample(columns, AUTOCORRELATION_INTERVAL)[1]
+    lag = int(MINUTE / AUTOCORRELATION_INTERVAL)
+    autocorrelation = {}
+    for index, sensor in enumerate(SENSORS):
+        values = readings[:, index]
+        mean, variance = np.nanmean(values), np.nanvar(values)
+        pairs = ~np.isnan(values[lag:]) & ~np.isnan(values[:-lag])
+        if variance == 0 or not pairs.any():
+            autocorrelation[sensor] = 0.0 # Nothing to fit; readings are drawn independently.
+            continue
+        covariance = np.mean((values[:-lag][pairs] - mean) * (values[lag:][pairs] - mean))
+        autocorrelation[sensor] = round(float(np.clip(covariance / variance, 0.0, MAX_PHI)), 3)
+    return autocorrelation
+
+
+@functools.cache
+def normal_table():
+    """
+    Inverse normal CDF at the centres of 65,536 equal-probability bins, as float32.
+    Indexing it with uniform 16-bit integers gives standard normal draws several times faster
+    than rng.standard_normal(), covering +-4.3 standard deviations - finer than the whole-number
+    readings they become.
+    """
+    bins = 2 ** 16
+    return np.array([NormalDist().inv_cdf((i + 0.5) / bins) for i in range(bins)], dtype=np.float32)
+
+
+def normal_draws(rng, table, size):
+    """
+    Look up size entries of a table built on normal_table() with uniform 16-bit indices.
+    The lookups run DRAW_CHUNK at a time with native integer indices, so the indices, the
+    table and the results of each chunk stay in cache.
+    Args:
+        rng (np.random.Generator): Source of randomness.
+        table (np.ndarray): 65,536 entries, e.g. normal_table() scaled and shifted.
+        size (int): Number of draws.
+    Returns:
+        Array of draws with the table's dtype.
+    """
+    uniform = rng.bit_generator.random_raw(-(-size // 4)).view(np.uint16)[:size]
+    values = np.empty(size, dtype=table.dtype)
+    index = np.empty(min(size, DRAW_CHUNK), dtype=np.intp)
+    for start in range(0, size, DRAW_CHUNK):
+        chunk = index[:min(DRAW_CHUNK, size - start)]
+        chunk[:] = uniform[start:start + len(chunk)]
+        np.take(table, chunk, mode="clip", out=values[start:start + len(chunk)]) # "clip" skips the bounds check.
+    return values
+
+
+def ar1_filter(grid, phi):
+    """
+    Run x[t] = phi * x[t - 1] + innovations[t], from x[-1] = 0, without a Python loop per step.
+    The series is cut into lanes of width steps, stored as the columns of grid, so step t is
+    grid[t % width, t // width]. Every lane first runs the recursion from zero, one row (one
+    step of every lane) per NumPy operation. Each lane then gets the true last value of the lane
+    before it, which fades into it as phi**(j + 1); those last values follow the same recursion
+    with coefficient phi**width, and are filled in by calling this function on them.
+    Args:
+        grid (np.ndarray): float32 (width, lanes) array of innovations, filtered in place.
+        phi (float): Coefficient, 0 <= phi < 1.
+    Returns:
+        The filtered grid.
+    """
+    width, lanes = grid.shape
+    step = np.float32(phi)
+    for row in range(1, width):
+        grid[row] += grid[row - 1] * step
+
+    if lanes > 1 and phi > 0:
+        ends = grid[-1].copy() # Last value of each lane, run from zero.
+        if phi ** width >= CARRY_TOLERANCE:
+            ends = ar1_series(ends, phi ** width)
+        # The previous lane's end only reaches the rows where phi**(j + 1) is above CARRY_TOLERANCE.
+        reach = min(width, int(np.log(CARRY_TOLERANCE) / np.log(phi)) + 1)
+        carry = ends[:-1] * step
+        for row in range(reach):
+            grid[row, 1:] += carry
+            carry *= step
+    return grid
+
+
+def ar1_grid(size):
+    """Return the (width, lanes) shape ar1_filter() runs a series of size steps in: about square, 2 to MAX_WIDTH steps wide."""
+    width = max(2, min(MAX_WIDTH, int(np.sqrt(size)))) # At least 2, so the recursion on the lane ends gets shorter.
+    return width, -(-size // width)
+
+
+def ar1_series(innovations, phi):
+    """
+    Run the AR(1) recursion of ar1_filter() over a flat series in time order.
+    Args:
+        innovations (np.ndarray): float32 innovations.
+        phi (float): Coefficient, 0 <= phi < 1.
+    Returns:
+        The filtered float32 series, as a new array.
+    """
+    width, lanes = ar1_grid(len(innovations))
+    grid = np.zeros((lanes, width), dtype=np.float32)
+    grid.reshape(-1)[:len(innovations)] = innovations
+    return ar1_filter(np.ascontiguousarray(grid.T), phi).T.reshape(-1)[:len(innovations)]
+
+
+def draw_ar1_rounded(rng, mean, std, phi, size):
+    """
+    Draw an AR(1) series of non-negative whole numbers with the given stationary mean and standard deviation.
+    Consecutive nights are one continuous series, so each night begins where the last one ended,
+    which is a draw from the same stationary distribution as a freshly started night.
+    The innovations are drawn straight into ar1_filter()'s layout - their order does not matter -
+    and the mean is folded into the lookup table, so the only pass that reorders the readings
+    into time order is the final conversion to SERIES_DTYPE.
+    Args:
+        rng (np.random.Generator): Source of randomness.
+        mean (float): Mean of the readings.
+        std (float): Standard deviation of the readings.
+        phi (float): Correlation between consecutive minutes, 0 <= phi < 1.
+        size (int): Number of values to draw.
+    Returns:
+        SERIES_DTYPE array of absolute values rounded to the nearest integer, capped at the dtype's maximum.
+    """
+    largest = np.iinfo(SERIES_DTYPE).max
+    if phi <= 0: # Independent minutes: round the lookup table once instead of every draw.
+        table = np.minimum(np.rint(np.abs(normal_table() * np.float32(std) + np.float32(mean))), largest)
+        return normal_draws(rng, table.astype(SERIES_DTYPE), size)
+
+    scale = std * np.sqrt(1 - phi * phi) # Innovation scale that keeps the series' std at std.
+    shift = mean * (1 - phi) # Innovation shift that keeps the series' mean at mean.
+    width, lanes = ar1_grid(size)
+    grid = normal_draws(rng, normal_table() * np.float32(scale) + np.float32(shift), width * lanes).reshape(width, lanes)
+    if size:
+        grid[0, 0] = (grid[0, 0] - shift) / np.sqrt(1 - phi * phi) + mean # Start in the stationary distribution.
+    ar1_filter(grid, phi)
+    np.abs(grid, out=grid) # abs() used to avoid invalid negative values.
+    np.rint(grid, out=grid)
+    if abs(mean) + np.abs(normal_table()).max() * scale / (1 - phi) > largest:
+        np.minimum(grid, largest, out=grid) # Keep extreme draws inside the dtype.
+    return grid.T.astype(SERIES_DTYPE).reshape(-1)[:size]
+
+
+def user_seed(seed, user_id):
+    """
+    Return the seed of one user's nights, drawn from the seed of all users.
+    It is the stream np.random.SeedSequence(seed).spawn() gives the user in position user_id - 1,
+    so a cohort and a single user simulated on demand from the same seed get the same nights.
+    Args:
+        seed (int): Seed of all users, e.g. np.random.SeedSequence().entropy.
+        user_id (int): User, from 1.
+    Returns:
+        np.random.SeedSequence for simulate_nights().
+    """
+    return np.random.SeedSequence(seed, spawn_key=(user_id - 1,))
+
+
+def simulate_nights(number_of_nights, seed=None, parameters=None,
+                    mean_minutes=MEAN_MINUTES, std_minutes=STD_MINUTES, autocorrelation=None):
+    """
+    Simulate many nights of sleep data with a few bulk NumPy draws.
+    Args:
+        number_of_nights (int): Number of nights to generate.
+        seed: Seed (or np.random.Generator / SeedSequence) for reproducible runs.
+        parameters (dict): Per-sensor (mean, std), computed with sensor_parameters() if not given.
+        mean_minutes (float): Mean number of minutes slept.
+        std_minutes (float): Standard deviation of minutes slept.
+        autocorrelation (dict): Per-sensor phi, e.g. from sensor_autocorrelation(). When given,
+            readings follow an AR(1) process instead of being drawn independently each minute.
+    Returns:
+        NightBatch holding every night's minute-by-minute readings.
+    """
+    rng = np.random.default_rng(seed)
+    parameters = sensor_parameters() if parameters is None else parameters
+
+    with span("simulate.nights", items=number_of_nights):
+        mins_slept = draw_rounded(rng, mean_minutes, std_minutes, number_of_nights).astype(np.int64)
+        total_minutes = int(mins_slept.sum())
+
+        series = {}
+        for sensor in SENSORS:
+            mean, std = parameters[sensor]
+            if autocorrelation is None:
+                values = draw_rounded(rng, mean, std, total_minutes)
+                np.minimum(values, np.iinfo(SERIES_DTYPE).max, out=values) # Keep extreme draws inside the dtype.
+                series[sensor] = values.astype(SERIES_DTYPE)
+            else:
+                series[sensor] = draw_ar1_rounded(rng, mean, std, autocorrelation[sensor], total_minutes)
+
+    return NightBatch(mins_slept, series)
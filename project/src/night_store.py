@@ -0,0 +1,346 @@
+"""
+Persistent store of simulated nights: SQLite for per-night metadata and statistics, memory-mapped
+column files for the minute-by-minute readings.
+
+    store/
+        nights.db       one row per night: user, night ID, date, minutes slept, position of its readings
+                        in the column files, and summary statistics of every sensor (indexed)
+        light.bin ...   one flat int16 file per sensor, every night's readings one after the other
+
+Queries such as "nights under 450 minutes" only read the database. A night's readings are a slice of
+a memory map, so loading one night copies nothing and a scan only touches the nights it returns.
+"""
+
+import datetime # For night dates.
+import os # For store paths.
+import sqlite3 # For the indexed night metadata.
+
+import numpy as np # For the memory-mapped readings.
+from data_validation import SENSORS # Sensor names, one column file each.
+from night_generator import SERIES_DTYPE, NightBatch # Layout of the stored readings.
+from summary_statistics import summarise_batch # Per-night statistics, computed once when nights are added.
+
+DATABASE_NAME = "nights.db"
+WRITE_TIMEOUT = 600.0 # Seconds an add waits for another process's add to the same store to finish.
+STORE_STATISTICS = ("mean", "median", "q1", "q3", "min", "max") # Per-sensor statistics kept for queries.
+RECORD_COLUMNS = ("user_id", "night_id", "date", "mins_slept", "start") # Metadata of every night.
+STATISTIC_COLUMNS = tuple(f"{sensor}_{name}" for sensor in SENSORS for name in STORE_STATISTICS)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS nights (
+    user_id INTEGER NOT NULL,
+    night_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    mins_slept INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    {", ".join(f"{column} REAL" for column in STATISTIC_COLUMNS)},
+    PRIMARY KEY (user_id, night_id)
+);
+CREATE INDEX IF NOT EXISTS nights_by_night ON nights (night_id);
+CREATE INDEX IF NOT EXISTS nights_by_date ON nights (date);
+CREATE INDEX IF NOT EXISTS nights_by_minutes ON nights (mins_slept);
+"""
+
+
+def night_dates(night_ids, last_date=None):
+    """
+    Date of each night, counting back from last night: night 1 is last_date, night 2 the day before, ...
+    Args:
+        night_ids (np.ndarray): Night IDs, from 1.
+        last_date (datetime.date): Date of night 1, defaults to yesterday.
+    Returns:
+        List of ISO dates ("YYYY-MM-DD"), which sort and compare correctly as text.
+    """
+    last_date = last_date or datetime.date.today() - datetime.timedelta(days=1)
+    last_day = np.datetime64(last_date, "D")
+    return np.datetime_as_string(last_day - (np.asarray(night_ids) - 1).astype("timedelta64[D]")).tolist()
+
+
+class NightStore:
+    """On-disk nights of any number of users, queried through SQLite and read through memory maps."""
+
+
+    def __init__(self, folder):
+        """
+        Open a store, creating it if the folder is new.
+        Args:
+            folder: Folder holding nights.db and the column files.
+        """
+        os.makedirs(folder, exist_ok=True)
+        self.folder = folder
+        self.connection = sqlite3.connect(os.path.join(folder, DATABASE_NAME), timeout=WRITE_TIMEOUT)
+        self.connection.row_factory = sqlite3.Row # Records can be read by column name.
+        self.connection.executescript(SCHEMA)
+        self._series = None # Memory maps, opened on first read and after each add.
+
+
+    def close(self):
+        """Close the database; arrays already returned stay readable."""
+        self.connection.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+
+    def __len__(self):
+        """Return the number of stored nights."""
+        return self.connection.execute("SELECT COUNT(*) FROM nights").fetchone()[0]
+
+
+    def __repr__(self):
+        """Return a string representation of the store."""
+        return f"NightStore({self.folder!r}, {len(self)} nights, {self.minutes()} minutes)"
+
+
+    def minutes(self):
+        """Return the number of readings per sensor that committed nights account for."""
+        return self.connection.execute("SELECT COALESCE(MAX(start + mins_slept), 0) FROM nights").fetchone()[0]
+
+
+    def column_path(self, sensor):
+        """Return the path of a sensor's column file."""
+        return os.path.join(self.folder, f"{sensor}.bin")
+
+
+    def add_batch(self, batch, dates=None, last_date=None):
+        """
+        Append a batch of nights: readings to the column files, metadata and statistics to the database.
+        Readings are written first and the database committed last, so an interrupted add leaves
+        no trace - bytes past the committed nights are cut off before the next add.
+        The whole add holds the database's write lock (BEGIN IMMEDIATE), so several processes can
+        add to one store: each waits up to WRITE_TIMEOUT seconds for the others' adds to finish,
+        and never writes its readings over theirs.
+        Args:
+            batch (NightBatch): Nights to add; (user_id, night_id) pairs must be new to the store.
+            dates (list): ISO date of each night, defaults to night_dates(batch.night_ids, last_date).
+            last_date (datetime.date): Date of night 1 when dates are not given.
+        Raises:
+            sqlite3.IntegrityError: If a night is already stored; nothing is added.
+        """
+        dates = night_dates(batch.night_ids, last_date) if dates is None else list(dates)
+        stats = {sensor: summarise_batch(batch.series[sensor], batch.offsets) for sensor in SENSORS}
+        names = RECORD_COLUMNS + STATISTIC_COLUMNS
+
+        self.connection.commit() # End any implicit transaction, so BEGIN IMMEDIATE can start.
+        self.connection.execute("BEGIN IMMEDIATE") # Other writers wait here until this add commits.
+        start = None
+        try:
+            start = self.minutes() # Read under the lock, so no other add can claim the same rows.
+            for sensor in SENSORS:
+                with open(self.column_path(sensor), "ab") as column_file:
+                    column_file.truncate(start * np.dtype(SERIES_DTYPE).itemsize) # Drop an interrupted add.
+                    np.ascontiguousarray(batch.series[sensor], dtype=SERIES_DTYPE).tofile(column_file)
+
+            columns = [batch.user_ids.tolist(), batch.night_ids.tolist(), dates, batch.mins_slept.tolist(),
+                       (batch.offsets[:-1] + start).tolist()]
+            columns += [stats[sensor][name].tolist() for sensor in SENSORS for name in STORE_STATISTICS]
+            self.connection.executemany(
+                f"INSERT INTO nights ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})", zip(*columns))
+            self.connection.commit() # One transaction: every night is added, or none.
+        except BaseException:
+            if start is not None: # Cut this add's readings off while still holding the lock.
+                for sensor in SENSORS:
+                    os.truncate(self.column_path(sensor), start * np.dtype(SERIES_DTYPE).itemsize)
+            self.connection.rollback()
+            raise
+        self._series = None
+
+
+    def series(self):
+        """
+        Return every committed reading, as read-only memory maps.
+        Returns:
+            Dictionary mapping each sensor to a flat array; night r spans start:start + mins_slept.
+        """
+        if self._series is None:
+            length = self.minutes()
+            self._series = {
+                sensor: np.memmap(self.column_path(sensor), dtype=SERIES_DTYPE, mode="r", shape=(length,))
+                if length else np.empty(0, dtype=SERIES_DTYPE)
+                for sensor in SENSORS
+            }
+        return self._series
+
+
+    def query(self, where="1", parameters=(), order_by="user_id, night_id", limit=None):
+        """
+        Find nights by their metadata and statistics, without reading any readings.
+        Args:
+            where (str): SQL condition on the columns in RECORD_COLUMNS and STATISTIC_COLUMNS
+                (e.g. "sound_max > sound_q3"), with ? placeholders for values. It is pasted into
+                the SQL as it is, so it must be trusted input: pass user values as parameters.
+            parameters (tuple): Values for the placeholders.
+            order_by (str): Comma-separated columns from RECORD_COLUMNS and STATISTIC_COLUMNS,
+                each optionally followed by ASC or DESC.
+            limit (int): Return at most this many nights.
+        Returns:
+            List of sqlite3.Row records.
+        """
+        for term in order_by.split(","):
+            words = term.split()
+            if not (words and words[0] in RECORD_COLUMNS + STATISTIC_COLUMNS
+                    and [word.upper() for word in words[1:]] in ([], ["ASC"], ["DESC"])):
+                raise ValueError(f"Cannot order nights by {term.strip()!r}.")
+        sql = f"SELECT * FROM nights WHERE {where} ORDER BY {order_by}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return self.connection.execute(sql, parameters).fetchall()
+
+
+    def user_filter(self, where, parameters, user_id):
+        """Add a user condition to a query, if a user is given."""
+        if user_id is None:
+            return where, parameters
+        return f"user_id = ? AND {where}", (user_id, *parameters)
+
+
+    def shorter_than(self, minutes, user_id=None, limit=None):
+        """Return the nights with fewer than the given minutes slept (uses the mins_slept index)."""
+        return self.query(*self.user_filter("mins_slept < ?", (minutes,), user_id), limit=limit)
+
+
+    def above(self, sensor, threshold, statistic="max", user_id=None, limit=None):
+        """
+        Return the nights on which a sensor's statistic exceeded a threshold.
+        Args:
+            sensor (str): One of SENSORS.
+            threshold: A number, or the name of another of the night's statistics, e.g. "q3" for
+                "nights whose max sound exceeded their upper quartile".
+            statistic (str): One of STORE_STATISTICS.
+            user_id (int): Only search this user's nights.
+            limit (int): Return at most this many nights.
+        """
+        if sensor not in SENSORS or statistic not in STORE_STATISTICS:
+            raise ValueError(f"Unknown statistic {sensor}_{statistic}.")
+        if isinstance(threshold, str):
+            if threshold not in STORE_STATISTICS:
+                raise ValueError(f"Unknown statistic {sensor}_{threshold}.")
+            where, parameters = f"{sensor}_{statistic} > {sensor}_{threshold}", ()
+        else:
+            where, parameters = f"{sensor}_{statistic} > ?", (threshold,)
+        return self.query(*self.user_filter(where, parameters, user_id), limit=limit)
+
+
+    def night_series(self, record):
+        """
+        Return one night's readings as views into the memory maps, without copying.
+        Args:
+            record: A record returned by query(), or anything with 'start' and 'mins_slept'.
+        Returns:
+            Dictionary mapping each sensor to the night's readings.
+        """
+        series = self.series()
+        start, stop = record["start"], record["start"] + record["mins_slept"]
+        return {sensor: series[sensor][start:stop] for sensor in SENSORS}
+
+
+    def iter_nights(self, records):
+        """Yield (record, readings) for each record, touching only those nights' pages of the column files."""
+        for record in records:
+            yield record, self.night_series(record)
+
+
+    def load_night(self, user_id, night_id):
+        """
+        Load one night, without copying its readings.
+        Returns:
+            NightBatch holding the single night.
+        Raises:
+            KeyError: If the night is not stored.
+        """
+        records = self.query("user_id = ? AND night_id = ?", (user_id, night_id))
+        if not records:
+            raise KeyError((user_id, night_id))
+        return self.to_batch(records)
+
+
+    def load_user(self, user_id):
+        """Load every night of a user, ordered by night ID (night 1 first)."""
+        return self.to_batch(self.query("user_id = ?", (user_id,)))
+
+
+    def to_batch(self, records):
+        """
+        Gather nights into a NightBatch, in the order given.
+        Nights stored back to back (such as a user's nights, added together) stay memory-mapped
+        views; otherwise only the requested nights are copied out.
+        Args:
+            records (list): Records returned by query().
+        """
+        starts = np.array([record["start"] for record in records], dtype=np.int64)
+        mins_slept = np.array([record["mins_slept"] for record in records], dtype=np.int64)
+        night_ids = np.array([record["night_id"] for record in records], dtype=np.int64)
+        user_ids = np.array([record["user_id"] for record in records], dtype=np.int64)
+
+        series = self.series()
+        if len(records) and np.array_equal(starts[1:], starts[:-1] + mins_slept[:-1]):
+            first, last = starts[0], starts[-1] + mins_slept[-1] # One contiguous range.
+            batch_series = {sensor: series[sensor][first:last] for sensor in SENSORS}
+        else:
+            batch_series = {
+                sensor: np.concatenate([series[sensor][start:start + length] for start, length in zip(starts, mins_slept)])
+                if len(records) else np.empty(0, dtype=SERIES_DTYPE)
+                for sensor in SENSORS
+            }
+        return NightBatch(mins_slept, batch_series, night_ids, user_ids)
+
+
+    def users(self):
+        """Return the IDs of every stored user, in order."""
+        return [row[0] for row in self.connection.execute("SELECT DISTINCT user_id FROM nights ORDER BY user_id")]
+
+
+def main():
+    """Fill a store with simulated users or query it from the command line."""
+    import argparse # For the command line interface; imported here so importing the module stays fast.
+    import time # For query timings.
+
+    parser = argparse.ArgumentParser(description="Store simulated nights on disk and query them.")
+    parser.add_argument("folder", help="store folder, created if needed")
+    parser.add_argument("--add-users", type=int, default=0, metavar="USERS", help="simulate and add this many users")
+    parser.add_argument("--nights", type=int, default=100, help="nights per added user")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible simulated users")
+    parser.add_argument("--user", type=int, default=None, help="only query this user's nights")
+    parser.add_argument("--shorter-than", type=int, default=None, metavar="MINUTES", help="nights under this many minutes")
+    parser.add_argument("--above", default=None, metavar="SENSOR_STAT=VALUE",
+                        help="e.g. sound_max=q3 or light_mean=10: nights whose statistic exceeded a value or statistic")
+    parser.add_argument("--show", type=int, default=10, help="matching nights to print")
+    args = parser.parse_args()
+
+    with NightStore(args.folder) as store:
+        if args.add_users:
+            from cohort_simulation import simulate_cohort # Only needed when adding users.
+            first_user = max(store.users(), default=0) + 1
+            start = time.perf_counter()
+            batch = simulate_cohort(args.add_users, args.nights, args.seed)
+            batch.user_ids = batch.user_ids + first_user - 1 # Continue after the stored users.
+            store.add_batch(batch)
+            print(f"Added {len(batch):,} nights in {time.perf_counter() - start:.2f} s.")
+        print(store)
+
+        start = time.perf_counter()
+        if args.shorter_than is not None:
+            records = store.shorter_than(args.shorter_than, args.user)
+        elif args.above is not None:
+            column, _, threshold = args.above.partition("=")
+            sensor, _, statistic = column.partition("_")
+            threshold = threshold if threshold in STORE_STATISTICS else float(threshold)
+            records = store.above(sensor, threshold, statistic or "max", args.user)
+        else:
+            return
+        seconds = time.perf_counter() - start
+
+        print(f"{len(records):,} matching nights in {seconds * 1e3:.1f} ms.")
+        for record, readings in store.iter_nights(records[:args.show]):
+            print(f"  user {record['user_id']}, night {record['night_id']} ({record['date']}): "
+                  f"{record['mins_slept']} minutes, max sound {readings['sound'].max()} dB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+""" Align the interleaved raw sensor readings onto one uniform time grid, as a single 2D array. """
+
+import numpy as np # For bucketing and reductions.
+from data_validation import CSV_PATH, SENSORS, load_validated # Validated raw columns.
+
+AGGREGATIONS = ("mean", "max", "last") # How the readings that fall in one grid step are combined.
+GAP_FILLS = ("none", "previous", "linear") # How grid steps without readings are filled.
+
+
+def time_order(times):
+    """
+    Return an index that puts readings in time order, or None if they already are.
+    Raw logs are written in time order, so the linear check almost always avoids a sort.
+    """
+    if len(times) < 2 or not np.any(times[1:] < times[:-1]):
+        return None
+    return np.argsort(times, kind="stable") # Equal timestamps keep their order in the file.
+
+
+def bucket_values(steps, values, number_of_steps, how):
+    """
+    Combine the readings of one sensor per grid step.
+    Args:
+        steps (np.ndarray): Grid step of each reading, in ascending order.
+        values (np.ndarray): Readings, in the same order, with no NaN.
+        number_of_steps (int): Length of the grid.
+        how (str): One of AGGREGATIONS.
+    Returns:
+        float64 array with one value per grid step, NaN where a step has no readings.
+    """
+    result = np.full(number_of_steps, np.nan)
+    if len(steps) == 0:
+        return result
+
+    # Readings of the same step are next to each other, so each step is one contiguous run.
+    starts = np.flatnonzero(np.r_[True, steps[1:] != steps[:-1]])
+    ends = np.r_[starts[1:], len(steps)]
+    values = values.astype(np.float64)
+    if how == "mean":
+        result[steps[starts]] = np.add.reduceat(values, starts) / (ends - starts)
+    elif how == "max":
+        result[steps[starts]] = np.maximum.reduceat(values, starts)
+    else: # "last"
+        result[steps[starts]] = values[ends - 1]
+    return result
+
+
+def fill_gaps(column, fill, max_gap_steps=None):
+    """
+    Fill the empty steps of one resampled column.
+    Args:
+        column (np.ndarray): Resampled values, NaN where a step has no readings. Filled in place.
+        fill (str): One of GAP_FILLS - leave gaps as NaN, repeat the previous value, or interpolate.
+        max_gap_steps (int): Gaps longer than this many steps are left as NaN. No limit if None.
+    Returns:
+        The filled column.
+    """
+    present = ~np.isnan(column)
+    if fill == "none" or present.all() or not present.any():
+        return column
+
+    positions = np.arange(len(column))
+    previous = np.maximum.accumulate(np.where(present, positions, -1)) # Last filled step at or before each step.
+    following = np.minimum.accumulate(np.where(present, positions, len(column))[::-1])[::-1]
+    fillable = ~present & (previous >= 0)
+    if fill == "linear":
+        fillable &= following < len(column) # Nothing to interpolate towards after the last reading.
+    if max_gap_steps is not None:
+        fillable &= (following - previous - 1) <= max_gap_steps
+
+    if fill == "previous":
+        column[fillable] = column[previous[fillable]]
+    else: # "linear"
+        column[fillable] = np.interp(positions[fillable], positions[present], column[present])
+    return column
+
+
+def resample(columns, interval=60.0, how="mean", fill="none", max_gap=None, start=None, stop=None):
+    """
+    Bucket every sensor's readings onto a shared grid of fixed-width time steps, in linear time.
+    Each reading goes to step floor((time - start) / interval); readings outside [start, stop) are dropped.
+    Args:
+        columns (dict): Validated columns, as returned by data_validation.load_validated().
+        interval (float): Width of each grid step in seconds, e.g. 1 or 60.
+        how (str): How readings within a step are combined - one of AGGREGATIONS.
+        fill (str): How steps without readings are filled - one of GAP_FILLS.
+        max_gap (float): Longest gap, in seconds, that fill may bridge. No limit if None.
+        start (float): Time of the first grid step, defaults to the first reading.
+        stop (float): End of the grid (exclusive), defaults to just after the last reading.
+    Returns:
+        grid, readings: Start time of each step, and an array of shape (steps, len(SENSORS))
+        with one column per sensor in SENSORS order, NaN where no value is available.
+    """
+    if interval <= 0:
+        raise ValueError("interval must be positive.")
+    if how not in AGGREGATIONS:
+        raise ValueError(f"how must be one of {AGGREGATIONS}.")
+    if fill not in GAP_FILLS:
+        raise ValueError(f"fill must be one of {GAP_FILLS}.")
+
+    times = np.asarray(columns["time"], dtype=np.float64)
+    order = time_order(times)
+    if order is not None:
+        times = times[order]
+
+    start = (float(times[0]) if len(times) else 0.0) if start is None else start
+    stop = (float(times[-1]) + interval if len(times) else start) if stop is None else stop
+    number_of_steps = max(0, int(np.ceil((stop - start) / interval)))
+    grid = start + np.arange(number_of_steps) * interval
+
+    steps = np.floor((times - start) / interval).astype(np.int64)
+    inside = (times >= start) & (steps < number_of_steps) & (times < stop)
+    max_gap_steps = None if max_gap is None else int(max_gap // interval)
+
+    readings = np.empty((number_of_steps, len(SENSORS)))
+    for index, sensor in enumerate(SENSORS):
+        values = np.asarray(columns[sensor])
+        if order is not None:
+            values = values[order]
+        keep = inside & ~np.isnan(values) # Each raw row holds only one sensor's reading.
+        column = bucket_values(steps[keep], values[keep], number_of_steps, how)
+        readings[:, index] = fill_gaps(column, fill, max_gap_steps)
+    return grid, readings
+
+
+def main():
+    """Resample the validated raw data from the command line and print a short summary."""
+    import argparse # For the command line interface; imported here so importing the module stays fast.
+
+    parser = argparse.ArgumentParser(description="Resample the validated sensor data onto a uniform time grid.")
+    parser.add_argument("--path", default=CSV_PATH, help="raw CSV file to resample")
+    parser.add_argument("--interval", type=float, default=60.0, help="grid step in seconds")
+    parser.add_argument("--how", default="mean", choices=AGGREGATIONS, help="aggregation within a step")
+    parser.add_argument("--fill", default="none", choices=GAP_FILLS, help="how to fill steps without readings")
+    parser.add_argument("--max-gap", type=float, default=None, help="longest gap in seconds to fill")
+    parser.add_argument("--output", default=None, help="save the grid and readings to this .npz file")
+    args = parser.parse_args()
+
+    grid, readings = resample(load_validated(args.path), args.interval, args.how, args.fill, args.max_gap)
+    print(f"{len(grid):,} steps of {args.interval:g} s from {grid[0]:.2f} s:" if len(grid) else "No readings.")
+    for index, sensor in enumerate(SENSORS):
+        filled = int((~np.isnan(readings[:, index])).sum())
+        print(f"{sensor:<9} {filled:,} of {len(grid):,} steps filled")
+    if args.output:
+        np.savez(args.output, grid=grid, readings=readings, sensors=np.array(SENSORS))
+
+
+if __name__ == "__main__":
+    main()
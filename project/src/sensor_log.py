@@ -0,0 +1,266 @@
+"""
+Compact binary sensor log: one fixed-width record per reading, memory-mapped for reading.
+
+The raw CSV spends a line, a text timestamp and four mostly-empty columns on every reading,
+and has to be parsed before anything can use it. A sensor log stores the same readings as
+8-byte records - timestamp, reading, sensor ID - after a 16-byte header:
+
+    header:  magic b"SLPLOG", format version (uint16), ticks per second (uint32), reserved
+    record:  time (uint32 ticks), value (int16), sensor (uint8, index into SENSORS), reserved
+
+Records are in time order, so a time range is found by binary search over the memory-mapped
+file, reading a few dozen records however large the log is. Readings are stored raw and
+validated when read, exactly as the CSV's are, a block of records at a time, so a log larger
+than memory can be validated and summarised straight from the memory map.
+"""
+
+import bisect # For binary search over memory-mapped timestamps.
+import os # For file sizes.
+
+import numpy as np # For records and memory mapping.
+from data_validation import (CSV_PATH, SENSORS, iter_csv_blocks, read_header, validate_columns,
+                             validate_values) # Raw CSV parsing and the validation rules.
+from instrumentation import span # Times conversions and column expansion.
+
+MAGIC = b"SLPLOG"
+FORMAT_VERSION = 1
+TICKS_PER_SECOND = 1000 # Millisecond timestamps: the CSV has two decimals, and 2**32 ms is 49 days.
+HEADER = np.dtype([("magic", "S6"), ("version", "<u2"), ("ticks_per_second", "<u4"), ("reserved", "<u4")])
+RECORD = np.dtype([("time", "<u4"), ("value", "<i2"), ("sensor", "u1"), ("reserved", "u1")])
+LOG_EXTENSION = ".slog"
+BLOCK_RECORDS = 1 << 17 # Records validated at a time: 1 MB of log, about 3 MB of columns.
+
+
+def is_sensor_log(path):
+    """Return whether a path names a binary sensor log rather than a raw CSV file."""
+    return str(path).endswith(LOG_EXTENSION)
+
+
+def block_records(block, ticks_per_second=TICKS_PER_SECOND):
+    """
+    Turn a block of parsed CSV rows into log records.
+    Args:
+        block (np.ndarray): Array of shape (rows, 5) from data_validation.parse_csv_chunk().
+        ticks_per_second (int): Timestamp resolution.
+    Returns:
+        Record array with one record per non-empty reading, in row order.
+    Raises:
+        ValueError: If a timestamp or reading does not fit the format.
+    """
+    rows, sensors = np.nonzero(~np.isnan(block[:, 1:])) # Row-major, so time order is kept.
+    ticks = np.round(block[rows, 0] * ticks_per_second)
+    values = block[rows, 1 + sensors]
+    if len(ticks) and (np.isnan(ticks).any() or ticks.min() < 0 or ticks.max() > np.iinfo(np.uint32).max):
+        raise ValueError("Timestamps must be between 0 and 2**32 ticks.")
+    if np.any(values != np.round(values)) or np.any(np.abs(values) > np.iinfo(np.int16).max):
+        raise ValueError("Readings must be whole numbers that fit in 16 bits.")
+
+    records = np.zeros(len(rows), dtype=RECORD)
+    records["time"] = ticks
+    records["value"] = values
+    records["sensor"] = sensors
+    return records
+
+
+def convert_csv(csv_path=CSV_PATH, log_path=None, ticks_per_second=TICKS_PER_SECOND):
+    """
+    Convert a raw CSV file into a sensor log, block by block in bounded memory.
+    Args:
+        csv_path: Path to the raw CSV file.
+        log_path: Path of the log to write; the CSV path with a .slog extension if None.
+        ticks_per_second (int): Timestamp resolution.
+    Returns:
+        log_path, records: Where the log was written and how many readings it holds.
+    Raises:
+        ValueError: If the CSV's timestamps go backwards, or a value does not fit the format.
+    """
+    if log_path is None:
+        log_path = os.path.splitext(csv_path)[0] + LOG_EXTENSION
+    header = np.zeros(1, dtype=HEADER)
+    header["magic"], header["version"], header["ticks_per_second"] = MAGIC, FORMAT_VERSION, ticks_per_second
+
+    count, last = 0, 0
+    temp_path = log_path + ".tmp"
+    try:
+        with span("log.convert") as stage, open(csv_path, "rb") as data_csv, open(temp_path, "wb") as log_file:
+            header.tofile(log_file)
+            for block in iter_csv_blocks(data_csv, read_header(data_csv)):
+                records = block_records(block, ticks_per_second)
+                if len(records) and (records["time"][0] < last or np.any(np.diff(records["time"].astype(np.int64)) < 0)):
+                    raise ValueError(f"Timestamps in {csv_path} are not in time order.")
+                if len(records):
+                    last = records["time"][-1]
+                records.tofile(log_file)
+                count += len(records)
+                stage.add_items(len(records))
+        os.replace(temp_path, log_path) # A half-written log is never left under the real name.
+    except BaseException: # Including interruptions: never leave the temporary file behind.
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return log_path, count
+
+
+class SensorLog:
+    """
+    Read-only view of a sensor log. The records are memory-mapped, so opening a log of any
+    size is instant and only the pages a query touches are read from disk.
+    """
+
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Path to a log written by convert_csv().
+        Raises:
+            ValueError: If the file is not a sensor log of a known version.
+        """
+        self.path = path
+        header = np.fromfile(path, dtype=HEADER, count=1)
+        if len(header) == 0 or header["magic"][0] != MAGIC or header["version"][0] != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} sensor log.")
+        self.ticks_per_second = int(header["ticks_per_second"][0])
+
+        # A trailing partial record (e.g. from an interrupted write) is ignored.
+        count = (os.path.getsize(path) - HEADER.itemsize) // RECORD.itemsize
+        if count:
+            self.records = np.memmap(path, dtype=RECORD, mode="r", offset=HEADER.itemsize, shape=(count,))
+        else:
+            self.records = np.empty(0, dtype=RECORD) # Empty files cannot be memory-mapped.
+
+
+    def __len__(self):
+        """Return the number of readings in the log."""
+        return len(self.records)
+
+
+    def span_seconds(self):
+        """Return the first and last timestamps in seconds, or None for an empty log."""
+        if not len(self.records):
+            return None
+        return float(self.records["time"][0]) / self.ticks_per_second, float(self.records["time"][-1]) / self.ticks_per_second
+
+
+    def time_range(self, start=None, stop=None):
+        """
+        Return the records with start <= time < stop, found by binary search.
+        Args:
+            start (float): First second included, from the beginning of the log if None.
+            stop (float): First second excluded, to the end of the log if None.
+        Returns:
+            Memory-mapped slice of the records; no readings are copied.
+        """
+        times = self.records["time"] # Strided view; bisect reads only the records it probes.
+        first = 0 if start is None else bisect.bisect_left(times, int(np.ceil(start * self.ticks_per_second)))
+        last = len(times) if stop is None else bisect.bisect_left(times, int(np.ceil(stop * self.ticks_per_second)), lo=first)
+        return self.records[first:last]
+
+
+    def readings(self, sensor, start=None, stop=None):
+        """
+        Return one sensor's raw readings in a time range.
+        Args:
+            sensor (str): Name of the sensor, one of SENSORS.
+            start, stop (float): Time range in seconds, as for time_range().
+        Returns:
+            times, values: float64 seconds and float32 readings, copied from the range only.
+        """
+        records = self.time_range(start, stop)
+        mine = records["sensor"] == SENSORS.index(sensor)
+        return records["time"][mine] / self.ticks_per_second, records["value"][mine].astype(np.float32)
+
+
+    def validated(self, sensor, start=None, stop=None):
+        """
+        Return one sensor's valid readings in a time range, with the validation rules applied.
+        Args:
+            sensor (str): Name of the sensor, one of SENSORS.
+            start, stop (float): Time range in seconds, as for time_range().
+        Returns:
+            times, values: as readings(), with invalid readings left out.
+        """
+        times, values = self.readings(sensor, start, stop)
+        values = validate_values(sensor, values)
+        valid = ~np.isnan(values)
+        return times[valid], values[valid]
+
+
+    def validated_blocks(self, start=None, stop=None, block_records=BLOCK_RECORDS):
+        """
+        Validate a time range a block of records at a time, in bounded memory however large the log.
+        Args:
+            start, stop (float): Time range in seconds, as for time_range().
+            block_records (int): Records per block.
+        Yields:
+            Validated columns of each block, in the layout of data_validation.load_columns().
+        """
+        records = self.time_range(start, stop)
+        for first in range(0, len(records), block_records):
+            yield validate_columns(self.record_columns(records[first:first + block_records]))
+
+
+    def record_columns(self, records):
+        """
+        Expand records into the layout of data_validation.read_columns(): one row per reading,
+        NaN for the other sensors. Costs 24 bytes of memory per 8-byte record.
+        """
+        columns = {"time": records["time"] / self.ticks_per_second}
+        sensor, value = np.asarray(records["sensor"]), records["value"].astype(np.float32)
+        for index, name in enumerate(SENSORS):
+            columns[name] = np.where(sensor == index, value, np.float32(np.nan))
+        return columns
+
+
+    def columns(self, start=None, stop=None):
+        """
+        Return a time range in the layout of data_validation.read_columns(), in memory, so the
+        same validation and analysis code runs on it. For ranges too large for memory, use
+        validated_blocks().
+        Args:
+            start, stop (float): Time range in seconds, as for time_range().
+        Returns:
+            Dictionary with a float64 'time' array and a float32 array per sensor, NaN where empty.
+        """
+        with span("log.columns") as stage:
+            records = self.time_range(start, stop)
+            columns = self.record_columns(records)
+            stage.add_items(len(records))
+        return columns
+
+
+def main():
+    """Convert a raw CSV file to a sensor log, or read a time range back from one."""
+    import argparse # For the command line interface; imported here so importing the module stays fast.
+    import time # For conversion throughput.
+
+    parser = argparse.ArgumentParser(description="Convert raw sensor CSV files to compact binary logs and query them.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert = commands.add_parser("convert", help="write a binary log of a raw CSV file")
+    convert.add_argument("csv", nargs="?", default=CSV_PATH, help="raw CSV file")
+    convert.add_argument("--output", default=None, help="log to write, next to the CSV file by default")
+
+    show = commands.add_parser("range", help="show a sensor's readings in a time range")
+    show.add_argument("log", help="sensor log")
+    show.add_argument("--sensor", choices=SENSORS, default="light")
+    show.add_argument("--start", type=float, default=None, help="first second")
+    show.add_argument("--stop", type=float, default=None, help="first second after the range")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        start = time.perf_counter()
+        log_path, count = convert_csv(args.csv, args.output)
+        seconds = time.perf_counter() - start
+        csv_bytes, log_bytes = os.path.getsize(args.csv), os.path.getsize(log_path)
+        print(f"Wrote {count:,} readings to {log_path} in {seconds:.2f} s.")
+        print(f"{csv_bytes:,} bytes of CSV -> {log_bytes:,} bytes of log ({log_bytes / csv_bytes:.0%}).")
+    else:
+        log = SensorLog(args.log)
+        times, values = log.readings(args.sensor, args.start, args.stop)
+        print(f"{len(log):,} readings from {log.span_seconds()} s; {len(values):,} {args.sensor} readings in range.")
+        for reading_time, value in list(zip(times.tolist(), values.tolist()))[:20]:
+            print(f"{reading_time:>10.2f} s  {value:g}")
+
+
+if __name__ == "__main__":
+    main()
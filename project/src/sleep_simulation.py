@@ -13,16 +13,30 @@ For each night,
 Finally, "what if" questions will be implemented to understand the simulated sleep data."""
 
 import numpy as np # To generate random values through normal distribution, and perform statistical calculations.
-import matplotlib.pyplot as plt # To plot graphs for visual representation of sleep data.
-from data_validation import main as validate_data # Import the data validation function from the data_validation module.
-from data_analysis import analyse_data # Import the data analysis function from the data_analysis module.
+from data_validation import SENSORS # Sensor names, in the order Night stores them.
+from data_analysis import DATA_NAMES, analyse_data, validated_data # Analysis, and the validated data on first use.
+from summary_statistics import summarise # Statistics kernel shared with data_analysis.
+from duration_index import DurationIndex # Constant-time sleep duration queries.
+from downsampling import downsample # Thins each night's plot to the points it can show.
+from night_generator import MEAN_MINUTES, STD_MINUTES, MinuteSeries, as_series_array, simulate_nights # Bulk generator.
+from instrumentation import traced # Times the simulation and the what-if answers.
+from memo_cache import analysis_cache, content_key # Night statistics, shared with data_analysis.
+
+
+def __getattr__(name):
+    """Keep sleep_simulation.light_dict (and the other dictionaries) working, validating only when first read."""
+    if name in DATA_NAMES:
+        return validated_data()[DATA_NAMES.index(name)]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-light_dict, sound_dict, temp_dict, movement_dict = validate_data()  # Unpack dictionaries from the validation function.
 
 # -------------------- OBJECT DECLARATIONS -------------------
 class Night:
     """Class representing a night of sleep with sensor data."""
-    
+
+    # Fixed attributes keep each Night small; the readings themselves live in shared NumPy arrays.
+    __slots__ = ("night_id", "mins_slept", "_series", "_start")
+
 
     def __init__(self, night_id, mins_slept, light_dict, sound_dict, temp_dict, movement_dict):
         """
@@ -30,17 +44,61 @@ class Night:
         Args: 
             night_id (int): Unique identifier for the night.
             mins_slept (int): Number of minutes slept on that night.
-            light_dict (dict): Dictionary containing light data for each minute.
-            sound_dict (dict): Dictionary containing sound data for each minute.
-            temp_dict (dict): Dictionary containing temperature data for each minute.
-            movement_dict (dict): Dictionary containing movement data for each minute.
+            light_dict (dict): Light data for each minute, as a dictionary or an array.
+            sound_dict (dict): Sound data for each minute, as a dictionary or an array.
+            temp_dict (dict): Temperature data for each minute, as a dictionary or an array.
+            movement_dict (dict): Movement data for each minute, as a dictionary or an array.
         """
         self.night_id = night_id
         self.mins_slept = mins_slept 
-        self.light_dict = light_dict
-        self.sound_dict = sound_dict
-        self.temp_dict = temp_dict
-        self.movement_dict = movement_dict
+        series = (light_dict, sound_dict, temp_dict, movement_dict)
+        self._series = {sensor: as_series_array(data) for sensor, data in zip(SENSORS, series)}
+        self._start = 0 # Position of this night's first reading in each array.
+
+
+    @classmethod
+    def from_batch(cls, batch, index):
+        """
+        Create a Night that reads its data straight from a NightBatch, without copying.
+        Args:
+            batch (NightBatch): Batch of simulated nights.
+            index (int): Position of the night within the batch.
+        """
+        night = cls.__new__(cls)
+        night.night_id = int(batch.night_ids[index])
+        night.mins_slept = int(batch.mins_slept[index])
+        night._series = batch.series # Shared by every night of the batch.
+        night._start = int(batch.offsets[index])
+        return night
+
+
+    def get_series(self, sensor):
+        """Return this night's readings for a sensor as a NumPy array (a view, not a copy)."""
+        return self._series[sensor][self._start:self._start + self.mins_slept]
+
+
+    @property
+    def light_dict(self):
+        """Read-only minute:value view of the light data."""
+        return MinuteSeries(self.get_series("light"))
+
+
+    @property
+    def sound_dict(self):
+        """Read-only minute:value view of the sound data."""
+        return MinuteSeries(self.get_series("sound"))
+
+
+    @property
+    def temp_dict(self):
+        """Read-only minute:value view of the temperature data."""
+        return MinuteSeries(self.get_series("temp"))
+
+
+    @property
+    def movement_dict(self):
+        """Read-only minute:value view of the movement data."""
+        return MinuteSeries(self.get_series("movement"))
 
 
     def __repr__(self):
@@ -68,55 +126,60 @@ class Night:
         return self.mins_slept
         
 
+    @traced("plot.night")
     def present_sleep_data(self):
         """Present the sleep data for the night, including mean and standard deviation of each metric."""
 
-        self.mean_light, self.std_light = get_mean_std(self.light_dict) # Get mean and std to use to present sleep data.
-        self.mean_sound, self.std_sound = get_mean_std(self.sound_dict)
-        self.mean_temp, self.std_temp = get_mean_std(self.temp_dict)
-        self.mean_movement, self.std_movement = get_mean_std(self.movement_dict)
+        mean_light, std_light = get_mean_std(self.light_dict) # Get mean and std to use to present sleep data.
+        mean_sound, std_sound = get_mean_std(self.sound_dict)
+        mean_temp, std_temp = get_mean_std(self.temp_dict)
+        mean_movement, std_movement = get_mean_std(self.movement_dict)
         
         print(f"\n---------- Sleep analysis for night {self.night_id} ----------\n")
         
         self.get_and_show_time_slept() # first present the time slept.
 
         # Present the mean and standard deviation of each metric, with appropriate formatting and units.
-        print(f"Mean light level: {self.mean_light} lx. Standard deviation of light level: {self.std_light} lx.")
-        print(f"Mean sound level: {self.mean_sound} dB. Standard deviation of sound level: {self.std_sound} dB.")
-        print(f"Mean temperature: {self.mean_temp} °C. Standard deviation of temperature: {self.std_temp} °C.")
-        print(f"Mean movement level: {self.mean_movement} mg. Standard deviation of movement level: {self.std_movement} mg.\n")
+        print(f"Mean light level: {mean_light} lx. Standard deviation of light level: {std_light} lx.")
+        print(f"Mean sound level: {mean_sound} dB. Standard deviation of sound level: {std_sound} dB.")
+        print(f"Mean temperature: {mean_temp} °C. Standard deviation of temperature: {std_temp} °C.")
+        print(f"Mean movement level: {mean_movement} mg. Standard deviation of movement level: {std_movement} mg.\n")
         
+        import matplotlib.pyplot as plt # Imported on first plot, so using Night without graphs never loads matplotlib.
+
         # Plot four graphs together to display sleep data
+        minutes = np.arange(1, self.mins_slept + 1) # Shared horizontal axis values.
 
-        self.figure, self.axis = plt.subplots(2, 2)
+        figure, axis = plt.subplots(2, 2)
 
         # All horizontal axes will be time in minutes, vertical axes will be the metric value.
-        self.axis[0, 0].set_xlabel("Time (minutes)")
-        self.axis[0, 1].set_xlabel("Time (minutes)")
-        self.axis[1, 0].set_xlabel("Time (minutes)")
-        self.axis[1, 1].set_xlabel("Time (minutes)")
+        axis[0, 0].set_xlabel("Time (minutes)")
+        axis[0, 1].set_xlabel("Time (minutes)")
+        axis[1, 0].set_xlabel("Time (minutes)")
+        axis[1, 1].set_xlabel("Time (minutes)")
 
         # Plotting the light graph in the first subplot:
-        self.axis[0, 0].plot(self.light_dict.keys(), self.light_dict.values())
-        self.axis[0, 0].set_title(f"Night {self.night_id}: Light vs Time")
-        self.axis[0, 0].set_ylabel("Light Level (lx)")
+        axis[0, 0].plot(*downsample(minutes, self.get_series("light")))
+        axis[0, 0].set_title(f"Night {self.night_id}: Light vs Time")
+        axis[0, 0].set_ylabel("Light Level (lx)")
         
         # Plotting the sound graph in the second subplot:
-        self.axis[0, 1].plot(self.sound_dict.keys(), self.sound_dict.values())
-        self.axis[0, 1].set_title(f"Night {self.night_id}: Sound vs Time")
-        self.axis[0, 1].set_ylabel("Sound Level (dB)")
+        axis[0, 1].plot(*downsample(minutes, self.get_series("sound")))
+        axis[0, 1].set_title(f"Night {self.night_id}: Sound vs Time")
+        axis[0, 1].set_ylabel("Sound Level (dB)")
         
         # Plotting the temperature graph in the third subplot:
-        self.axis[1, 0].plot(self.temp_dict.keys(), self.temp_dict.values())
-        self.axis[1, 0].set_title(f"Night {self.night_id}: Temperature vs Time")
-        self.axis[1, 0].set_ylabel("Temperature (°C)")
+        axis[1, 0].plot(*downsample(minutes, self.get_series("temp")))
+        axis[1, 0].set_title(f"Night {self.night_id}: Temperature vs Time")
+        axis[1, 0].set_ylabel("Temperature (°C)")
         
         # Plotting the movement graph in the fourth subplot:
-        self.axis[1, 1].plot(self.movement_dict.keys(), self.movement_dict.values())
-        self.axis[1, 1].set_title(f"Night {self.night_id}: Movement vs Time")
-        self.axis[1, 1].set_ylabel("Movement Level (mg)")
+        axis[1, 1].plot(*downsample(minutes, self.get_series("movement")))
+        axis[1, 1].set_title(f"Night {self.night_id}: Movement vs Time")
+        axis[1, 1].set_ylabel("Movement Level (mg)")
         
         plt.show() # Display graphs.
+        plt.close(figure) # Free the figure once shown, so figures don't pile up in long or headless runs.
         
     
 # -------------------- HELPER FUNCTION DECLARATIONS --------------------
@@ -130,12 +193,16 @@ def get_mean_std(dictionary):
         mean_val (float): rounded to 2 decimal places.
         standard_deviation (float): Standard deviation, rounded to 2 decimal places.
     """
-    arr = np.array(list(dictionary.values())) # Convert the dictionary values to a numpy array for statistical calculations.
+    arr = as_series_array(dictionary) # Night readings are used in place; dictionaries are converted.
 
-    mean_val = round(np.mean(arr), 2) # Mean value, affected by outliers
-    standard_deviation = round(np.std(arr), 2) # Standard deviation, affected by outliers
-    
-    return mean_val, standard_deviation
+    def compute():
+        summary = summarise(arr) # Same kernel (population std) as analyse_data() and the batch reports.
+        mean_val = round(summary["mean"], 2) # Mean value, affected by outliers
+        standard_deviation = round(summary["std"], 2) # Standard deviation, affected by outliers
+        return mean_val, standard_deviation
+
+    # A night presented again (or the same readings in another Night) reuses the first result.
+    return analysis_cache.get_or_compute(("mean_std", content_key(arr)), compute)
 
 
 def get_normal_distribution(mean, std, size):
@@ -148,55 +215,56 @@ def get_normal_distribution(mean, std, size):
     Returns:
         list: A list of random values generated from the normal distribution, rounded to the nearest integer."""
 
-    return [round(abs(val)) for val in (np.random.normal(mean, std, size)).tolist()] # abs() used to avoid invalid negative values. 
+    return np.rint(np.abs(np.random.normal(mean, std, size))).astype(int).tolist() # abs() used to avoid invalid negative values.
     
 
 # -------------------- GENERATING DATA --------------------
 
 NUMBER_OF_NIGHTS = 100 # this is the number of Nights in the database
-MEAN_MINUTES = 480 # this is the mean number of minutes slept
-STD_MINUTES = 20 # this is the standard deviation of minutes slept
 
-mins_slept_per_night = get_normal_distribution(MEAN_MINUTES, STD_MINUTES, NUMBER_OF_NIGHTS) # Contains a list of integers representing the minutes slept per night
 
-list_of_nights = [] # a list of Night objects
-# This is the main dataset of the file, storing Night objects, which each object contains its own night's sleep data.
+@traced("simulate.generate_nights")
+def generate_nights(number_of_nights=NUMBER_OF_NIGHTS, seed=None):
+    """
+    Generate the database of Night objects.
+    Every night's minutes slept and minute-by-minute light, sound, temp and movement values are
+    drawn in bulk by night_generator.simulate_nights(); each Night reads its slice of the batch.
+    Args:
+        number_of_nights (int): Number of nights to generate.
+        seed (int): Optional seed, so the same nights can be generated again.
+    Returns:
+        list: Night objects, with night IDs starting from 1.
+    """
+    batch = simulate_nights(number_of_nights, seed, mean_minutes=MEAN_MINUTES, std_minutes=STD_MINUTES)
 
-# For each night, generate a unique number of minutes slept, and then generate light, sound, temp, and movement values for each minute slept.
-for index in range(len(mins_slept_per_night)):
-    night_id = index + 1 # Night ID starts from 1, not 0.
-    mins_slept = mins_slept_per_night[index] # Mins slept on a given night.
-    
-    # Generate light values, the light value recorded for every minute.
-    light_mean, light_std = get_mean_std(light_dict) # gets light mean and std from other file
-    light_values_per_min = get_normal_distribution(light_mean, light_std, mins_slept) # now contains a list of the light value recorded for each minute
-    
-    # Repeat for other metrics.
-    sound_mean, sound_std = get_mean_std(sound_dict)
-    sound_values_per_min = get_normal_distribution(sound_mean, sound_std, mins_slept)
-    
-    temp_mean, temp_std = get_mean_std(temp_dict)
-    temp_values_per_min = get_normal_distribution(temp_mean, temp_std, mins_slept)
-    
-    movement_mean, movement_std = get_mean_std(movement_dict)
-    movement_values_per_min = get_normal_distribution(movement_mean, movement_std, mins_slept)
-    
-    min_by_min_list = list(range(1, mins_slept + 1)) # contains a list of integers [1, 2, 3, ... , mins_slept - 1, mins_slept]
-    current_light_dict = dict(zip(min_by_min_list, light_values_per_min))
-    current_sound_dict = dict(zip(min_by_min_list, sound_values_per_min))
-    current_temp_dict = dict(zip(min_by_min_list, temp_values_per_min))
-    current_movement_dict = dict(zip(min_by_min_list, movement_values_per_min))
-    
-    # set up a new Night object. pass in id, mins slept, and all dictionaries containing data.
-    new_night = Night(night_id, mins_slept, current_light_dict, current_sound_dict, current_temp_dict, current_movement_dict)
-    list_of_nights.append(new_night)
-    
+    # Each Night is a light view onto the batch's shared arrays.
+    list_of_nights = [Night.from_batch(batch, index) for index in range(len(batch))]
+    return list_of_nights
+
+
+def stored_nights(folder, user_id=1, number_of_nights=NUMBER_OF_NIGHTS, seed=None):
+    """
+    Load a user's nights from a night store, simulating and saving them the first time.
+    The same nights come back on every later run, read straight from the store's memory-mapped files.
+    Args:
+        folder: NightStore folder, created if needed.
+        user_id (int): The user whose nights to load.
+        number_of_nights (int): Number of nights to generate if the user has none stored.
+        seed (int): Optional seed for the first generation.
+    Returns:
+        list: Night objects, ordered by night ID from 1.
+    """
+    from night_store import NightStore # Imported here, so runs without a store never open SQLite.
 
-# -------------------- TESTING THE DATABASE --------------------
+    with NightStore(folder) as store:
+        batch = store.load_user(user_id)
+        if len(batch) == 0:
+            batch = simulate_nights(number_of_nights, seed, mean_minutes=MEAN_MINUTES, std_minutes=STD_MINUTES)
+            batch.user_ids = np.full(len(batch), user_id)
+            store.add_batch(batch)
+            batch = store.load_user(user_id)
+    return [Night.from_batch(batch, index) for index in range(len(batch))]
 
-# Present the sleep data for the first 3 nights
-for night in list_of_nights[:3]:
-    night.present_sleep_data()
 
 # -----------------------------------------------------------------
 
@@ -205,18 +273,7 @@ for night in list_of_nights[:3]:
 
 # ---------- WHAT IF QUESTION 1: "Am I getting enough sleep?" -----------
 
-username = input("What is your name? ")
-target_hours = input(f"Hi {username.title()}! How many hours of sleep do you want to get every night (1-24)? ")
-
-# Validate the target_hours input to ensure it is an integer between 1 and 24.
-if not target_hours.isdigit() or int(target_hours) > 24 or int(target_hours) < 1:
-    # If the input is not valid, prompt the user to enter a valid integer.
-    while not target_hours.isdigit() or int(target_hours) > 24 or int(target_hours) < 1:
-        target_hours = input("Invalid entry. Please enter an integer between 1-24. ")
-        
-target_hours = int(target_hours) # convert to integer
-
-
+@traced("what_if.enough_sleep")
 def enough_sleep(name, target_hours, nights_data):
     """
     Understanding if the user is getting enough sleep involves checking:
@@ -224,24 +281,23 @@ def enough_sleep(name, target_hours, nights_data):
     2. Getting last week's sleep duration average and checking if it exceeds the target
     3. Getting last month's sleep duration average and checking if it exceeds the target
 
+    Each answer is a constant-time query on a DurationIndex of the user's nights. The index
+    holds the oldest night first, so last night (Night 1) is its final position.
+
     Args:
         name (str): The name of the user.
         target_hours (int): The target number of hours of sleep per night.
-        nights_data (list): A list of Night objects containing sleep data.
+        nights_data (list): A list of Night objects containing sleep data, or a DurationIndex of them.
     """
+    index = nights_data if isinstance(nights_data, DurationIndex) else DurationIndex.from_nights(nights_data)
 
     print("\n---------- What If Q1: Am I getting enough sleep? -----------\n")
     
     print(f"Hi {name.title()}. Lets see if you're getting enough sleep.")
 
     # 1. get last night's sleep - see if it meets the target
-    last_night = nights_data[0] # this will be Night 1
-    
-    hours_slept = last_night.get_time_slept() // 60 # get the hours slept
-    try:
-        remaining_minutes = hours_slept % 60 # get the additional minutes slept as well
-    except ZeroDivisionError:
-        remaining_minutes = 0 # line runs if a ZeroDivisionError raises (i.e. 8 hours slept on the dot)
+    mins_slept = index.total(-1, None) # this will be Night 1
+    hours_slept, remaining_minutes = divmod(mins_slept, 60) # get the hours slept, and the additional minutes
         
     print(f"\nLast night, you slept for {hours_slept} hours and {remaining_minutes} minute(s).")
     
@@ -252,15 +308,8 @@ def enough_sleep(name, target_hours, nights_data):
         print("Consider going to bed earlier to improve your sleep quality.")
         
     # 2. get last week's sleep duration average and check if it exceeds the target
-    last_week = nights_data[:7] # This is Nights 1-7
-    mins_slept_per_day = [night.get_time_slept() for night in last_week] # Get the mins slept per night and store it in a list. No display messages.
-    MEAN_MINUTES_slept = int(sum(mins_slept_per_day) / 7) # Find the mean mins slept over the week
-    
-    mean_hours = MEAN_MINUTES_slept // 60 # Get the mean hours slept
-    try:
-        remaining_minutes = MEAN_MINUTES_slept % 60 # Get the additional minutes slept as well
-    except ZeroDivisionError:
-        remaining_minutes = 0 # Line runs if a ZeroDivisionError raises (i.e. 8 hours slept on the dot)
+    mean_mins_slept = int(index.window_mean(-7, None)) # Find the mean mins slept over Nights 1-7
+    mean_hours, remaining_minutes = divmod(mean_mins_slept, 60) # Get the mean hours slept, and the additional minutes
         
     # Display the average sleep duration for the last week.    
     print(f"\nLast week, you slept on average {mean_hours} hours and {remaining_minutes} minute(s).")
@@ -275,15 +324,8 @@ def enough_sleep(name, target_hours, nights_data):
         
     
     # 3. get last month's sleep duration average, check if it exceeds the target
-    last_month = nights_data[:30] # this is Nights 1-30
-    mins_slept_per_day = [night.get_time_slept() for night in last_month] # get the mins slept per night and store it in a list. no display messages
-    mean_mins_slept = int(sum(mins_slept_per_day) / 30) # find the mean mins slept over the week
-    
-    mean_hours = mean_mins_slept // 60 # get the mean hours slept
-    try:
-        remaining_minutes = mean_mins_slept % 60 # get the additional minutes slept as well
-    except ZeroDivisionError:
-        remaining_minutes = 0 # line runs if a ZeroDivisionError raises (i.e. 8 hours slept on the dot)
+    mean_mins_slept = int(index.window_mean(-30, None)) # find the mean mins slept over Nights 1-30
+    mean_hours, remaining_minutes = divmod(mean_mins_slept, 60) # get the mean hours slept, and the additional minutes
         
     # Display the average sleep duration for the last month.
     print(f"\nLast month, your average sleep duration is {mean_hours} hours and {remaining_minutes} minute(s).")
@@ -297,27 +339,9 @@ def enough_sleep(name, target_hours, nights_data):
         print("Consider going to bed earlier to improve your sleep quality.")
 
 
-enough_sleep(username, target_hours, list_of_nights) # run "What If" Q1
-
-
-
 # ---------- WHAT IF QUESTION 2: "Is my sleeping environment good for quality sleep?" ----------
 
-print("\n---------- What If Q2: Is my sleeping environment good for quality sleep? -----------\n")
-    
-print(f"Hi {username.title()}. Lets see if your sleep environment is good for quality sleep.") 
-
-# Ask the user which night they would like to analyse.
-night_to_analyse = input("Which night (1-100) would you like to analyse? ")
-# Error handling for the night_to_analyse input to ensure it is an integer between 1 and 100.
-if (not night_to_analyse.isdigit()) or (night_to_analyse == "0") or (int(night_to_analyse) > 100):
-    while (not night_to_analyse.isdigit()) or (night_to_analyse == "0") or (int(night_to_analyse) > 100):
-        night_to_analyse = input("Invalid entry. Please enter an integer between 1-100. ")
-
-night_to_analyse = int(night_to_analyse) - 1 # the index to access whichever night in the data list
-
-
-def sleep_quality(name, night_id, nights_data): 
+def sleep_quality(name, night_id, nights_data, ask_again=True): 
     """
     This function analyses the sleep environment for a given night.
     Three main components that relate to sleep environment are light, sound, and temperature.
@@ -327,6 +351,7 @@ def sleep_quality(name, night_id, nights_data):
         name (str): The name of the user.
         night_id (int): The ID of the night to analyse (1-100).
         nights_data (list): A list of Night objects containing sleep data.
+        ask_again (bool): Whether to offer to analyse another night afterwards.
     Returns:
         None
     """
@@ -339,6 +364,9 @@ def sleep_quality(name, night_id, nights_data):
     analyse_data(night.light_dict, "light")
     analyse_data(night.sound_dict, "sound")
     analyse_data(night.temp_dict, "temp")
+
+    if not ask_again: # Non-interactive runs analyse a single night.
+        return
     
     # Prompt the user to analyse another night, or exit the program.
     go_again = input("Would you like to analyse another night? (Y for yes, anything else for no.) ")
@@ -355,4 +383,83 @@ def sleep_quality(name, night_id, nights_data):
         print("Goodbye!") # Exit the program if the user does not want to analyse another night.
 
 
-sleep_quality(username, night_to_analyse, list_of_nights) # run "What If" Q2.
\ No newline at end of file
+def main(seed=None, name=None, target_hours=None, night_number=None, store=None, user_id=1):
+    """
+    Generate the nights, present the first three, then answer the "what if" questions.
+    Args:
+        seed (int): Optional seed, so the same nights can be generated again.
+        name (str): The user's name; asked for if not given.
+        target_hours (int): Target hours of sleep per night (1-24); asked for if not given.
+        night_number (int): Night to analyse (1-100); asked for if not given. When given,
+            no further nights are offered, so a run with every argument needs no input.
+        store: Optional NightStore folder; the user's nights are kept there between runs.
+        user_id (int): Whose nights to load from the store.
+    """
+    if store is None:
+        list_of_nights = generate_nights(NUMBER_OF_NIGHTS, seed)
+    else:
+        list_of_nights = stored_nights(store, user_id, NUMBER_OF_NIGHTS, seed)
+
+    # -------------------- TESTING THE DATABASE --------------------
+
+    # Present the sleep data for the first 3 nights
+    for night in list_of_nights[:3]:
+        night.present_sleep_data()
+
+    # ---------- WHAT IF QUESTION 1: "Am I getting enough sleep?" -----------
+
+    username = name if name is not None else input("What is your name? ")
+    if target_hours is None:
+        target_hours = input(f"Hi {username.title()}! How many hours of sleep do you want to get every night (1-24)? ")
+    target_hours = str(target_hours) # Arguments are validated the same way as typed answers.
+
+    # Validate the target_hours input to ensure it is an integer between 1 and 24.
+    if not target_hours.isdigit() or int(target_hours) > 24 or int(target_hours) < 1:
+        # If the input is not valid, prompt the user to enter a valid integer.
+        while not target_hours.isdigit() or int(target_hours) > 24 or int(target_hours) < 1:
+            target_hours = input("Invalid entry. Please enter an integer between 1-24. ")
+
+    target_hours = int(target_hours) # convert to integer
+
+    enough_sleep(username, target_hours, list_of_nights) # run "What If" Q1
+
+    # ---------- WHAT IF QUESTION 2: "Is my sleeping environment good for quality sleep?" ----------
+
+    print("\n---------- What If Q2: Is my sleeping environment good for quality sleep? -----------\n")
+
+    print(f"Hi {username.title()}. Lets see if your sleep environment is good for quality sleep.")
+
+    # Ask the user which night they would like to analyse.
+    night_to_analyse = str(night_number) if night_number is not None else input("Which night (1-100) would you like to analyse? ")
+    # Error handling for the night_to_analyse input to ensure it is an integer between 1 and 100.
+    if (not night_to_analyse.isdigit()) or (night_to_analyse == "0") or (int(night_to_analyse) > 100):
+        while (not night_to_analyse.isdigit()) or (night_to_analyse == "0") or (int(night_to_analyse) > 100):
+            night_to_analyse = input("Invalid entry. Please enter an integer between 1-100. ")
+
+    night_to_analyse = int(night_to_analyse) - 1 # the index to access whichever night in the data list
+
+    sleep_quality(username, night_to_analyse, list_of_nights, ask_again=night_number is None) # run "What If" Q2.
+
+
+if __name__ == "__main__":
+    import argparse # For the command line interface; imported here so importing the module stays fast.
+    from instrumentation import trace_to
+
+    parser = argparse.ArgumentParser(description="Simulate nights of sleep and answer 'what if' questions.")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible simulated nights")
+    parser.add_argument("--name", default=None, help="your name (skips the prompt)")
+    parser.add_argument("--target-hours", type=int, default=None, choices=range(1, 25), metavar="HOURS",
+                        help="target hours of sleep, 1-24 (skips the prompt)")
+    parser.add_argument("--night", type=int, default=None, choices=range(1, NUMBER_OF_NIGHTS + 1), metavar="NIGHT",
+                        help="night to analyse, 1-100 (skips the prompts)")
+    parser.add_argument("--headless", action="store_true", help="don't open graph windows; for servers and scheduled runs")
+    parser.add_argument("--store", metavar="FOLDER", default=None, help="keep the simulated nights in this night store")
+    parser.add_argument("--user", type=int, default=1, help="whose nights to load from the store")
+    parser.add_argument("--trace", metavar="PATH", default=None, help="write a Chrome trace of each stage to PATH")
+    args = parser.parse_args()
+    if args.trace:
+        trace_to(args.trace)
+    if args.headless:
+        import matplotlib
+        matplotlib.use("Agg") # Non-GUI backend: plt.show() returns straight away.
+    main(args.seed, args.name, args.target_hours, args.night, args.store, args.user)
@@ -0,0 +1,331 @@
+""" Out-of-core statistics: summarise raw logs of any size chunk by chunk, in bounded memory. """
+
+import numpy as np # For per-chunk reductions.
+from data_validation import (CHUNK_BYTES, CSV_PATH, SENSORS, blocks_to_columns, iter_csv_blocks,
+                             read_header, validate_columns) # Chunked parsing and the validation rules.
+
+SKETCH_K = 200 # Size of the quantile sketch's top level; the rank error shrinks roughly as 1/k.
+SKETCH_RANK_ERROR = 0.0165 # Rank error of a k=200 sketch at 99% confidence, see QuantileSketch.
+
+
+class RunningStats:
+    """
+    Count, mean, variance, minimum and maximum of a stream, updated one chunk at a time.
+    Mean and variance use Welford's method, combined chunk-wise with Chan et al.'s parallel
+    formula, so a stream of any length keeps float64 accuracy without storing any readings.
+    Two RunningStats built over different parts of a stream can be merged.
+    """
+
+
+    def __init__(self):
+        """Start with an empty stream."""
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0 # Sum of squared differences from the mean.
+        self.min = self.max = None
+        self.min_time = self.max_time = None # Time of the first reading equal to the min or max.
+        self.argmax = None # Position of that first maximum within the stream.
+
+
+    def update(self, values, times):
+        """
+        Add a chunk of readings.
+        Args:
+            values (np.ndarray): Readings, without NaN.
+            times (np.ndarray): Time of each reading.
+        """
+        if len(values) == 0:
+            return
+        values = values.astype(np.float64)
+        chunk = RunningStats()
+        chunk.count = len(values)
+        chunk.mean = float(values.mean())
+        chunk.m2 = float(((values - chunk.mean) ** 2).sum())
+        lowest, highest = int(values.argmin()), int(values.argmax()) # First occurrences.
+        chunk.min, chunk.min_time = values[lowest].item(), times[lowest].item()
+        chunk.max, chunk.max_time = values[highest].item(), times[highest].item()
+        chunk.argmax = highest
+        self.merge(chunk)
+
+
+    def add(self, value, time):
+        """
+        Add a single reading in constant time, e.g. as it arrives from a live source (Welford).
+        Args:
+            value (float): The reading.
+            time (float): Its time.
+        """
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.count == 1 or value < self.min:
+            self.min, self.min_time = value, time
+        if self.count == 1 or value > self.max: # Ties keep the earlier maximum.
+            self.max, self.max_time, self.argmax = value, time, self.count - 1
+
+
+    def merge(self, other):
+        """
+        Fold in the statistics of a later part of the same stream.
+        Args:
+            other (RunningStats): Statistics of the readings that follow this one's.
+        """
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.__dict__.update(other.__dict__)
+            return
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        if other.min < self.min:
+            self.min, self.min_time = other.min, other.min_time
+        if other.max > self.max: # Ties keep the earlier maximum.
+            self.max, self.max_time, self.argmax = other.max, other.max_time, self.count + other.argmax
+        self.count = count
+
+
+    @property
+    def std(self):
+        """Population standard deviation (ddof=0), as np.std computes it."""
+        return (self.m2 / self.count) ** 0.5 if self.count else float("nan")
+
+
+    def state(self):
+        """Return the statistics as a JSON-serialisable dictionary, e.g. for a checkpoint."""
+        return dict(self.__dict__)
+
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild statistics saved with state(); None gives an empty stream."""
+        stats = cls()
+        stats.__dict__.update(state or {})
+        return stats
+
+
+class QuantileSketch:
+    """
+    KLL quantile sketch (Karnin, Lang and Liberty, 2016): a stack of compactors holding at most
+    about 3 * k readings however long the stream is. When a level overflows it is sorted and every
+    other reading (from a random offset) moves up a level, where it stands for twice as many.
+
+    Error bound: a quantile read from the sketch has a true rank within SKETCH_RANK_ERROR (1.65%)
+    of the requested one, with 99% confidence, for k=200 (the bound scales roughly as 1/k).
+    E.g. the median of 10 million readings is a reading whose rank is within 165,000 of 5,000,000.
+    Sketches of separate parts of a stream can be merged with the same guarantee.
+    """
+
+
+    def __init__(self, k=SKETCH_K, seed=None):
+        """
+        Start with an empty sketch.
+        Args:
+            k (int): Capacity of the top level; larger k means a smaller error and more memory.
+            seed (int): Seed for the compaction offsets, for reproducible sketches.
+        """
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0)] # levels[i] holds readings that each stand for 2**i readings.
+        self._rng = np.random.default_rng(seed)
+
+
+    def _capacity(self, level):
+        """Capacity of a level: k at the top, shrinking by 2/3 per level below it."""
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+
+    def _compress(self):
+        """Compact overflowing levels until every level is within its capacity."""
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) <= self._capacity(level):
+                level += 1
+                continue
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0)) # Adding a level raises every capacity below it.
+            items = np.sort(self.levels[level])
+            stay = items[:0]
+            if len(items) % 2: # An odd reading out stays behind, so weights are preserved exactly.
+                stay, items = items[-1:], items[:-1]
+            promoted = items[self._rng.integers(2)::2]
+            self.levels[level] = stay
+            self.levels[level + 1] = np.concatenate((self.levels[level + 1], promoted))
+            level = 0 # Capacities may have changed, so check again from the bottom.
+
+
+    def update(self, values):
+        """Add a chunk of readings (without NaN) to the sketch."""
+        self.count += len(values)
+        self.levels[0] = np.concatenate((self.levels[0], np.asarray(values, dtype=np.float64)))
+        self._compress()
+
+
+    def merge(self, other):
+        """Fold in a sketch built over another part of the stream with the same k."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate((self.levels[level], items))
+        self.count += other.count
+        self._compress()
+
+
+    def quantiles(self, qs):
+        """
+        Estimate quantiles of everything added so far.
+        Args:
+            qs: Quantiles between 0 and 1, e.g. (0.25, 0.5, 0.75).
+        Returns:
+            float64 array with one reading per quantile (NaN if the sketch is empty).
+        """
+        qs = np.asarray(qs, dtype=np.float64)
+        if self.count == 0:
+            return np.full(qs.shape, np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2 ** index) for index, level in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        ranks = np.cumsum(weights[order]) # Number of readings each item stands at or above.
+        position = np.searchsorted(ranks, qs * (ranks[-1] - 1) + 1) # First item covering each target rank.
+        return items[order][np.minimum(position, len(items) - 1)]
+
+
+    def __len__(self):
+        """Return the number of readings stored, not the number summarised."""
+        return sum(len(level) for level in self.levels)
+
+
+class SensorStream:
+    """Running statistics and a quantile sketch for one sensor."""
+
+
+    def __init__(self, k=SKETCH_K, seed=None):
+        """Start with an empty stream; k and seed are passed to the QuantileSketch."""
+        self.stats = RunningStats()
+        self.sketch = QuantileSketch(k, seed)
+
+
+    def update(self, values, times):
+        """Add a chunk of validated readings, skipping NaN (empty or invalid) ones."""
+        present = ~np.isnan(values)
+        self.stats.update(values[present], times[present])
+        self.sketch.update(values[present])
+
+
+    def merge(self, other):
+        """Fold in another SensorStream covering a later part of the log."""
+        self.stats.merge(other.stats)
+        self.sketch.merge(other.sketch)
+
+
+    def summary(self):
+        """
+        Return the same statistics as summary_statistics.summarise(), as Python numbers.
+        Mean, std, min, max, argmax and max_time are exact; median, q1, q3 and iqr come
+        from the sketch and are accurate to its rank error bound.
+        """
+        q1, median, q3 = self.sketch.quantiles((0.25, 0.5, 0.75)).tolist()
+        return {
+            "mean": self.stats.mean, "median": median, "std": self.stats.std,
+            "q1": q1, "q3": q3, "iqr": q3 - q1,
+            "min": self.stats.min, "max": self.stats.max,
+            "argmax": self.stats.argmax, "max_time": self.stats.max_time,
+        }
+
+
+def stream_file(path=CSV_PATH, chunk_bytes=CHUNK_BYTES, k=SKETCH_K, seed=None):
+    """
+    Read a raw CSV file (or binary sensor log) chunk by chunk, validating each chunk and updating
+    per-sensor statistics. Memory use is one chunk plus a fixed-size sketch per sensor, whatever
+    the size of the file.
+    Args:
+        path: Path to the raw CSV file or sensor log.
+        chunk_bytes (int): Approximate size of each chunk read from the file.
+        k (int): Quantile sketch size.
+        seed (int): Seed for the sketches, for reproducible results.
+    Returns:
+        Dictionary mapping each sensor to its SensorStream.
+    """
+    from sensor_log import RECORD, SensorLog, is_sensor_log # Imported here, as sensor_log builds on data_validation.
+
+    streams = {sensor: SensorStream(k, seed) for sensor in SENSORS}
+    if is_sensor_log(path):
+        # Blocks of records straight from the memory map, about chunk_bytes of log at a time.
+        for columns in SensorLog(path).validated_blocks(block_records=max(1, chunk_bytes // RECORD.itemsize)):
+            for sensor in SENSORS:
+                streams[sensor].update(columns[sensor], columns["time"])
+        return streams
+    with open(path, "rb") as data_csv:
+        column_order = read_header(data_csv)
+        for block in iter_csv_blocks(data_csv, column_order, chunk_bytes):
+            columns = validate_columns(blocks_to_columns([block])) # Same rules as the in-memory path.
+            for sensor in SENSORS:
+                streams[sensor].update(columns[sensor], columns["time"])
+    return streams
+
+
+def stream_statistics(paths, chunk_bytes=CHUNK_BYTES, k=SKETCH_K, seed=None):
+    """
+    Summarise one or more raw CSV files as if they were one log, in bounded memory.
+    Args:
+        paths: A path, or a list of paths in time order.
+        chunk_bytes (int): Approximate size of each chunk read from a file.
+        k (int): Quantile sketch size.
+        seed (int): Seed for the sketches, for reproducible results.
+    Returns:
+        Dictionary mapping each sensor to a summary, as returned by SensorStream.summary().
+    """
+    paths = [paths] if isinstance(paths, (str, bytes)) or hasattr(paths, "__fspath__") else paths
+    streams = None
+    for path in paths:
+        file_streams = stream_file(path, chunk_bytes, k, seed)
+        if streams is None:
+            streams = file_streams
+        else:
+            for sensor in SENSORS:
+                streams[sensor].merge(file_streams[sensor])
+    streams = streams or {sensor: SensorStream(k, seed) for sensor in SENSORS}
+    return {sensor: streams[sensor].summary() for sensor in SENSORS}
+
+
+def main():
+    """Summarise raw logs from the command line, optionally checking against the in-memory path."""
+    import argparse # For the command line interface; imported here so importing the module stays fast.
+
+    parser = argparse.ArgumentParser(description="Summarise raw sensor logs in bounded memory.")
+    parser.add_argument("paths", nargs="*", default=[CSV_PATH], help="raw CSV files or .slog sensor logs, in time order")
+    parser.add_argument("--chunk-bytes", type=int, default=CHUNK_BYTES, help="bytes read per chunk")
+    parser.add_argument("--k", type=int, default=SKETCH_K, help="quantile sketch size")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible sketches")
+    parser.add_argument("--compare", action="store_true", help="also load the logs in memory and show the differences")
+    args = parser.parse_args()
+
+    results = stream_statistics(args.paths, args.chunk_bytes, args.k, args.seed)
+    exact = None
+    if args.compare:
+        from data_validation import load_columns # Only needed for the comparison.
+        from summary_statistics import summarise_batch
+        columns = [load_columns(path) for path in args.paths]
+        exact = {}
+        for sensor in SENSORS:
+            values = np.concatenate([column[sensor] for column in columns])
+            times = np.concatenate([column["time"] for column in columns])
+            present = ~np.isnan(values)
+            batch = summarise_batch(values[present], [0, int(present.sum())], times[present])
+            exact[sensor] = {name: batch[name][0].item() for name in batch}
+
+    for sensor in SENSORS:
+        print(f"\n{sensor}")
+        for name, value in results[sensor].items():
+            line = f"  {name:<9} {value:>14.4f}" if value is not None else f"  {name:<9} {'-':>14}"
+            if exact is not None:
+                line += f"   in memory {exact[sensor][name]:>14.4f}"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+""" Summary statistics kernel shared by the analysis, simulation and batch reporting code. """
+
+from collections.abc import Mapping # For accepting time:value dictionaries.
+
+import numpy as np # For sorting and reductions.
+from night_generator import MinuteSeries # Array-backed minute:value views.
+from instrumentation import span # Times each summarise_batch() call.
+
+# Every summary holds these statistics. Percentiles use NumPy's default linear interpolation
+# and the standard deviation is the population one (ddof=0), as np.percentile and np.std do.
+STATISTICS = ("mean", "median", "std", "q1", "q3", "iqr", "min", "max", "argmax", "max_time")
+
+
+def series_arrays(series):
+    """
+    Split a time series into a times array and a values array.
+    Args:
+        series: time:value dictionary, MinuteSeries, or an array of readings for minute 1, 2, 3, ...
+    Returns:
+        times, values
+    """
+    if isinstance(series, MinuteSeries):
+        values = series.values_array
+        return np.arange(1, len(values) + 1), values
+    if isinstance(series, Mapping):
+        return np.array(list(series.keys())), np.array(list(series.values()))
+    values = np.asarray(series)
+    return np.arange(1, len(values) + 1), values
+
+
+def interpolate_quantiles(sorted_values, starts, lengths, q):
+    """
+    Read a quantile of each segment of an array that is sorted within every segment.
+    Args:
+        sorted_values (np.ndarray): Flat array, ascending within each segment.
+        starts (np.ndarray): Start of each segment.
+        lengths (np.ndarray): Length of each segment, all at least 1.
+        q (float): Quantile between 0 and 1.
+    Returns:
+        float64 array with one quantile per segment, linearly interpolated.
+    """
+    position = q * (lengths - 1)
+    below = np.floor(position).astype(np.int64)
+    above = np.minimum(below + 1, lengths - 1)
+    low = sorted_values[starts + below].astype(np.float64)
+    high = sorted_values[starts + above].astype(np.float64)
+    return low + (high - low) * (position - below)
+
+
+def sort_segments(values, offsets):
+    """
+    Sort every segment of a flat array in one call.
+    Segments of similar length (such as nights) are sorted as rows of a padded matrix;
+    very uneven segments fall back to a single lexsort of the whole array.
+    Args:
+        values (np.ndarray): Flat array of all segments, one after the other.
+        offsets (np.ndarray): Segment i spans offsets[i]:offsets[i + 1].
+    Returns:
+        Flat array with the same segments, each sorted in ascending order.
+    """
+    lengths = np.diff(offsets)
+    longest = int(lengths.max()) if len(lengths) else 0
+    if len(lengths) * longest > 2 * len(values) + 1024:
+        segment_ids = np.repeat(np.arange(len(lengths)), lengths)
+        return values[np.lexsort((values, segment_ids))]
+
+    # Pad each row with the largest possible value, so padding sorts to the end of the row.
+    pad = np.iinfo(values.dtype).max if values.dtype.kind in "iu" else np.inf
+    inside = np.arange(longest) < lengths[:, None]
+    matrix = np.full((len(lengths), longest), pad, dtype=values.dtype)
+    matrix[inside] = values
+    matrix.sort(axis=1) # Equal values are interchangeable, so the faster unstable (SIMD) sort is safe.
+    return matrix[inside]
+
+
+def summarise_batch(values, offsets, times=None):
+    """
+    Compute the full summary of many series at once, for example every night of a cohort.
+    Args:
+        values (np.ndarray): Flat array of all series, one after the other.
+        offsets (np.ndarray): Series i spans offsets[i]:offsets[i + 1]; every series must be non-empty.
+        times (np.ndarray): Time of each value. Defaults to minutes 1, 2, 3, ... within each series.
+    Returns:
+        Dictionary mapping each name in STATISTICS to an array with one entry per series.
+        'argmax' is the position of the first maximum within its series, 'max_time' its time.
+    """
+    with span("statistics.summarise_batch", items=len(offsets) - 1):
+        return _summarise_batch(np.asarray(values), np.asarray(offsets, dtype=np.int64), times)
+
+
+def _summarise_batch(values, offsets, times):
+    """summarise_batch() without the tracing span."""
+    starts, lengths = offsets[:-1], np.diff(offsets)
+    if np.any(lengths == 0):
+        raise ValueError("Every series needs at least one value.")
+
+    # Mean and standard deviation, with one reduction each.
+    as_float = values.astype(np.float64)
+    mean = np.add.reduceat(as_float, starts) / lengths if len(starts) else np.empty(0)
+    deviation = as_float - np.repeat(mean, lengths)
+    std = np.sqrt(np.add.reduceat(deviation * deviation, starts) / lengths) if len(starts) else np.empty(0)
+
+    # Order statistics, all read from a single sort.
+    ordered = sort_segments(values, offsets)
+    q1 = interpolate_quantiles(ordered, starts, lengths, 0.25)
+    median = interpolate_quantiles(ordered, starts, lengths, 0.5)
+    q3 = interpolate_quantiles(ordered, starts, lengths, 0.75)
+    minimum = ordered[starts]
+    maximum = ordered[starts + lengths - 1]
+
+    # First position of each series' maximum, found by index rather than a scan over (time, value) pairs.
+    hits = np.flatnonzero(values == np.repeat(maximum, lengths))
+    series_of_hit = np.searchsorted(offsets, hits, side="right") - 1
+    first = np.ones(len(hits), dtype=bool)
+    first[1:] = series_of_hit[1:] != series_of_hit[:-1]
+    argmax = hits[first] - starts
+    max_time = argmax + 1 if times is None else np.asarray(times)[hits[first]]
+
+    return {
+        "mean": mean, "median": median, "std": std, "q1": q1, "q3": q3, "iqr": q3 - q1,
+        "min": minimum, "max": maximum, "argmax": argmax, "max_time": max_time,
+    }
+
+
+def summarise(series):
+    """
+    Compute the full summary of one series.
+    Args:
+        series: time:value dictionary, MinuteSeries, or an array of readings for minute 1, 2, 3, ...
+    Returns:
+        Dictionary mapping each name in STATISTICS to a Python number; 'min', 'max' and 'max_time'
+        keep the type of the readings and times.
+    """
+    times, values = series_arrays(series)
+    batch = summarise_batch(values, [0, len(values)], times)
+    return {name: batch[name][0].item() for name in STATISTICS}
@@ -0,0 +1,394 @@
+"""
+Local HTTP/JSON service answering the "what if" questions for many clients at once, plus a load-test client.
+
+    python src/what_if_service.py serve --port 8080
+    python src/what_if_service.py load-test --port 8080 --requests 20000 --concurrency 50
+
+Routes (all GET, all JSON):
+    /users/{user}/enough-sleep?target_hours=8     What If Q1 for a user's last night, week and month
+    /users/{user}/nights/{night}/quality          What If Q2 for one night: light, sound and temp checks
+    /users/{user}/nights/{night}/stats            Summary statistics of every sensor for one night
+    /health                                       Response cache counters
+
+The event loop only parses requests and writes responses. Statistics are computed in a pool of
+worker processes, and finished responses are kept in an LRU cache, so repeat queries never reach the pool.
+"""
+
+import asyncio # For serving many connections on one thread.
+import json # For request and response bodies.
+import os # For the default number of workers.
+import re # For routing.
+import time # For load-test latencies.
+from concurrent.futures import ProcessPoolExecutor # For CPU-bound statistics off the event loop.
+from urllib.parse import parse_qs, urlsplit # For request targets.
+
+import numpy as np # For seeding and night lookups.
+from data_validation import SENSORS # Sensor names.
+from duration_index import DurationIndex # Constant-time sleep duration queries.
+from memo_cache import LRUCache # Bounded response and per-worker night caches.
+from night_generator import MEAN_MINUTES, STD_MINUTES, simulate_nights, user_seed # Simulated nights, when no store is used.
+from summary_statistics import STATISTICS, summarise_batch # Per-night statistics.
+
+HOST = "127.0.0.1" # Local clients only.
+PORT = 8080
+NIGHTS_PER_USER = 100 # Same number of nights per user as sleep_simulation.py.
+QUALITY_SENSORS = ("light", "sound", "temp") # The sensors sleep_quality() checks.
+WINDOWS = {"last_night": 1, "last_week": 7, "last_month": 30} # Nights in each enough-sleep window.
+RESPONSE_CACHE_ENTRIES = 100_000 # Encoded responses kept by the server.
+RESPONSE_CACHE_BYTES = 256 * 2**20
+USERS_PER_WORKER = 1_024 # Users whose nights each worker keeps in memory.
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+# -------------------- WORKER PROCESSES --------------------
+
+# State held by each worker process, created once by init_worker().
+_worker = {}
+
+
+def init_worker(store_folder, seed, nights_per_user):
+    """
+    Prepare a worker: open the night store, or remember how to simulate each user's nights.
+    Args:
+        store_folder: NightStore folder to serve, or None to serve simulated nights.
+        seed (int): Seed of the simulated users; user u always gets the same nights from the same seed,
+            the nights cohort_simulation.simulate_cohort() gives user u.
+        nights_per_user (int): Nights simulated per user.
+    """
+    if store_folder is not None:
+        from night_store import NightStore # Only needed when serving stored nights.
+        _worker["store"] = NightStore(store_folder)
+    else:
+        from night_generator import sensor_parameters
+        _worker["store"] = None
+        _worker["parameters"] = sensor_parameters() # Computed once per worker, not once per user.
+    _worker["seed"] = seed
+    _worker["nights"] = nights_per_user
+    _worker["batches"] = LRUCache(USERS_PER_WORKER, name="worker_batches")
+
+
+def user_batch(user_id):
+    """
+    Return a user's nights as a NightBatch, loading or simulating them on first use.
+    Raises:
+        LookupError: If the user has no nights.
+    """
+    batch = _worker["batches"].get(user_id)
+    if batch is None:
+        if _worker["store"] is not None:
+            batch = _worker["store"].load_user(user_id)
+        elif user_id >= 1:
+            batch = simulate_nights(_worker["nights"], user_seed(_worker["seed"], user_id), _worker["parameters"],
+                                    mean_minutes=MEAN_MINUTES, std_minutes=STD_MINUTES)
+        if batch is None or len(batch) == 0:
+            raise LookupError(f"No nights for user {user_id}.")
+        _worker["batches"].put(user_id, batch, size=0) # Bounded by count; stored batches are memory maps.
+    return batch
+
+
+def night_summaries(user_id, night_id, sensors):
+    """Summary statistics of one night's readings for each sensor, as Python numbers."""
+    batch = user_batch(user_id)
+    positions = np.flatnonzero(batch.night_ids == night_id)
+    if len(positions) == 0:
+        raise LookupError(f"No night {night_id} for user {user_id}.")
+    summaries = {}
+    for sensor in sensors:
+        values = batch.night_series(sensor, positions[0])
+        stats = summarise_batch(values, [0, len(values)])
+        summaries[sensor] = {name: stats[name][0].item() for name in STATISTICS}
+    return summaries
+
+
+def night_statistics(user_id, night_id):
+    """Answer /users/{user}/nights/{night}/stats."""
+    return {"user_id": user_id, "night_id": night_id, "sensors": night_summaries(user_id, night_id, SENSORS)}
+
+
+def sleep_quality_report(user_id, night_id):
+    """
+    Answer /users/{user}/nights/{night}/quality: sleep_quality() without the prompts.
+    Each sensor's maximum is checked against the night's interquartile range, as analyse_data() does.
+    """
+    report = {"user_id": user_id, "night_id": night_id, "sensors": {}}
+    for sensor, stats in night_summaries(user_id, night_id, QUALITY_SENSORS).items():
+        report["sensors"][sensor] = {
+            "mean": stats["mean"], "median": stats["median"], "std": stats["std"], "iqr": stats["iqr"],
+            "min": stats["min"], "max": stats["max"],
+            "normal_range": [stats["q1"], stats["q3"]],
+            "outside_normal_range": stats["max"] > stats["q3"],
+            "max_time": stats["max_time"], # Minute of the first reading equal to the maximum.
+        }
+    return report
+
+
+def enough_sleep_report(user_id, target_hours):
+    """
+    Answer /users/{user}/enough-sleep: enough_sleep() without the prompts.
+    Like enough_sleep(), a window meets the target when its mean in whole hours reaches it.
+    """
+    index = DurationIndex(user_batch(user_id).mins_slept[::-1]) # Oldest first, so Night 1 (last night) is last.
+    report = {"user_id": user_id, "target_hours": target_hours}
+    for window, nights in WINDOWS.items():
+        mean_minutes = int(index.window_mean(-nights, None))
+        report[window] = {"nights": min(nights, len(index)), "mean_minutes": mean_minutes,
+                          "met": mean_minutes // 60 >= target_hours}
+    return report
+
+
+# -------------------- SERVER --------------------
+
+ROUTES = (
+    (re.compile(r"/users/(\d+)/enough-sleep"), "enough_sleep"),
+    (re.compile(r"/users/(\d+)/nights/(\d+)/quality"), "quality"),
+    (re.compile(r"/users/(\d+)/nights/(\d+)/stats"), "stats"),
+    (re.compile(r"/health"), "health"),
+)
+
+
+class WhatIfService:
+    """Routes requests to worker functions, caching finished responses and sharing in-flight ones."""
+
+
+    def __init__(self, pool, cache_entries=RESPONSE_CACHE_ENTRIES, cache_bytes=RESPONSE_CACHE_BYTES):
+        """
+        Args:
+            pool (ProcessPoolExecutor): Workers started with init_worker().
+            cache_entries (int): Most responses cached.
+            cache_bytes (int): Most response bytes cached.
+        """
+        self.pool = pool
+        self.cache = LRUCache(cache_entries, cache_bytes, name="response_cache")
+        self.pending = {} # Request key -> future of a response being computed, shared by identical requests.
+
+
+    def route(self, target):
+        """
+        Turn a request target into the worker call that answers it.
+        Returns:
+            key, function, arguments - key is None for responses that must not be cached.
+        Raises:
+            LookupError: Unknown path. ValueError: Invalid query parameters.
+        """
+        url = urlsplit(target)
+        for pattern, name in ROUTES:
+            match = pattern.fullmatch(url.path)
+            if match is None:
+                continue
+            numbers = tuple(int(group) for group in match.groups())
+            if name == "health":
+                return None, None, ()
+            if name == "enough_sleep":
+                query = parse_qs(url.query)
+                text = query.get("target_hours", ["8"])[0]
+                if not text.strip().isdigit():
+                    raise ValueError(f"target_hours must be a whole number of hours, not {text!r}.")
+                target_hours = int(text)
+                if not 1 <= target_hours <= 24:
+                    raise ValueError("target_hours must be between 1 and 24.")
+                return (name, *numbers, target_hours), enough_sleep_report, (*numbers, target_hours)
+            function = sleep_quality_report if name == "quality" else night_statistics
+            return (name, *numbers), function, numbers
+        raise LookupError(f"No route for {url.path}.")
+
+
+    async def respond(self, method, target):
+        """
+        Answer one request.
+        Returns:
+            status (int), body (bytes)
+        """
+        if method != "GET":
+            return 405, error_body("Only GET is supported.")
+        try:
+            key, function, arguments = self.route(target)
+        except LookupError as error:
+            return 404, error_body(str(error))
+        except ValueError as error:
+            return 400, error_body(str(error))
+        if function is None:
+            return 200, json.dumps(self.cache.counters()).encode()
+
+        body = self.cache.get(key)
+        if body is not None:
+            return 200, body
+        future = self.pending.get(key)
+        if future is None: # The first request for this key computes it; identical ones wait for it.
+            loop = asyncio.get_running_loop()
+            future = self.pending[key] = loop.run_in_executor(self.pool, function, *arguments)
+            future.add_done_callback(lambda done: self.pending.pop(key, None))
+        try:
+            result = await asyncio.shield(future) # A client hanging up doesn't cancel the shared work.
+        except LookupError as error:
+            return 404, error_body(str(error))
+        except ValueError as error:
+            return 400, error_body(str(error))
+        body = json.dumps(result).encode()
+        self.cache.put(key, body, size=len(body))
+        return 200, body
+
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until the client closes it or asks to."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if int(headers.get("content-length", 0)):
+                    await reader.readexactly(int(headers["content-length"])) # Bodies are ignored.
+
+                try:
+                    status, body = await self.respond(method, target)
+                except Exception as error: # A failed worker call fails the request, not the server.
+                    status, body = 500, error_body(f"{type(error).__name__}: {error}")
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                    .encode() + body
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass # Malformed request or the client went away.
+        finally:
+            writer.close()
+
+
+def error_body(message):
+    """Encode an error message as a JSON body."""
+    return json.dumps({"error": message}).encode()
+
+
+async def serve(host=HOST, port=PORT, store_folder=None, seed=0, nights_per_user=NIGHTS_PER_USER, workers=None):
+    """
+    Run the service until interrupted.
+    Args:
+        host (str): Interface to listen on.
+        port (int): Port to listen on.
+        store_folder: NightStore folder to serve, or None to serve simulated users.
+        seed (int): Seed of the simulated users.
+        nights_per_user (int): Nights simulated per user.
+        workers (int): Worker processes, defaults to the number of CPUs.
+    """
+    with ProcessPoolExecutor(workers or os.cpu_count() or 1, initializer=init_worker,
+                             initargs=(store_folder, seed, nights_per_user)) as pool:
+        service = WhatIfService(pool)
+        server = await asyncio.start_server(service.handle_connection, host, port, backlog=1024)
+        print(f"Serving what-if queries on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+# -------------------- LOAD-TEST CLIENT --------------------
+
+def request_targets(requests, users, nights_per_user=NIGHTS_PER_USER, seed=None):
+    """Random mix of all three queries over the given numbers of users and nights."""
+    rng = np.random.default_rng(seed)
+    kinds = rng.integers(0, 3, requests)
+    user_ids = rng.integers(1, users + 1, requests)
+    night_ids = rng.integers(1, nights_per_user + 1, requests)
+    targets = []
+    for kind, user_id, night_id in zip(kinds.tolist(), user_ids.tolist(), night_ids.tolist()):
+        if kind == 0:
+            targets.append(f"/users/{user_id}/enough-sleep?target_hours={6 + night_id % 4}")
+        else:
+            targets.append(f"/users/{user_id}/nights/{night_id}/{'quality' if kind == 1 else 'stats'}")
+    return targets
+
+
+async def client(host, port, targets, latencies, errors):
+    """One keep-alive connection sending requests from the shared list until it is empty."""
+    reader, writer = await asyncio.open_connection(host, port)
+    clock = time.perf_counter
+    try:
+        while targets:
+            target = targets.pop()
+            start = clock()
+            writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            latencies.append(clock() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def load_test(host=HOST, port=PORT, requests=10_000, concurrency=50, users=100, seed=None,
+                    nights_per_user=NIGHTS_PER_USER):
+    """
+    Send a random mix of queries from many concurrent connections and measure latency and throughput.
+    nights_per_user must not exceed the nights the service holds per user, or the extra
+    requests come back as 404 and count as errors.
+    Returns:
+        Dictionary with requests, errors, seconds, requests_per_second, p50_ms and p99_ms.
+    """
+    targets = request_targets(requests, users, nights_per_user, seed)
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, targets, latencies, errors) for _ in range(concurrency)))
+    seconds = time.perf_counter() - start
+    p50, p99 = np.percentile(latencies, (50, 99)) * 1e3 if latencies else (0.0, 0.0)
+    return {"requests": len(latencies), "errors": len(errors), "seconds": seconds,
+            "requests_per_second": len(latencies) / seconds, "p50_ms": float(p50), "p99_ms": float(p99)}
+
+
+def main():
+    """Run the service or the load-test client from the command line."""
+    import argparse # For the command line interface; imported here so importing the module stays fast.
+
+    parser = argparse.ArgumentParser(description="Serve the what-if questions over HTTP, or load-test the service.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_command = commands.add_parser("serve", help="run the service")
+    serve_command.add_argument("--host", default=HOST)
+    serve_command.add_argument("--port", type=int, default=PORT)
+    serve_command.add_argument("--store", metavar="FOLDER", default=None, help="serve the nights in this night store")
+    serve_command.add_argument("--seed", type=int, default=0, help="seed of the simulated users")
+    serve_command.add_argument("--nights", type=int, default=NIGHTS_PER_USER, help="nights per simulated user")
+    serve_command.add_argument("--workers", type=int, default=None, help="worker processes (default: all CPUs)")
+
+    test_command = commands.add_parser("load-test", help="measure latency and throughput of a running service")
+    test_command.add_argument("--host", default=HOST)
+    test_command.add_argument("--port", type=int, default=PORT)
+    test_command.add_argument("--requests", type=int, default=10_000)
+    test_command.add_argument("--concurrency", type=int, default=50, help="concurrent connections")
+    test_command.add_argument("--users", type=int, default=100, help="users the requests are spread over")
+    test_command.add_argument("--nights", type=int, default=NIGHTS_PER_USER,
+                              help="nights per user the requests are spread over; at most the service's nights per user")
+    test_command.add_argument("--seed", type=int, default=None, help="seed for the request mix")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args.host, args.port, args.store, args.seed, args.nights, args.workers))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    result = asyncio.run(load_test(args.host, args.port, args.requests, args.concurrency, args.users, args.seed,
+                                   args.nights))
+    print(f"{result['requests']:,} requests ({result['errors']:,} errors) in {result['seconds']:.2f} s - "
+          f"{result['requests_per_second']:,.0f} requests/s, p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms.")
+
+
+if __name__ == "__main__":
+    main()
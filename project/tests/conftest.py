@@ -0,0 +1,6 @@
+""" Make the flat modules in project/src importable by bare name, as the scripts import each other. """
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
@@ -0,0 +1,46 @@
+""" Sleep/wake segmentation from movement readings. """
+
+import numpy as np
+
+import actigraphy
+
+REST = 1000 # Movement reading at rest in these synthetic nights.
+
+
+def segment(*nights):
+    """Segment synthetic nights given as lists of movement readings."""
+    movement = np.concatenate([np.asarray(night, dtype=np.int16) for night in nights])
+    offsets = np.concatenate([[0], np.cumsum([len(night) for night in nights])])
+    return actigraphy.segment_nights(movement, offsets, rest=REST)
+
+
+def test_restless_then_calm_night():
+    """Restless minutes score as wake and calm ones as sleep, whatever their share of the night."""
+    table = segment([1300] * 70 + [REST] * 30)
+    assert table["latency"][0] >= 70
+    assert table["total_sleep"][0] <= 30
+    assert table["efficiency"][0] < 0.35
+
+
+def test_mostly_awake_night_scores_mostly_wake():
+    """A night that is restless from start to finish never reaches sleep onset."""
+    table = segment([1300] * 90 + [REST] * 5 + [1300] * 5)
+    assert table["total_sleep"][0] == 0
+    assert table["latency"][0] == table["time_in_bed"][0]
+    assert table["efficiency"][0] == 0
+
+
+def test_calm_night_with_one_wake_bout():
+    """A calm night with one restless stretch has one wake bout after onset."""
+    table = segment([REST] * 40 + [1400] * 10 + [REST] * 50)
+    assert table["latency"][0] == 0
+    assert table["wake_bouts"][0] == 1
+    assert table["waso"][0] == table["longest_wake"][0] >= 10
+    assert table["total_sleep"][0] + table["waso"][0] == 100
+
+
+def test_windows_stay_inside_each_night():
+    """A restless night does not spill wake minutes into the calm night after it."""
+    both = segment([1400] * 30, [REST] * 30)
+    alone = segment([REST] * 30)
+    assert both["total_sleep"][1] == alone["total_sleep"][0] == 30
@@ -0,0 +1,33 @@
+""" Bulk ingest: device and night labels, failed files and empty runs. """
+
+import os
+import shutil
+
+import bulk_ingest
+import data_validation
+
+
+def test_devices_with_only_failed_files_get_no_label(tmp_path):
+    """A device whose every file fails is left out, and the IDs still index the labels."""
+    logs = tmp_path / "logs"
+    logs.mkdir()
+    shutil.copy(data_validation.CSV_PATH, logs / "unitA_night1.csv")
+    (logs / "unitB_night2.csv").write_text("not a sensor log\n")
+    shutil.copy(data_validation.CSV_PATH, logs / "unitC_night3.csv")
+
+    meta = bulk_ingest.ingest([str(logs)], str(tmp_path / "dataset"), workers=2)
+    columns, _ = bulk_ingest.load_dataset(str(tmp_path / "dataset"))
+    assert meta["devices"] == ["unitA", "unitC"]
+    assert meta["nights"] == ["night1", "night3"]
+    assert set(columns["device_id"].tolist()) == {0, 1}
+    assert [entry["error"] is None for entry in meta["files"]] == [True, False, True]
+    assert not os.path.exists(tmp_path / "dataset" / "shards")
+
+
+def test_no_matching_files_writes_an_empty_dataset(tmp_path):
+    """With nothing to ingest every column is still written, empty."""
+    meta = bulk_ingest.ingest([str(tmp_path / "missing" / "*.csv")], str(tmp_path / "dataset"), workers=1)
+    columns, _ = bulk_ingest.load_dataset(str(tmp_path / "dataset"))
+    assert meta["files"] == [] and meta["rows"] == 0
+    assert sorted(columns) == sorted(bulk_ingest.DATASET_COLUMNS)
+    assert all(len(values) == 0 for values in columns.values())
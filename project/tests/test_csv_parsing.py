@@ -0,0 +1,53 @@
+""" Columnar CSV parsing: the same readings csv.DictReader gives, whatever the line endings and blocks. """
+
+import csv
+
+import numpy as np
+import pytest
+
+import data_validation
+
+
+def dict_reader_columns(path):
+    """Columns read row by row with csv.DictReader, as the original validation did."""
+    names = (data_validation.TIME_COLUMN,) + data_validation.SENSORS
+    with open(path, newline="") as data_csv:
+        rows = [[float(row[name]) if row[name] else np.nan for name in names] for row in csv.DictReader(data_csv)]
+    values = np.array(rows, dtype=np.float64).reshape(-1, len(names))
+    return {name: values[:, index] for index, name in enumerate(("time",) + data_validation.SENSORS)}
+
+
+def assert_same_readings(parsed, expected):
+    """Check parsed columns hold exactly the expected readings, NaN where empty."""
+    assert parsed.keys() == expected.keys()
+    for name in expected:
+        np.testing.assert_array_equal(parsed[name].astype(np.float64), expected[name])
+
+
+def test_sample_log_matches_dict_reader():
+    """The sample log parses to the readings csv.DictReader gives."""
+    assert_same_readings(data_validation.read_columns(), dict_reader_columns(data_validation.CSV_PATH))
+
+
+@pytest.mark.parametrize("newline", [b"\n", b"\r\n"])
+@pytest.mark.parametrize("chunk_bytes", [64, data_validation.CHUNK_BYTES])
+def test_blank_lines_are_skipped(tmp_path, newline, chunk_bytes):
+    """Blank lines anywhere in the file are skipped, as csv.DictReader skips them."""
+    with open(data_validation.CSV_PATH, "rb") as data_csv:
+        lines = data_csv.read().splitlines()
+    blanked = [lines[0]]
+    for index, line in enumerate(lines[1:]):
+        blanked += [line, b""] if index % 7 == 3 else [line] # A blank line after every 7th reading.
+    path = tmp_path / "blank_lines.csv"
+    path.write_bytes(newline.join(blanked + [b"", b""]))
+
+    with open(path, "rb") as data_csv:
+        order = data_validation.read_header(data_csv)
+        parsed = data_validation.blocks_to_columns(data_validation.iter_csv_blocks(data_csv, order, chunk_bytes))
+    assert_same_readings(parsed, dict_reader_columns(path))
+    assert_same_readings(parsed, data_validation.read_columns())
+
+
+def test_block_of_only_blank_lines_is_empty():
+    """A block holding nothing but blank lines gives no rows."""
+    assert data_validation.parse_csv_chunk(b"\n\r\n\n", list(range(5))).shape == (0, 5)
@@ -0,0 +1,51 @@
+""" Sleep duration windows, including nights appended after the index is built. """
+
+import contextlib
+import io
+
+import numpy as np
+
+import sleep_simulation
+from duration_index import DurationIndex
+
+
+class FakeNight:
+    """Just enough of a Night for DurationIndex.from_nights()."""
+
+    def __init__(self, minutes):
+        self.minutes = minutes
+
+    def get_time_slept(self):
+        return self.minutes
+
+
+def test_windows_match_slices():
+    """Window totals and means equal the same slices of the nights, oldest first."""
+    minutes = np.array([400, 420, 480, 500, 390, 460, 470, 510, 430])
+    index = DurationIndex(minutes)
+    assert index.total(-1, None) == minutes[-1]
+    assert index.window_mean(-7, None) == minutes[-7:].mean()
+    assert index.met_count(480, -7, None) == np.count_nonzero(minutes[-7:] >= 480)
+    assert index.window_mean(-30, None) == minutes.mean() # Clipped like a slice.
+
+
+def test_appended_nights_are_the_most_recent():
+    """A night appended later is last night, and moves the last week's window."""
+    index = DurationIndex([400] * 10)
+    index.append(300)
+    assert index.total(-1, None) == 300
+    assert index.window_mean(-7, None) == (400 * 6 + 300) / 7
+    index.append([500] * 100) # Grows past the initial capacity.
+    assert index.total(-1, None) == 500
+    assert len(index) == 111
+
+
+def test_from_nights_puts_night_one_last():
+    """Night lists start with last night (Night 1); in the index it is the newest night."""
+    nights = [FakeNight(minutes) for minutes in (300, 400, 500)]
+    index = DurationIndex.from_nights(nights)
+    assert index.total(-1, None) == 300
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        sleep_simulation.enough_sleep("test", 6, nights)
+    assert "Last night, you slept for 5 hours and 0 minute(s)." in output.getvalue()
@@ -0,0 +1,19 @@
+""" Environment scoring of a simulated cohort: the same nights as the cohort simulator. """
+
+import numpy as np
+import pytest
+
+import cohort_simulation
+import environment_scoring
+
+
+@pytest.mark.parametrize("users_per_batch", [1, 2, 5])
+def test_simulated_batches_match_the_cohort(users_per_batch):
+    """User u's scored nights are cohort_simulation's user u, whatever the group size."""
+    cohort = cohort_simulation.simulate_cohort(5, 4, seed=11, workers=1)
+    groups = list(environment_scoring.simulated_batches(5, 4, seed=11, users_per_batch=users_per_batch))
+    np.testing.assert_array_equal(np.concatenate([batch.user_ids for batch in groups]), cohort.user_ids)
+    np.testing.assert_array_equal(np.concatenate([batch.night_ids for batch in groups]), cohort.night_ids)
+    np.testing.assert_array_equal(np.concatenate([batch.mins_slept for batch in groups]), cohort.mins_slept)
+    for sensor, values in cohort.series.items():
+        np.testing.assert_array_equal(np.concatenate([batch.series[sensor] for batch in groups]), values)
@@ -0,0 +1,31 @@
+""" AR(1) night generator: the lane-wise filter and the drawn series. """
+
+import numpy as np
+import pytest
+
+import night_generator
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 1000, 50_001])
+@pytest.mark.parametrize("phi", [0.1, 0.911, night_generator.MAX_PHI])
+def test_ar1_series_matches_the_recursion(size, phi):
+    """The lane-wise filter gives the step-by-step recursion, to float32 precision."""
+    innovations = np.random.default_rng(size).standard_normal(size).astype(np.float32)
+    expected, value = np.empty(size), 0.0
+    for step, innovation in enumerate(innovations.astype(np.float64)):
+        value = phi * value + innovation
+        expected[step] = value
+    filtered = night_generator.ar1_series(innovations, phi)
+    assert len(filtered) == size
+    np.testing.assert_allclose(filtered, expected, atol=1e-5 * max(1.0, np.abs(expected).max()))
+
+
+@pytest.mark.parametrize("phi", [0.0, 0.14, 0.911])
+def test_draw_ar1_rounded_keeps_mean_spread_and_correlation(phi):
+    """Drawn readings keep the requested mean, standard deviation and lag-1 correlation."""
+    values = night_generator.draw_ar1_rounded(np.random.default_rng(0), 30.0, 5.0, phi, 1_000_003)
+    assert values.dtype == night_generator.SERIES_DTYPE and len(values) == 1_000_003
+    values = values.astype(np.float64)
+    assert values.mean() == pytest.approx(30.0, abs=0.1)
+    assert values.std() == pytest.approx(5.0, rel=0.02)
+    assert np.corrcoef(values[:-1], values[1:])[0, 1] == pytest.approx(phi, abs=0.01)
@@ -0,0 +1,41 @@
+""" Night store: adds from several processes at once. """
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from night_generator import NightBatch, simulate_nights
+from night_store import NightStore
+
+
+def user_nights(user_id):
+    """Ten simulated nights of one user."""
+    batch = simulate_nights(10, user_id)
+    return NightBatch(batch.mins_slept, batch.series, batch.night_ids, np.full(len(batch), user_id))
+
+
+def add_user(folder, user_id):
+    """Add a user's nights two at a time, as a separate writer process."""
+    batch = user_nights(user_id)
+    with NightStore(folder) as store:
+        for first in range(0, len(batch), 2):
+            part = slice(batch.offsets[first], batch.offsets[first + 2])
+            store.add_batch(NightBatch(batch.mins_slept[first:first + 2],
+                                       {sensor: values[part] for sensor, values in batch.series.items()},
+                                       batch.night_ids[first:first + 2], batch.user_ids[first:first + 2]))
+
+
+def test_concurrent_adds_keep_every_reading(tmp_path):
+    """Writers adding to one store at once never claim the same rows of the column files."""
+    folder = str(tmp_path / "store")
+    NightStore(folder).close()
+    with ProcessPoolExecutor(4) as pool:
+        list(pool.map(add_user, [folder] * 6, range(1, 7)))
+
+    with NightStore(folder) as store:
+        assert len(store) == 60
+        for user_id in range(1, 7):
+            expected, stored = user_nights(user_id), store.load_user(user_id)
+            np.testing.assert_array_equal(stored.mins_slept, expected.mins_slept)
+            for sensor, values in expected.series.items():
+                np.testing.assert_array_equal(np.asarray(stored.series[sensor]), values)
@@ -0,0 +1,51 @@
+""" Binary sensor logs: conversion, range lookup and block-wise validation. """
+
+import os
+
+import numpy as np
+import pytest
+
+import data_validation
+import sensor_log
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    """The sample log converted to a sensor log."""
+    path, _ = sensor_log.convert_csv(data_validation.CSV_PATH, str(tmp_path / "sample.slog"))
+    return path
+
+
+def test_log_validates_like_the_csv(log_path):
+    """Every reading survives conversion, and validating the log equals validating the CSV."""
+    from_log = data_validation.load_columns(log_path)
+    from_csv = data_validation.load_columns(data_validation.CSV_PATH)
+    for name in from_csv:
+        np.testing.assert_array_equal(from_log[name], from_csv[name])
+
+
+def test_validated_blocks_cover_the_log(log_path):
+    """Small blocks validate to the same readings as the whole log at once."""
+    blocks = list(sensor_log.SensorLog(log_path).validated_blocks(block_records=1000))
+    assert len(blocks) > 1
+    whole = data_validation.load_columns(log_path)
+    for name in whole:
+        np.testing.assert_array_equal(np.concatenate([block[name] for block in blocks]), whole[name])
+
+
+def test_time_range_is_half_open(log_path):
+    """time_range() returns exactly the readings with start <= time < stop."""
+    log = sensor_log.SensorLog(log_path)
+    times = log.records["time"] / log.ticks_per_second
+    records = log.time_range(100.0, 200.0)
+    assert len(records) == np.count_nonzero((times >= 100.0) & (times < 200.0))
+    assert len(log.time_range()) == len(log)
+
+
+def test_failed_conversion_leaves_no_files(tmp_path):
+    """A CSV whose timestamps go backwards is rejected without leaving a log or a temporary file."""
+    csv_path = tmp_path / "backwards.csv"
+    csv_path.write_text("Time (seconds),light,sound,temp,movement\n2.00,1,,,\n1.00,2,,,\n")
+    with pytest.raises(ValueError):
+        sensor_log.convert_csv(str(csv_path))
+    assert os.listdir(tmp_path) == ["backwards.csv"]
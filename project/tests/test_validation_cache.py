@@ -0,0 +1,101 @@
+""" The incremental validated-data cache: appends, edits, rotation and invalidation. """
+
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+import data_validation
+
+
+@pytest.fixture
+def raw_csv(tmp_path):
+    """A private copy of the sample log, so its cache lives in the test's folder."""
+    path = tmp_path / "sleep_data_raw.csv"
+    shutil.copy(data_validation.CSV_PATH, path)
+    return str(path)
+
+
+def assert_same_columns(cached, parsed):
+    """Check two sets of validated columns hold the same readings, NaN where empty."""
+    assert cached.keys() == parsed.keys()
+    for name in parsed:
+        np.testing.assert_array_equal(np.asarray(cached[name]), parsed[name])
+
+
+def bump_mtime(path):
+    """Move a file's mtime forward, as a later write would."""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_cache_matches_a_fresh_parse(raw_csv):
+    """The first cached load and a reload both equal parsing the file."""
+    assert_same_columns(data_validation.load_validated(raw_csv), data_validation.load_columns(raw_csv))
+    assert os.path.isdir(data_validation.cache_dir(raw_csv))
+    assert_same_columns(data_validation.load_validated(raw_csv), data_validation.load_columns(raw_csv))
+
+
+def test_appended_lines_are_added(raw_csv):
+    """Lines appended after the first load show up in the next one."""
+    data_validation.load_validated(raw_csv)
+    with open(raw_csv, "a") as raw_file:
+        raw_file.write("2000.00,12,,,\n2000.50,,95,,\n2001.00,,,25,\n")
+    bump_mtime(raw_csv)
+    columns = data_validation.load_validated(raw_csv)
+    assert_same_columns(columns, data_validation.load_columns(raw_csv))
+    assert columns["time"][-1] == 2001.0
+    assert np.isnan(columns["sound"][-2]) # 95 dB is above the limit.
+
+
+def test_same_size_edit_rebuilds_the_cache(raw_csv):
+    """Changing one digit in the middle of the file, keeping its size, is not served from the cache."""
+    data_validation.load_validated(raw_csv)
+    with open(raw_csv, "rb") as raw_file:
+        data = bytearray(raw_file.read())
+    line_start = data.index(b"\n", len(data) // 2) + 1
+    digit = line_start + data[line_start:].index(b",") + 1 # First character after the timestamp.
+    while not chr(data[digit]).isdigit():
+        digit += 1
+    data[digit] = ord("1") if data[digit] != ord("1") else ord("2")
+    with open(raw_csv, "wb") as raw_file:
+        raw_file.write(data)
+    bump_mtime(raw_csv)
+    assert_same_columns(data_validation.load_validated(raw_csv), data_validation.load_columns(raw_csv))
+
+
+def test_truncated_file_rebuilds_the_cache(raw_csv):
+    """A file cut short, as when a logger rotates it, is re-read from the start."""
+    data_validation.load_validated(raw_csv)
+    with open(raw_csv, "rb") as raw_file:
+        lines = raw_file.readlines()
+    with open(raw_csv, "wb") as raw_file:
+        raw_file.writelines(lines[:100])
+    columns = data_validation.load_validated(raw_csv)
+    assert len(columns["time"]) == 99
+    assert_same_columns(columns, data_validation.load_columns(raw_csv))
+
+
+def test_unfinished_last_line_waits(raw_csv):
+    """A last line without its newline is left out until it is complete, even if it parses."""
+    data_validation.load_validated(raw_csv)
+    rows = len(data_validation.load_columns(raw_csv)["time"])
+    with open(raw_csv, "a") as raw_file:
+        raw_file.write("2000.00,,,,10") # Parses, but is the start of "2000.00,,,,1032".
+    bump_mtime(raw_csv)
+    assert len(data_validation.load_validated(raw_csv)["time"]) == rows
+    with open(raw_csv, "a") as raw_file:
+        raw_file.write("32\n")
+    bump_mtime(raw_csv)
+    columns = data_validation.load_validated(raw_csv)
+    assert len(columns["time"]) == rows + 1
+    assert columns["movement"][-1] == 1032
+
+
+def test_invalidate_cache(raw_csv):
+    """invalidate_cache() deletes the cache, and the next load rebuilds it."""
+    data_validation.load_validated(raw_csv)
+    data_validation.invalidate_cache(raw_csv)
+    assert not os.path.exists(data_validation.cache_dir(raw_csv))
+    assert_same_columns(data_validation.load_validated(raw_csv), data_validation.load_columns(raw_csv))